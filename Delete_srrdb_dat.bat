@@ -1,5 +1,5 @@
-:: Replace USER_NAME with your own user name
+:: Delete the srrdb session cookies saved by autorescene.py and srrup.py
 
-SET FICHIER="C:\Users\USER_NAME\AppData\Local\Temp\www.srrdb.com_session.dat"
+SET FICHIER="%USERPROFILE%\.config\srrdb\www.srrdb.com_cookies.json"
 
 IF EXIST %FICHIER% DEL /F %FICHIER%
@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Define the file path
-FILE="/tmp/www.srrdb.com_session.dat"
+FILE="$HOME/.config/srrdb/www.srrdb.com_cookies.json"
 
 # Check if the file exists, and if so, delete it
 if [ -f "$FILE" ]; then
@@ -0,0 +1,58 @@
+"""
+Compare two result files of benchmarks.run.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json [--threshold 10]
+
+Exits with 1 when a benchmark got slower than the threshold in percent.
+"""
+
+import sys
+import json
+import argparse
+
+# Higher is better for every metric compared
+METRICS = ("mb_per_s", "items_per_s", "releases_per_min")
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare(old, new, threshold):
+    # Return the report lines and the names of the benchmarks slower than threshold %
+    lines = [f"{'benchmark':<24}{'metric':>14}{'old':>14}{'new':>14}{'change':>10}"]
+    regressions = []
+    for name, result in new["results"].items():
+        previous = old["results"].get(name)
+        if not previous:
+            lines.append(f"{name:<24}{'':>14}{'-':>14}{'new':>14}")
+            continue
+        for metric in METRICS:
+            if metric not in result or metric not in previous:
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric] * 100
+            flag = ""
+            if change < -threshold:
+                flag = " !"
+                regressions.append(name)
+            lines.append(f"{name:<24}{metric:>14}{previous[metric]:>14.1f}{result[metric]:>14.1f}{change:>+9.1f}%{flag}")
+        if "peak_rss_mb" in result and "peak_rss_mb" in previous:
+            lines.append(f"{name:<24}{'peak_rss_mb':>14}{previous['peak_rss_mb']:>14.1f}{result['peak_rss_mb']:>14.1f}")
+    return lines, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10, help="slowdown in percent reported as a regression (default: 10)")
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    print(f"{old['commit']} ({old['date']}) -> {new['commit']} ({new['date']})")
+    lines, regressions = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\nSlower by more than {args.threshold}%: {', '.join(dict.fromkeys(regressions))}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+End-to-end throughput of autorescene.py -a, autorescene.py -c and srrup.py
+against the local srrdb stand-in (benchmarks/srrdb_server.py).
+
+    python -m benchmarks.e2e [--releases 20] [--size-mb 8] [--latency-ms 50] [--script-args "--jobs 4"]
+
+Releases are generated with rescene (a stored RAR of a random .mkv, its SRR
+and the extracted .mkv), every run uses its own HOME so the config folder,
+caches and cookies start empty. Results are written with the ones of
+benchmarks.run and can be compared the same way.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from benchmarks import fixtures
+from benchmarks.run import ROOT, RESULTS_FOLDER, git_commit, missing_modules
+from benchmarks.srrdb_server import Fixtures, StandInServer
+
+USERNAME = "bench"
+PASSWORD = "bench"
+SCENARIOS = ("auto", "check", "upload")
+# Last summary line of autorescene.py and srrup.py
+COMPLETE_RE = re.compile(r"(\d+) completed of (\d+) scanned")
+
+def generate(workdir, releases, size):
+    # Fixture releases and the manifest of the stand-in
+    entries = []
+    for i in range(releases):
+        _, _, entry = fixtures.make_scene_release(workdir, fixtures.release_name(i), size)
+        entries.append(entry)
+    manifest = os.path.join(workdir, "manifest.json")
+    with open(manifest, "w") as f:
+        json.dump({"releases": entries}, f, indent=2)
+    return manifest
+
+def run_script(script, script_args, site, home):
+    env = dict(os.environ, HOME=home, USERPROFILE=home, SRRDB_SITE=site, SRRDB_USERNAME=USERNAME,
+               SRRDB_PASSWORD=PASSWORD, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "bin", script), *script_args], cwd=home, env=env,
+                          capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    match = None
+    for match in COMPLETE_RE.finditer(proc.stdout):
+        pass
+    result = {"seconds": seconds, "returncode": proc.returncode}
+    if match:
+        result["items"] = int(match.group(1))
+        result["scanned"] = int(match.group(2))
+        result["items_per_s"] = result["items"] / seconds
+        result["releases_per_min"] = result["items"] * 60 / seconds
+    else:
+        result["error"] = (proc.stderr.strip().splitlines() or ["no summary line"])[-1]
+    return result
+
+def scenario_args(scenario, workdir, extra):
+    if scenario == "auto":
+        return ["-a", "-o", os.path.join(workdir, "output"), *extra, os.path.join(workdir, "extracted")]
+    if scenario == "check":
+        return ["-c", *extra, os.path.join(workdir, "output")]
+    return [os.path.join(workdir, "srr")]
+
+def arg_parse():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against a local srrdb stand-in")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS),
+                        help="check runs on the output of auto (default: all)")
+    parser.add_argument("--releases", type=int, default=20, help="releases generated (default: 20)")
+    parser.add_argument("--size-mb", type=float, default=8, help="size of the .mkv of every release (default: 8)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latency of the stand-in (default: 0)")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before the stand-in answers 429")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 429")
+    parser.add_argument("--daily-quota", type=int, default=0, help="SRR downloads per client")
+    parser.add_argument("--script-args", default="", help="extra options given to autorescene.py, like \"--jobs 4\"")
+    parser.add_argument("--workdir", help="where fixtures are generated (default: a temp dir removed at the end)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/e2e-<date>-<commit>.json)")
+    return vars(parser.parse_args())
+
+def main():
+    args = arg_parse()
+    missing = missing_modules(("rescene", "requests", "colorama"))
+    if missing:
+        sys.exit(f"End-to-end benchmark needs {', '.join(missing)}")
+
+    workdir = args["workdir"] or tempfile.mkdtemp(prefix="pyautorescene-e2e-")
+    os.makedirs(workdir, exist_ok=True)
+    server = None
+    results = dict()
+    try:
+        print(f"Generating {args['releases']} releases in {workdir}")
+        manifest = generate(workdir, args["releases"], int(args["size_mb"] * 1048576))
+
+        server = StandInServer(("127.0.0.1", 0), Fixtures().load_manifest(manifest), USERNAME, PASSWORD,
+                               args["latency_ms"] / 1000, args["rate_limit"], args["error_rate"], args["daily_quota"])
+        server.start()
+        print(f"srrdb stand-in on {server.url}")
+
+        extra = shlex.split(args["script_args"])
+        os.makedirs(os.path.join(workdir, "output"), exist_ok=True)
+        for scenario in SCENARIOS:
+            if scenario not in args["scenarios"]:
+                continue
+            home = os.path.join(workdir, f"home-{scenario}")
+            os.makedirs(home, exist_ok=True)
+            before = dict(server.stats)
+            script = "srrup.py" if scenario == "upload" else "autorescene.py"
+            results[scenario] = run_script(script, scenario_args(scenario, workdir, extra), server.url, home)
+            results[scenario]["server"] = {k: v - before[k] for k, v in server.stats.items()}
+
+            result = results[scenario]
+            if "error" in result:
+                print(f"{scenario:<10} error ({result['error']})")
+            else:
+                print(f"{scenario:<10}{result['seconds']:>10.2f} s{result['items']:>6}/{result['scanned']} releases"
+                      f"{result['releases_per_min']:>10.1f} releases/min")
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        if not args["workdir"]:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    output = args["output"] or os.path.join(RESULTS_FOLDER, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                   "platform": platform.platform(),
+                   "params": {k: args[k] for k in ("releases", "size_mb", "latency_ms", "rate_limit", "error_rate", "daily_quota", "script_args")},
+                   "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
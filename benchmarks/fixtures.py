@@ -0,0 +1,137 @@
+import os
+import time
+import zlib
+import shutil
+import struct
+
+# Written every DATA_STRIDE bytes of a sparse file so the hashed content isn't only zeros
+DATA_STRIDE = 64 * 1024 * 1024
+DATA_BLOCK = bytes(range(256)) * 256
+RAR_MARKER = b"Rar!\x1a\x07\x00"
+
+def make_sparse_file(path, size):
+    # File of size bytes with a 64 KiB data block every DATA_STRIDE bytes and at the end, the rest are holes
+    with open(path, "wb") as f:
+        f.truncate(size)
+        for offset in range(0, size, DATA_STRIDE):
+            f.seek(offset)
+            f.write(DATA_BLOCK[:min(len(DATA_BLOCK), size - offset)])
+        if size > len(DATA_BLOCK):
+            f.seek(size - len(DATA_BLOCK))
+            f.write(DATA_BLOCK)
+    return path
+
+def release_name(i):
+    return f"Some.Movie.{2000 + i % 25}.1080p.BluRay.x264-GRP{i:04d}"
+
+def make_release(root, name, rars=15, rar_size=4096, sample_size=65536, depth=0):
+    # One scene release: RAR volumes, sfv, nfo and Sample/Proof/Subs, depth adds CD1/extra levels
+    release = os.path.join(root, name)
+    folder = release
+    for level in range(depth):
+        folder = os.path.join(folder, f"CD{level + 1}")
+    os.makedirs(folder, exist_ok=True)
+
+    base = name.lower()
+    volumes = [f"{base}.rar"] + [f"{base}.r{i:02d}" for i in range(rars - 1)]
+    sfv_lines = ["; generated by benchmarks"]
+    for volume in volumes:
+        data = volume.encode() * (rar_size // len(volume) + 1)
+        with open(os.path.join(folder, volume), "wb") as f:
+            f.write(data[:rar_size])
+        sfv_lines.append(f"{volume} {zlib.crc32(data[:rar_size]) & 0xFFFFFFFF:08x}")
+
+    with open(os.path.join(folder, f"{base}.sfv"), "w") as f:
+        f.write("\n".join(sfv_lines) + "\n")
+    with open(os.path.join(release, f"{base}.nfo"), "w") as f:
+        f.write(f"{name}\n")
+
+    for sub_dir, fname, size in (("Sample", f"{base}-sample.mkv", sample_size),
+                                 ("Proof", f"{base}-proof.jpg", 4096),
+                                 ("Subs", f"{base}-subs.rar", 4096)):
+        os.makedirs(os.path.join(release, sub_dir), exist_ok=True)
+        with open(os.path.join(release, sub_dir, fname), "wb") as f:
+            f.write(DATA_BLOCK[:size] if size <= len(DATA_BLOCK) else DATA_BLOCK * (size // len(DATA_BLOCK)))
+    return release
+
+def make_library(root, releases=200, depth=2, movies=True):
+    # Library of releases spread over depth levels of category dirs, with an extracted .mkv per release
+    os.makedirs(root, exist_ok=True)
+    for i in range(releases):
+        parent = root
+        for level in range(depth):
+            parent = os.path.join(parent, f"cat{level}-{i % (level + 3)}")
+        name = release_name(i)
+        release = make_release(parent, name, depth=i % 2)
+        if movies:
+            make_sparse_file(os.path.join(release, f"{name.lower()}.mkv"), 1024 * 1024)
+    return root
+
+def rar_header(head_type, flags, body):
+    # RAR 4 block: HEAD_CRC is the low 16 bits of the CRC32 of the rest of the header
+    raw = struct.pack("<BHH", head_type, flags, 7 + len(body)) + body
+    return struct.pack("<H", zlib.crc32(raw) & 0xFFFF) + raw
+
+def dos_time(timestamp):
+    t = time.localtime(timestamp)
+    return (t.tm_year - 1980) << 25 | t.tm_mon << 21 | t.tm_mday << 16 | t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+def make_rar(path, src, name=None):
+    # Single volume RAR 4 archive storing src (method m0), no rar binary needed
+    name = (name or os.path.basename(src)).encode()
+    size = os.path.getsize(src)
+    if size >= 1 << 32:
+        raise ValueError("make_rar doesn't write the 64 bit size fields")
+    crc = 0
+    with open(src, "rb") as f:
+        for chunk in iter(lambda: f.read(1048576), b""):
+            crc = zlib.crc32(chunk, crc)
+
+    with open(path, "wb") as out:
+        out.write(RAR_MARKER)
+        out.write(rar_header(0x73, 0x0000, bytes(6)))
+        body = struct.pack("<IIBIIBBHI", size, size, 2, crc, dos_time(os.path.getmtime(src)), 29, 0x30, len(name), 0x20) + name
+        out.write(rar_header(0x74, 0x8000, body))
+        with open(src, "rb") as f:
+            shutil.copyfileobj(f, out, 1048576)
+        out.write(rar_header(0x7b, 0x4000, b""))
+    return path
+
+def file_crc(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1048576), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
+
+def make_scene_release(folder, name, size):
+    # Release with a RAR of a random .mkv plus sfv/nfo, its SRR made with rescene and the extracted .mkv
+    # Returns (srr path, extracted path, manifest entry)
+    from rescene.main import create_srr, info
+
+    base = name.lower()
+    rar_dir = os.path.join(folder, "rars", name)
+    os.makedirs(rar_dir, exist_ok=True)
+    os.makedirs(os.path.join(folder, "extracted"), exist_ok=True)
+    os.makedirs(os.path.join(folder, "srr"), exist_ok=True)
+
+    mkv = os.path.join(folder, "extracted", f"{base}.mkv")
+    with open(mkv, "wb") as f:
+        for offset in range(0, size, 1048576):
+            f.write(os.urandom(min(1048576, size - offset)))
+
+    rar = make_rar(os.path.join(rar_dir, f"{base}.rar"), mkv)
+    with open(os.path.join(rar_dir, f"{base}.sfv"), "w") as f:
+        f.write(f"; {name}\n{os.path.basename(rar)} {file_crc(rar):08x}\n")
+    with open(os.path.join(rar_dir, f"{base}.nfo"), "w") as f:
+        f.write(f"{name}\n")
+
+    srr = os.path.join(folder, "srr", f"{name}.srr")
+    create_srr(srr, [os.path.join(rar_dir, f"{base}.sfv")], in_folder=rar_dir, store_files=[f"{base}.nfo", f"{base}.sfv"], oso_hash=True)
+    shutil.rmtree(rar_dir)
+
+    srr_info = info(srr)
+    oso = {entry[0]: entry[1] for entry in srr_info.get("oso_hashes", ())}
+    entry = {"release": name, "srr": os.path.relpath(srr, folder), "hasSRS": "no",
+             "archived": [{"name": fname, "crc": finfo.crc32, "oso": oso.get(fname)} for fname, finfo in srr_info["archived_files"].items()]}
+    return srr, mkv, entry
@@ -0,0 +1,297 @@
+"""
+Offline micro-benchmarks of hashing, traversal, SRR parsing and release checks.
+
+    python -m benchmarks.run [--size-mb 2048] [--releases 200] [--only crc32_readinto walker]
+
+Fixtures (a sparse file and a library of releases) are generated in a temp
+dir, every benchmark runs in its own process so its peak RSS is its own, and
+the results are written as JSON in benchmarks/results/ to be compared with
+python -m benchmarks.compare.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import importlib
+import subprocess
+import importlib.util
+from collections import namedtuple
+
+from benchmarks import fixtures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FOLDER = os.path.join(ROOT, "benchmarks", "results")
+
+# name -> (function, modules it needs), run in this order
+BENCHMARKS = dict()
+
+def benchmark(name, requires=()):
+    def decorator(func):
+        BENCHMARKS[name] = (func, requires)
+        return func
+    return decorator
+
+def missing_modules(requires):
+    missing = []
+    for module in requires:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            missing.append(module)
+    return missing
+
+def best_of(repeat, func, setup=None):
+    # Best time of repeat runs of func, setup runs before each one and isn't timed
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def load_script(name):
+    # bin/ scripts aren't modules, their main part doesn't run when loaded like this
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "bin", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def library_files(library, ext):
+    return sorted(os.path.join(root, f) for root, _, files in os.walk(library) for f in files if f.endswith(ext))
+
+def release_dirs(library):
+    return sorted(root for root, dirs, _ in os.walk(library) if "Sample" in dirs)
+
+@benchmark("crc32_readinto", requires=("colorama",))
+def bench_crc32_readinto(workdir, repeat):
+    import utils.hasher
+    big = os.path.join(workdir, "big.bin")
+    seconds = best_of(repeat, lambda: utils.hasher.crc32_file(big, use_mmap=False, threaded=False))
+    return {"seconds": seconds, "bytes": os.path.getsize(big)}
+
+@benchmark("crc32_threaded", requires=("colorama",))
+def bench_crc32_threaded(workdir, repeat):
+    import utils.hasher
+    big = os.path.join(workdir, "big.bin")
+    seconds = best_of(repeat, lambda: utils.hasher.crc32_file(big, use_mmap=False, threaded=True))
+    return {"seconds": seconds, "bytes": os.path.getsize(big)}
+
+@benchmark("crc32_mmap", requires=("colorama",))
+def bench_crc32_mmap(workdir, repeat):
+    import utils.hasher
+    big = os.path.join(workdir, "big.bin")
+    seconds = best_of(repeat, lambda: utils.hasher.crc32_file(big, use_mmap=True))
+    return {"seconds": seconds, "bytes": os.path.getsize(big)}
+
+@benchmark("hash_file", requires=("colorama",))
+def bench_hash_file(workdir, repeat):
+    import utils.hasher
+    big = os.path.join(workdir, "big.bin")
+    seconds = best_of(repeat, lambda: utils.hasher.hash_file(big))
+    return {"seconds": seconds, "bytes": os.path.getsize(big)}
+
+@benchmark("calc_crc_cold", requires=("colorama", "requests", "rescene"))
+def bench_calc_crc_cold(workdir, repeat):
+    from utils.crccache import CRCCache
+    autorescene = load_script("autorescene")
+    files = library_files(os.path.join(workdir, "library"), ".mkv")
+
+    def reset():
+        autorescene.crc_cache = CRCCache(":memory:")
+
+    seconds = best_of(repeat, lambda: [autorescene.calc_crc(f) for f in files], setup=reset)
+    return {"seconds": seconds, "items": len(files), "bytes": sum(os.path.getsize(f) for f in files)}
+
+@benchmark("calc_crc_warm", requires=("colorama", "requests", "rescene"))
+def bench_calc_crc_warm(workdir, repeat):
+    from utils.crccache import CRCCache
+    autorescene = load_script("autorescene")
+    files = library_files(os.path.join(workdir, "library"), ".mkv")
+    autorescene.crc_cache = CRCCache(":memory:")
+    for f in files:
+        autorescene.calc_crc(f)
+
+    seconds = best_of(repeat, lambda: [autorescene.calc_crc(f) for f in files])
+    return {"seconds": seconds, "items": len(files)}
+
+@benchmark("calc_oso", requires=("colorama", "requests", "rescene"))
+def bench_calc_oso(workdir, repeat):
+    from utils.crccache import CRCCache
+    autorescene = load_script("autorescene")
+    files = library_files(os.path.join(workdir, "library"), ".mkv")
+    autorescene.crc_cache = CRCCache(":memory:")
+
+    seconds = best_of(repeat, lambda: [autorescene.calc_oso(f) for f in files])
+    return {"seconds": seconds, "items": len(files)}
+
+@benchmark("os_walk")
+def bench_os_walk(workdir, repeat):
+    # Baseline of the traversal benchmarks, same files as the walker finds
+    library = os.path.join(workdir, "library")
+    count = []
+    seconds = best_of(repeat, lambda: count.append(sum(1 for root, _, files in os.walk(library) for f in files
+                                                       if os.path.splitext(f)[1].lower() in (".mkv", ".avi", ".mp4", ".iso"))))
+    return {"seconds": seconds, "items": count[-1]}
+
+@benchmark("walker")
+def bench_walker(workdir, repeat):
+    from utils.walk import Walker
+    library = os.path.join(workdir, "library")
+    count = []
+    seconds = best_of(repeat, lambda: count.append(sum(1 for _ in Walker([library], [".mkv", ".avi", ".mp4", ".iso"]).files())))
+    return {"seconds": seconds, "items": count[-1]}
+
+@benchmark("walker_index")
+def bench_walker_index(workdir, repeat):
+    from utils.walk import Walker
+    from utils.fileindex import FileIndex
+    library = os.path.join(workdir, "library")
+    count = []
+    seconds = best_of(repeat, lambda: count.append(sum(1 for _ in Walker([library], [".mkv", ".avi", ".mp4", ".iso"], index=FileIndex()).files())))
+    return {"seconds": seconds, "items": count[-1]}
+
+@benchmark("traverse_directories", requires=("colorama", "requests", "rescene"))
+def bench_traverse_directories(workdir, repeat):
+    autorescene = load_script("autorescene")
+    library = os.path.join(workdir, "library")
+    count = []
+
+    def run():
+        items = []
+        autorescene.traverse_directories([library], [".mkv", ".avi", ".mp4", ".iso"], items.append)
+        count.append(len(items))
+
+    seconds = best_of(repeat, run)
+    return {"seconds": seconds, "items": count[-1]}
+
+@benchmark("srr_getters", requires=("colorama", "rescene"))
+def bench_srr_getters(workdir, repeat):
+    # Getters of many SRR objects, rescene.info is replaced by a synthetic result so only our code is measured
+    import utils.srr
+    FileInfo = namedtuple("FileInfo", ["file_name", "file_size", "crc32"])
+    rar_files = {f"release.r{i:02d}": FileInfo(f"release.r{i:02d}", 50000000, f"{i:08x}") for i in range(99)}
+    archived = {f"file{i}.mkv": FileInfo(f"file{i}.mkv", 4900000000, f"{i + 1000:08x}") for i in range(3)}
+    stored = {name: None for name in ("release.nfo", "release.sfv", "Sample/release-sample.srs", "Proof/release-proof.jpg")}
+    srr_info = {"compression": False, "rar_files": rar_files, "archived_files": archived,
+                "stored_files": stored, "sfv_entries": [f"{name} {info.crc32}" for name, info in rar_files.items()]}
+
+    srr_path = os.path.join(workdir, "release.srr")
+    open(srr_path, "wb").close()
+    utils.srr.info = lambda filename: srr_info
+    count = 2000
+
+    def run():
+        for i in range(count):
+            srr = utils.srr.SRR(srr_path)
+            srr.get_rars_name()
+            srr.get_rars_size()
+            srr.get_sfv_entries_nb()
+            srr.get_stored_files_name()
+            srr.get_archived_fname_by_crc(f"{1000 + i % 3:08x}")
+            srr.get_archived_crc_by_fname("file1.mkv")
+            srr.get_proof_filename()
+
+    seconds = best_of(repeat, run)
+    return {"seconds": seconds, "items": count}
+
+@benchmark("check_rls", requires=("colorama",))
+def bench_check_rls(workdir, repeat):
+    import utils.check_rls
+    releases = release_dirs(os.path.join(workdir, "library"))
+    seconds = best_of(repeat, lambda: [utils.check_rls.run_checks(r) for r in releases])
+    return {"seconds": seconds, "items": len(releases)}
+
+def run_child(name, workdir, repeat):
+    # Run one benchmark in this process and print its result as the last line
+    func, requires = BENCHMARKS[name]
+    missing = missing_modules(requires)
+    if missing:
+        result = {"skipped": f"missing {', '.join(missing)}"}
+    else:
+        result = func(workdir, repeat)
+        if result.get("bytes"):
+            result["mb_per_s"] = result["bytes"] / 1048576 / result["seconds"]
+        if result.get("items"):
+            result["items_per_s"] = result["items"] / result["seconds"]
+        # ru_maxrss is in KiB on Linux
+        result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def format_result(name, result):
+    if "skipped" in result:
+        return f"{name:<24} skipped ({result['skipped']})"
+    if "error" in result:
+        return f"{name:<24} error ({result['error']})"
+    line = f"{name:<24}{result['seconds']:>10.3f} s"
+    if "mb_per_s" in result:
+        line += f"{result['mb_per_s']:>12.1f} MiB/s"
+    if "items_per_s" in result:
+        line += f"{result['items_per_s']:>12.1f} items/s"
+    return line + f"{result['peak_rss_mb']:>10.1f} MiB RSS"
+
+def arg_parse():
+    parser = argparse.ArgumentParser(description="pyautorescene micro-benchmarks")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument("--size-mb", type=int, default=2048, help="size of the sparse file hashed (default: 2048)")
+    parser.add_argument("--releases", type=int, default=200, help="releases in the generated library (default: 200)")
+    parser.add_argument("--depth", type=int, default=2, help="category dirs above every release (default: 2)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every benchmark, the best one is kept (default: 3)")
+    parser.add_argument("--workdir", help="where fixtures are generated (default: a temp dir removed at the end)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<date>-<commit>.json)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return vars(parser.parse_args())
+
+def main():
+    args = arg_parse()
+    if args["child"]:
+        run_child(args["child"], args["workdir"], args["repeat"])
+        return
+
+    workdir = args["workdir"] or tempfile.mkdtemp(prefix="pyautorescene-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        print(f"Generating fixtures in {workdir}")
+        if not os.path.exists(os.path.join(workdir, "big.bin")):
+            fixtures.make_sparse_file(os.path.join(workdir, "big.bin"), args["size_mb"] * 1048576)
+        if not os.path.isdir(os.path.join(workdir, "library")):
+            fixtures.make_library(os.path.join(workdir, "library"), args["releases"], args["depth"])
+
+        results = dict()
+        for name in args["only"] or BENCHMARKS:
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.run", "--child", name, "--workdir", workdir,
+                                   "--repeat", str(args["repeat"])], cwd=ROOT, capture_output=True, text=True)
+            try:
+                results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                results[name] = {"error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+            print(format_result(name, results[name]))
+    finally:
+        if not args["workdir"]:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    output = args["output"] or os.path.join(RESULTS_FOLDER, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                   "platform": platform.platform(), "params": {k: args[k] for k in ("size_mb", "releases", "depth", "repeat")},
+                   "results": results}, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
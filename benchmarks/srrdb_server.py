@@ -0,0 +1,329 @@
+"""
+Local stand-in of the srrdb.com endpoints used by autorescene.py and srrup.py.
+
+    python -m benchmarks.srrdb_server --manifest fixtures.json [--port 8080] [--latency-ms 50]
+
+Point the scripts at it with SRRDB_SITE=http://127.0.0.1:8080/ (and
+SRRDB_USERNAME/SRRDB_PASSWORD for the endpoints needing a login). Releases
+come from a manifest:
+
+    {"releases": [{"release": "Name-GRP", "srr": "Name-GRP.srr", "hasSRS": "no",
+                   "archived": [{"name": "name.mkv", "crc": "1234ABCD", "oso": "0123456789abcdef"}]}]}
+
+or from a directory of .srr files read with rescene (--srr-dir).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import secrets
+import argparse
+import threading
+import email.policy
+from email.parser import BytesParser
+from urllib.parse import unquote, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Same texts as srrdb, utils.connect and utils.res look for them
+DAILY_LIMIT_MESSAGE = "You've reached your daily download limit."
+TOO_MANY_REQUESTS_MESSAGE = "You have sent too many requests in a given amount of time."
+NOT_FOUND_MESSAGE = "The SRR file does not exist."
+COOKIE_NAME = "uid"
+
+class Fixtures:
+    """Releases served by the stand-in, indexed by archived CRC, OSO hash and name."""
+    def __init__(self):
+        self.releases = dict()
+        self.by_crc = dict()
+        self.by_oso = dict()
+        self.lock = threading.Lock()
+
+    def add(self, release, srr, archived=(), has_srs="no", has_nfo="yes"):
+        entry = {"release": release, "srr": srr, "hasSRS": has_srs, "hasNFO": has_nfo}
+        with self.lock:
+            self.releases[release.lower()] = entry
+            for archived_file in archived:
+                if archived_file.get("crc"):
+                    self.by_crc.setdefault(archived_file["crc"].upper().zfill(8), []).append(entry)
+                if archived_file.get("oso"):
+                    self.by_oso.setdefault(archived_file["oso"].lower(), []).append(entry)
+        return entry
+
+    def load_manifest(self, path):
+        with open(path) as f:
+            manifest = json.load(f)
+        folder = os.path.dirname(os.path.abspath(path))
+        for release in manifest["releases"]:
+            self.add(release["release"], os.path.join(folder, release["srr"]), release.get("archived", ()),
+                     release.get("hasSRS", "no"), release.get("hasNFO", "yes"))
+        return self
+
+    def load_srr_dir(self, folder):
+        # Needs rescene, the OSO hashes stored in the SRR are used when there are some
+        from rescene.main import info
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith(".srr"):
+                continue
+            path = os.path.join(folder, name)
+            srr_info = info(path)
+            oso = {entry[0]: entry[1] for entry in srr_info.get("oso_hashes", ())}
+            archived = [{"name": fname, "crc": finfo.crc32, "oso": oso.get(fname)} for fname, finfo in srr_info["archived_files"].items()]
+            has_srs = "yes" if any(sfile.lower().endswith(".srs") for sfile in srr_info["stored_files"]) else "no"
+            self.add(os.path.splitext(name)[0], path, archived, has_srs)
+        return self
+
+    def search(self, query):
+        # Results of an api/search/ query, only the archive-crc:, isdbhash: and r: terms are supported
+        with self.lock:
+            if query.startswith("archive-crc:"):
+                return list(self.by_crc.get(query[len("archive-crc:"):].upper(), ()))
+            if query.startswith("isdbhash:"):
+                return list(self.by_oso.get(query[len("isdbhash:"):].lower(), ()))
+            if query.startswith("r:"):
+                entry = self.releases.get(query[len("r:"):].lower())
+                return [entry] if entry else []
+        return []
+
+    def get(self, release):
+        with self.lock:
+            return self.releases.get(release.lower())
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server holding the fixtures, the sessions and the counters of the
+    stand-in. latency is added to every response, rate_limit (requests per
+    second) answers 429 with the srrdb message above it, error_rate answers a
+    random share of requests with 429, daily_quota limits the SRR downloads of
+    every client (session cookie or address).
+    """
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, username="", password="", latency=0.0, rate_limit=0, error_rate=0.0,
+                 daily_quota=0, upload_folder=None):
+        super().__init__(address, Handler)
+        self.fixtures = fixtures
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.daily_quota = daily_quota
+        self.upload_folder = upload_folder
+        self.sessions = dict()
+        self.downloads = dict()
+        self.recent = []
+        self.stats = {"requests": 0, "searches": 0, "downloads": 0, "uploads": 0, "logins": 0, "rate_limited": 0, "quota_exceeded": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def is_rate_limited(self):
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.error_rate and random.random() < self.error_rate:
+                return True
+            if not self.rate_limit:
+                return False
+            self.recent = [t for t in self.recent if now - t < 1.0]
+            if len(self.recent) >= self.rate_limit:
+                return True
+            self.recent.append(now)
+            return False
+
+    def take_download(self, client):
+        # False when the client already downloaded daily_quota SRR
+        with self.lock:
+            if self.daily_quota and self.downloads.get(client, 0) >= self.daily_quota:
+                return False
+            self.downloads[client] = self.downloads.get(client, 0) + 1
+            return True
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="srrdb-server", daemon=True)
+        thread.start()
+        return thread
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "srrdb-stand-in"
+
+    def log_message(self, format, *args):
+        pass
+
+    def session_user(self):
+        for cookie in self.headers.get_all("Cookie", []):
+            for part in cookie.split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == COOKIE_NAME and value in self.server.sessions:
+                    return self.server.sessions[value], value
+        return None, None
+
+    def client(self):
+        user, token = self.session_user()
+        return token or self.client_address[0]
+
+    def send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data):
+        self.send(200, json.dumps(data), "application/json")
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def before(self):
+        # Latency and rate limit common to every endpoint, False when the request has been answered
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.is_rate_limited():
+            self.server.count("rate_limited")
+            self.send(429, TOO_MANY_REQUESTS_MESSAGE, "text/plain")
+            return False
+        return True
+
+    def do_GET(self):
+        body = self.read_body()
+        if not self.before():
+            return
+        path = unquote(self.path.split("?", 1)[0])
+
+        if path.startswith("/api/search/"):
+            self.server.count("searches")
+            results = self.server.fixtures.search(path[len("/api/search/"):])
+            self.send_json({"results": [{k: v for k, v in entry.items() if k != "srr"} for entry in results],
+                            "resultsCount": str(len(results))})
+        elif path.startswith("/download/srr/"):
+            self.download(path[len("/download/srr/"):])
+        elif path == "/":
+            user, _ = self.session_user()
+            self.send(200, f"<html><body>{'Logged in as ' + user if user else 'Login'}</body></html>")
+        else:
+            self.send(404, "Not found", "text/plain")
+
+    def do_POST(self):
+        body = self.read_body()
+        if not self.before():
+            return
+        path = unquote(self.path.split("?", 1)[0])
+
+        if path == "/account/login":
+            self.login(body)
+        elif path == "/release/upload":
+            self.upload(body)
+        else:
+            self.send(404, "Not found", "text/plain")
+
+    def login(self, body):
+        self.server.count("logins")
+        form = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+        if self.server.username and form.get("username") == self.server.username and form.get("password") == self.server.password:
+            token = secrets.token_hex(16)
+            with self.server.lock:
+                self.server.sessions[token] = self.server.username
+            self.send(200, "<html><body>Welcome</body></html>", headers={"Set-Cookie": f"{COOKIE_NAME}={token}; Path=/"})
+        else:
+            self.send(200, "<html><body>Wrong username or password</body></html>")
+
+    def download(self, release):
+        entry = self.server.fixtures.get(release)
+        if not entry or not os.path.isfile(entry["srr"]):
+            self.send(200, NOT_FOUND_MESSAGE, "text/plain")
+            return
+        if not self.server.take_download(self.client()):
+            self.server.count("quota_exceeded")
+            self.send(200, DAILY_LIMIT_MESSAGE, "text/plain")
+            return
+
+        self.server.count("downloads")
+        with open(entry["srr"], "rb") as f:
+            data = f.read()
+        self.send(200, data, "application/octet-stream",
+                  {"Content-Disposition": f'attachment; filename="{entry["release"]}.srr"'})
+
+    def upload(self, body):
+        user, _ = self.session_user()
+        if not user:
+            self.send(403, "Login required", "text/plain")
+            return
+
+        self.server.count("uploads")
+        message = BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode() + body)
+        files = []
+        for part in message.iter_parts():
+            name = part.get_filename()
+            if not name:
+                continue
+            data = part.get_payload(decode=True) or b""
+            release = os.path.splitext(os.path.basename(name))[0]
+            known = self.server.fixtures.get(release)
+            if self.server.upload_folder:
+                path = os.path.join(self.server.upload_folder, os.path.basename(name))
+                with open(path, "wb") as f:
+                    f.write(data)
+                if not known:
+                    self.server.fixtures.add(release, path)
+            if known:
+                files.append({"name": name, "color": 1, "message": "- The SRR already exists and is the same."})
+            else:
+                files.append({"name": name, "color": 2, "message": f"- {release} uploaded."})
+        self.send_json({"files": files})
+
+def arg_parse():
+    parser = argparse.ArgumentParser(description="Local stand-in of the srrdb.com endpoints")
+    parser.add_argument("--manifest", help="JSON manifest of the releases served")
+    parser.add_argument("--srr-dir", help="serve every .srr of this directory (needs rescene)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every response")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before answering 429 (0 = no limit)")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 429")
+    parser.add_argument("--daily-quota", type=int, default=0, help="SRR downloads per client (0 = no limit)")
+    parser.add_argument("--upload-dir", help="keep uploaded SRR in this directory and serve them")
+    return vars(parser.parse_args())
+
+def main():
+    args = arg_parse()
+    fixtures = Fixtures()
+    if args["manifest"]:
+        fixtures.load_manifest(args["manifest"])
+    if args["srr_dir"]:
+        fixtures.load_srr_dir(args["srr_dir"])
+    if not fixtures.releases and not args["upload_dir"]:
+        sys.exit("Nothing to serve, use --manifest, --srr-dir or --upload-dir")
+
+    server = StandInServer((args["host"], args["port"]), fixtures, args["username"], args["password"],
+                           args["latency_ms"] / 1000, args["rate_limit"], args["error_rate"], args["daily_quota"],
+                           args["upload_dir"])
+    print(f"Serving {len(fixtures.releases)} releases on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+
+if __name__ == "__main__":
+    main()
@@ -8,27 +8,51 @@ import sys
 import errno
 from colorama import init
 import shutil
-import zlib
 import json
 import tempfile
 import requests
 import time
+import atexit
+import functools
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-from utils.connect import SRRDB_LOGIN
+from utils.connect import SRRDB_LOGIN, SRRDB_POOL, DownloadQuota, SharedTokenBucket, DAILY_LIMIT_MESSAGE
 from utils.srr import SRR
 from utils.srs import SRS
+from utils.crccache import CRCCache
+from utils.hashpool import HashPool
+from utils.iosched import IOScheduler
+from utils.srrstore import SRRStore
+from utils.apicache import APICache
+from utils.walk import Walker
+from utils.fileindex import FileIndex
+from utils.profiler import StageProfiler
+from utils.runcontext import RunContext
+from utils.journal import Journal
+from utils.fingerprints import Fingerprints
 # Pyrescene source need to be installed
 from rescene.osohash import compute_hash
 import utils.res
 import utils.check_rls
+import utils.hasher
+import utils.sfv
+import utils.linker
+import utils.events
 
 # Globals variables
-release_list = dict()
-missing_files = []
-compressed_release = []
-scanned_nothing_found = []
-rls_check = []
-missing_rar = 0
+# Results of the run, a worker process of --workers has one per release
+ctx = RunContext()
+crc_cache = CRCCache(":memory:")
+hash_pool = None
+srr_store = None
+s = None
+srrdb = None
+quota = None
+file_index = FileIndex()
+journal = None
+fingerprints = None
 
 def arg_parse():
     parser = argparse.ArgumentParser(
@@ -55,6 +79,9 @@ def arg_parse():
                         help='verbose output for debugging purposes')
     parser.add_argument('--rename', action='store_true',
                         help='rename scene releases to their original scene filenames')
+    parser.add_argument('--link-mode', choices=utils.linker.MODES, default='copy',
+                        help='how files are copied by --rename and put in place when found on the local disk: '
+                        'auto tries hardlink, reflink, copy_file_range then copy (default: copy)')
     parser.add_argument('-x', '--extract-stored', action='store_true',
                         help='extract stored files from srr (nfo, sfv, etc)')
     parser.add_argument('-e', '--extension', action='append', default=[],
@@ -68,12 +95,44 @@ def arg_parse():
                         'nfo/sfv/proof and recreate sample')
     parser.add_argument('--check-crc', action='store_true',
                         help='check crc in sfv file when using --check-extras')
+    parser.add_argument('--full', action='store_true',
+                        help='with --check-extras, also check the releases unchanged since they passed a check')
     parser.add_argument('--keep-srr', action='store_true',
                         help='keep srr in output directory')
     parser.add_argument('--keep-srs', action='store_true',
                         help='keep srs in output directory')
     parser.add_argument('-s', '--search-srrdb', action='store_true',
                         help='check crc against srrdb and print release name')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of files hashed in parallel ahead of srrdb/reconstruct '
+                        'with -a/-j/-s and of .sfv entries verified with --check-crc/-g, '
+                        'with 1 every file is hashed when it is processed (default: 1)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of releases reconstructed/checked at the same time in worker processes '
+                        'with -a/-j/-k/-c, files are hashed and searched first (default: 1)')
+    parser.add_argument('--srrdb-jobs', type=int, default=4,
+                        help='maximum number of requests sent to srrdb at the same time (default: 4)')
+    parser.add_argument('--no-crc-cache', action='store_true',
+                        help='do not read or fill the persistent crc cache')
+    parser.add_argument('--prune-crc-cache', action='store_true',
+                        help='remove crc cache entries of deleted, modified or long unused files')
+    parser.add_argument('--refresh', action='store_true',
+                        help='ignore cached srrdb search results and query srrdb again')
+    parser.add_argument('--no-srr-cache', action='store_true',
+                        help='always download srr from srrdb instead of using the local srr cache')
+    parser.add_argument('--events', metavar='FILE',
+                        help='append a JSON line with the timings and outcome of every stage of every release to FILE')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile every stage and print the time and peak memory of each one at the end')
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help='with --profile, also write a .pstats file per stage into DIR')
+    parser.add_argument('--resume', action='store_true',
+                        help='go on with the last run, files and release dirs it finished are skipped')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='only process again the files and release dirs of the last run that ended missing, '
+                        'compressed or not found')
+    parser.add_argument('--persist-index', action='store_true',
+                        help='keep the index of the files used to find Sample/Proof/Subs between runs')
 
     return vars(parser.parse_args())
 
@@ -92,89 +151,115 @@ def progress_bar(current, total, bar_length=None):
     sys.stdout.flush()
 
 def search_by(search_type, value):
-    # Use search type by OSO hash or by CRC
-    if search_type == "archive-crc:" and len(value) != 8:
-        raise ValueError("CRC must have a length of 8")
-    if search_type == "isdbhash:" and not value:
-        raise ValueError("Release must have a valid OSO hash")
-
-    search_url = utils.res.SRRDB_API + f"{search_type}{value}"
-
-    try:
-        response = s.retrieve_content(search_url)
-        data = response.json()
-    except Exception as e:
-        raise e
-
-    # Check if the search returned any results
-    if 'resultsCount' not in data or int(data['resultsCount']) < 1:
-        return None
-
-    return data['results']
+    # Use search type by OSO hash or by CRC, the request may already be done or running in the srrdb pool
+    return srrdb.search_by(search_type, value).result()
 
 def calc_crc(fpath):
-    # Calculate CRC32 checksum
+    # Calculate CRC32 checksum, reuse the cached one if the file didn't change since it was hashed
     if not os.path.isfile(fpath):
         return None
 
-    prev = 0
-    with open(fpath, "rb") as file:
-        for line in file:
-            prev = zlib.crc32(line, prev)
+    st = os.stat(fpath)
+    cached_crc = crc_cache.get(fpath, st)
+    if cached_crc:
+        return cached_crc
 
-    return f"{prev & 0xFFFFFFFF:08X}"
+    # The OSO hash is computed in the same read and cached with the CRC for search_srrdb_crc
+    crc, oso_hash = utils.hasher.hash_file(fpath)
+    crc = utils.hasher.format_crc(crc)
+    crc_cache.set(fpath, crc, st, oso=oso_hash)
+    return crc
 
 def calc_oso(fname):
-    # Compute OSO hash
+    # Compute OSO hash, usually already cached by calc_crc
     if not os.path.isfile(fname):
         return None
 
+    oso_hash = crc_cache.get_oso(fname)
+    if oso_hash:
+        return oso_hash
+
     oso_hash, _ = compute_hash(fname)
     return oso_hash
 
-def copy_file(finput, foutput):
-    # Use to copy/rename file or dir
+def copy_file(finput, foutput, link_mode="copy"):
+    # Use to copy/rename file, foutput is the new file or the dir to put it in, with the strategies of --link-mode
     if not os.path.isfile(finput):
-        raise ValueError("finput must be a file")
-    if not os.path.isdir(foutput):
-        raise ValueError("foutput must be a directory")
-    if not os.path.splitext(finput)[1][0] != ".": # Ensure the input has a valid file extension
-        return None
+        return False, f"{finput} is not a file"
 
     try:
-        shutil.copy2(finput, foutput)
-    except IOError as e:
-        return None, f"Unable to copy/rename file: {e}"
+        utils.linker.link_file(finput, foutput, link_mode)
+    except (OSError, ValueError) as e:
+        return False, f"Unable to copy/rename file: {e}"
 
-    return True
+    return True, None
 
-def find_file(startdir, fname, fcrc):
-    # Use to find a file by CRC
+def find_file(startdir, fname, fcrc, fsize=None):
+    # Use to find a file by CRC, names come from the file index and files with another size than fsize are never hashed
     if not os.path.isdir(startdir):
         raise ValueError("startdir must be a directory")
 
-    for root, dirs, files in os.walk(startdir):
-        if fname in files:
-            file_path = os.path.join(root, fname)
-            if calc_crc(file_path) == fcrc.zfill(8): # Sample or Proof found
-                return file_path
+    for file_path in file_index.lookup(startdir, fname, fsize):
+        if calc_crc(file_path) == fcrc.zfill(8): # Sample or Proof found
+            return file_path
+
+    return False
 
+def set_step(release, step):
+    # Step of release_list done, saved in the journal at once so --resume doesn't do it again
+    ctx.release_list[release['release']][step] = True
+    if journal:
+        journal.set_step(release['release'], step)
+
+def init_steps(args, release, steps):
+    # Track the steps of a release, with --resume the ones done by the last run are already done
+    ctx.release_list[release['release']] = dict.fromkeys(steps, False)
+    if journal and args['resume']:
+        done = journal.get_steps(release['release'])
+        ctx.release_list[release['release']].update((step, done[step]) for step in steps)
+
+def skip_journaled(args, fpath):
+    # --resume skips what the last run finished, --retry-failed everything but what ended in a failure
+    if not journal:
+        return False
+    if args['retry_failed']:
+        return not journal.is_failed(fpath)
+    if args['resume']:
+        return journal.is_done(fpath)
     return False
 
+def record_failure(fpath, before):
+    # A file or release dir whose srrdb search found nothing is done too
+    failure = ctx.failure_since(before)
+    if journal and failure:
+        journal.finish(fpath, None, failure)
+
+def journaled(func):
+    # For process_file/process_dir, save the path as done with the failure it ended with, unless it has to be done again
+    @functools.wraps(func)
+    def wrapper(args, fpath, *rest):
+        before = ctx.failures()
+        result = func(args, fpath, *rest)
+        if journal and result:
+            journal.finish(fpath, rest[-1]['release'], ctx.failure_since(before))
+        return result
+    return wrapper
+
+@utils.events.timed("search_srrdb_crc", outcome=utils.events.truthy)
 def search_srrdb_crc(crc, rlspath):
     # Search srrdb API for releases matching the provided CRC32
-    global scanned_nothing_found
 
     utils.res.verbose("\t - Searching srrdb.com for matching CRC", end="")
     try:
         results = search_by("archive-crc:", crc)
     except Exception as e:
         utils.res.verbose(f"{utils.res.FAIL} -> {e}")
+        ctx.add_failure("search_failed", rlspath)
         return False
 
     if not results:
         utils.res.verbose(f"{utils.res.FAIL} -> No matching results")
-        scanned_nothing_found.append(rlspath)
+        ctx.add_failure("scanned_nothing_found", rlspath)
         return False
     else:
         utils.res.verbose(f"{utils.res.SUCCESS}")
@@ -185,9 +270,10 @@ def search_srrdb_crc(crc, rlspath):
         utils.res.verbose("\t - Searching srrdb.com for matching release name", end="")
         try:
             rlsname = os.path.basename(rlspath)
-            results = utils.res.search_by_name(rlsname, s, isdir = False)
+            results = srrdb.search_by_name(rlsname, isdir = False).result()
         except Exception as e:
             utils.res.verbose(f"{utils.res.FAIL} -> {e}")
+            ctx.add_failure("search_failed", rlspath)
             return False
 
         if not results or len(results) > 1: # Handle multiple or 0 releases having the same name, can be the filename used with -vaf or -vs
@@ -198,11 +284,12 @@ def search_srrdb_crc(crc, rlspath):
                 results = search_by("isdbhash:", OSOhash)
             except Exception as e:
                 utils.res.verbose(f"{utils.res.FAIL} -> {e}")
+                ctx.add_failure("search_failed", rlspath)
                 return False
 
             if not results or len(results) > 1: # Handle multiple or 0 releases having the same OSO hash
                 utils.res.verbose(f"\t\t {utils.res.FAIL} Nothing found or more than one release found matching OSO hash {OSOhash}. Maybe no SRR available on srrdb or you need to check it manually.")
-                scanned_nothing_found.append(rlsname)
+                ctx.add_failure("scanned_nothing_found", rlsname)
                 return False
             else:
                 utils.res.verbose(f"{utils.res.SUCCESS}")
@@ -211,84 +298,94 @@ def search_srrdb_crc(crc, rlspath):
 
     release = results[0]
     utils.res.verbose(f"\t\t - Matched release: {release['release']}")
+    utils.events.set_context(release=release['release'])
 
     return release
 
+@utils.events.timed("search_srrdb_dirname", outcome=utils.events.truthy)
 def search_srrdb_dirname(rlspath):
     # Search srrdb API for release matching the directory name
-    global scanned_nothing_found
 
     utils.res.verbose("\t - Searching srrdb.com for matching release name", end="")
     try:
         rlsname = os.path.basename(rlspath)
-        results = utils.res.search_by_name(rlsname, s, isdir = True)
+        results = srrdb.search_by_name(rlsname, isdir = True).result()
     except Exception as e:
         utils.res.verbose(f"{utils.res.FAIL} -> {e}")
+        ctx.add_failure("search_failed", rlspath)
         return False
 
     if not results or len(results) > 1:
         utils.res.verbose(f"{utils.res.FAIL} -> No matching results")
-        scanned_nothing_found.append(rlsname)
+        ctx.add_failure("scanned_nothing_found", rlsname)
         return False
     else:
         utils.res.verbose(f"{utils.res.SUCCESS}")
 
     release = results[0]
     utils.res.verbose(f"\t\t - Matched release: {release['release']}")
+    utils.events.set_context(release=release['release'])
 
     return release
 
-def is_valid_file(args, fpath):
-    # Check if the file is in a Sample directory or has an invalid extension etc...
+def is_valid_file(args, fpath, fsize=None):
+    # Check if the file is in a Sample directory or has an invalid extension etc... fsize comes from the traversal if known
     if os.path.basename(os.path.split(fpath)[0].lower()) == "Sample".lower():
         return False
     if os.path.splitext(fpath)[1].lower() not in args['extension']:
         return False
-    if args['min_filesize'] and os.path.getsize(fpath) < args['min_filesize']:
+    if args['min_filesize'] and (os.path.getsize(fpath) if fsize is None else fsize) < args['min_filesize']:
         return False
     return True
 
+@utils.events.timed("process_crc", outcome=utils.events.truthy)
 def process_crc(args, fpath):
     # This function is used only for potential release to rescene not Sample/Proof CRC calc
-    global scanned_release
 
     utils.res.verbose(f"{utils.res.DARK_YELLOW}* Found potential file:{utils.res.RESET} {os.path.basename(fpath)}")
     utils.res.verbose(f"\t - Calculating crc for file: {fpath}", end="")
-    scanned_release += 1
-    release_crc = calc_crc(fpath)
+    ctx.scanned_release += 1
+    utils.events.add_bytes(os.path.getsize(fpath))
+    future = hash_pool.pop(fpath) if hash_pool else None
+    release_crc = future.result() if future else calc_crc(fpath)
     if not release_crc:
         utils.res.verbose(f"{utils.res.FAIL}")
     else:
         utils.res.verbose(f"{utils.res.SUCCESS} -> {release_crc}")
     return release_crc
 
-def search_file(args, fpath):
+def search_file(args, fpath, fsize=None):
     # When -vs command is called
-    global success_release
-    global scanned_release
 
-    if not is_valid_file(args, fpath):
+    if not is_valid_file(args, fpath, fsize):
+        return False
+    if skip_journaled(args, fpath):
+        ctx.skipped_release += 1
         return False
 
+    utils.events.set_context(path=fpath)
+    before = ctx.failures()
     release_crc = process_crc(args, fpath)
     if not release_crc:
         return False
 
     release = search_srrdb_crc(release_crc, fpath)
     if not release:
+        record_failure(fpath, before)
         return False
     else:
         #keep track of the releases we are processing
-        if not release['release'] in release_list:
-            release_list[release['release']] = dict()
-            release_list[release['release']]['search'] = False
-        elif release_list[release['release']]['search']:
+        if not release['release'] in ctx.release_list:
+            init_steps(args, release, ['search'])
+        if ctx.release_list[release['release']]['search']:
             utils.res.verbose("\t - Skipping, already processed.")
-            scanned_release -= 1
+            ctx.scanned_release -= 1
             return True
 
-    release_list[release['release']]['search'] = True
-    success_release += 1
+    set_step(release, 'search')
+    ctx.success_release += 1
+    if journal:
+        journal.finish(fpath, release['release'])
     return True
 
 def process_release_directory(args, release, doutput):
@@ -307,30 +404,53 @@ def process_release_directory(args, release, doutput):
     utils.res.verbose(f"\t - Setting output directory to: {doutput}")
     return doutput
 
+@utils.events.timed("download_srr", outcome=utils.events.truthy)
 def download_srr(release):
-    # Download .srr file from srrdb.com
+    # Download .srr file from srrdb.com or use the one already in the local srr cache
+    if srr_store:
+        srr_path = srr_store.get(release)
+        if srr_path:
+            utils.res.verbose(f"\t - Using SRR from local cache{utils.res.SUCCESS}")
+            utils.events.set_outcome("cached")
+            return srr_path
+
+    # Keep the last downloads of the day, the release is reported at the end to be run again later
+    if quota and quota.nearly_exhausted():
+        utils.res.verbose(f"\t - {utils.res.WARNING}Daily download limit nearly reached, SRR download deferred")
+        ctx.add_deferred(release)
+        utils.events.set_outcome("deferred")
+        return None
+
     utils.res.verbose("\t - Downloading SRR from srrdb.com", end="")
     try:
-        srr_path = utils.res.download_srr(release, s)
+        srr_path = srrdb.download_srr(release, srr_store).result()
     except Exception as e:
         utils.res.verbose(f"{utils.res.FAIL} -> {e}")
+        if DAILY_LIMIT_MESSAGE in str(e.__cause__ or e):
+            if quota:
+                quota.mark_exhausted()
+            ctx.add_deferred(release)
         return None
     else:
         utils.res.verbose(f"{utils.res.SUCCESS}")
+        utils.events.add_bytes(os.path.getsize(srr_path))
+        if quota:
+            quota.record()
         return srr_path
 
-def rename_file_if_needed(fpath, doutput, srr_finfo):
+def rename_file_if_needed(args, fpath, doutput, srr_finfo):
     # Only when --rename command is called
     if len(srr_finfo) != 1:
         return False
     if srr_finfo[0].file_name != os.path.basename(fpath):
         utils.res.verbose(f"\t\t - file has been renamed, renaming to: {srr_finfo[0].file_name}", end="")
-        (ret, mesg) = copy_file(fpath, os.path.join(doutput, srr_finfo[0].file_name))
+        (ret, mesg) = copy_file(fpath, os.path.join(doutput, srr_finfo[0].file_name), args['link_mode'])
         if not ret:
             utils.res.verbose(f"{utils.res.FAIL} -> {mesg}")
         else:
             utils.res.verbose(f"{utils.res.SUCCESS}")
 
+@utils.events.timed("extract_stored_files", outcome=utils.events.truthy)
 def extract_stored_files(release_srr, doutput, release, srr_finfo):
     # Extract stored files from .srr file based on regex filter
     utils.res.verbose("\t - Extracting stored files from SRR")
@@ -346,6 +466,7 @@ def extract_stored_files(release_srr, doutput, release, srr_finfo):
         # Save path for Sample/Proof and fix crashed when multiple .srs or Proofs
         for match in matches:
             utils.res.verbose(f"\t\t - {os.path.relpath(match[0], doutput)}{utils.res.SUCCESS}")
+            utils.events.add_bytes(os.path.getsize(match[0]))
             if srs_path is None and match[0].lower().endswith(".srs"):
                 srs_path = match[0]
             if proof_path is None and match[0].lower().endswith((".jpg", ".jpeg", ".png")):
@@ -354,15 +475,14 @@ def extract_stored_files(release_srr, doutput, release, srr_finfo):
         # Check if subtitle directories exist
         sub_dirs = ["Sub", "Subs", "Subpack", "Subtitles"]
         if not any(os.path.exists(os.path.join(doutput, sub_dir)) for sub_dir in sub_dirs):
-            release_list[release['release']]['resubs'] = True
+            set_step(release, 'resubs')
 
-    release_list[release['release']]['extract'] = True
+    set_step(release, 'extract')
     return srs_path, proof_path
 
+@utils.events.timed("reconstruct_rars")
 def reconstruct_rars(args, release_srr, fpath, doutput, srr_finfo, release):
     # Attempt to reconstruct original RARs from .srr only for releases not Subs
-    global success_release
-    global missing_rar
 
     utils.res.verbose("\t - Reconstructing original RARs from SRR", end="")
     rename_hints = {srr_finfo[0].file_name: os.path.basename(fpath)}
@@ -373,17 +493,23 @@ def reconstruct_rars(args, release_srr, fpath, doutput, srr_finfo, release):
         release_srr.reconstruct_rars(os.path.dirname(fpath), doutput, rename_hints, utils.res.RAR_VERSION, utils.res.SRR_TEMP_FOLDER)
     except Exception as e:
         utils.res.verbose(f"{utils.res.FAIL} -> {e}")
-        missing_rar += 1
+        utils.events.set_outcome("fail", error=str(e))
+        ctx.missing_rar += 1
         if release_srr.get_is_compressed():
-            compressed_release.append(release['release'])
+            ctx.add_failure("compressed_release", release['release'])
+        else:
+            # Nothing to list, the RARs are still missing for the journal
+            ctx.count_failure("missing_files")
     else:
         utils.res.verbose(f"{utils.res.SUCCESS}")
+        utils.events.add_bytes(release_srr.get_rars_size())
 
-    release_list[release['release']]['rescene'] = True
-    if missing_rar == 0:
-        success_release += 1
-    missing_rar = 0
+    set_step(release, 'rescene')
+    if ctx.missing_rar == 0:
+        ctx.success_release += 1
+    ctx.missing_rar = 0
 
+@utils.events.timed("recreate_sample")
 def recreate_sample(args, release, release_srr, fpath, doutput, srs_path):
     if not srs_path:
         # Extract .srs file if something going wrong when we save the path before
@@ -391,9 +517,11 @@ def recreate_sample(args, release, release_srr, fpath, doutput, srs_path):
         release_srs = release_srr.get_srs(doutput)
         if not release_srs:
             utils.res.verbose(f"\t - No SRS found for sample recreation {utils.res.FAIL}")
+            utils.events.set_outcome("no_srs")
             return
         elif len(release_srs) > 1:
             utils.res.verbose(f"{utils.res.FAIL} -> more than one SRS in this SRR. Please reconstruct manually.")
+            utils.events.set_outcome("fail")
             return None
         else:
             srs_path = release_srs[0]
@@ -406,6 +534,7 @@ def recreate_sample(args, release, release_srr, fpath, doutput, srs_path):
     except Exception as e:
         utils.res.verbose("-------------------------------")
         utils.res.verbose(f"\t - {utils.res.FAIL} -> failed to recreate sample: {e}.")
+        utils.events.set_outcome("fail", error=str(e))
         if os.path.exists(fpath):
             try:
                 utils.res.verbose("\t We can try with ReSample .NET 1.2 sometimes it can work...")
@@ -420,36 +549,37 @@ def recreate_sample(args, release, release_srr, fpath, doutput, srs_path):
         # Attempt to find the sample on local disk if recreation fails when -vaf or -f command is called
         if args['find_sample']:
             utils.res.verbose("\t - Searching for sample on local disk")
-            sample_file = find_file(os.path.dirname(fpath), sample.get_filename(), sample.get_crc())
+            sample_file = find_file(os.path.dirname(fpath), sample.get_filename(), sample.get_crc(), sample.get_filesize())
             if sample_file:
                 utils.res.verbose(f"\t\t - {utils.res.SUCCESS} - Found sample -> {sample_file}")
                 try:
-                    shutil.move(sample_file, os.path.dirname(srs_path))
+                    utils.linker.move_file(sample_file, os.path.dirname(srs_path), args['link_mode'])
                     if not args['keep_srs'] and os.path.exists(srs_path):
                         os.remove(srs_path)
                 except Exception as e:
                     utils.res.verbose(f"\t\t - {utils.res.FAIL} - Could not copy file to {os.path.dirname(srs_path)} -> {e}")
-                    missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+                    ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
                     if not args['keep_srs'] and os.path.exists(srs_path):
                         os.remove(srs_path)
             else:
-                missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+                ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
                 if not args['keep_srs'] and os.path.exists(srs_path):
                     os.remove(srs_path)
         else:
-            missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+            ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
             if not args['keep_srs'] and os.path.exists(srs_path):
                 os.remove(srs_path)
     else:
         utils.res.verbose("-------------------------------")
         utils.res.verbose(f"\t - {utils.res.SUCCESS} -> sample recreated successfully")
+        utils.events.add_bytes(sample.get_filesize())
         if not args['keep_srs']:
             if os.path.exists(srs_path):
                 os.remove(srs_path)
             else:
                 utils.res.verbose("\t - Impossible to delete no SRS found %s" % (utils.res.FAIL))
 
-    release_list[release['release']]['resample'] = True
+    set_step(release, 'resample')
 
 def find_sub_files_by_extension(root_dir, extension):
     # Search for all files with a specific extension in a directory tree
@@ -628,32 +758,43 @@ def generate_relative_path(fpath, sfv_p, filename):
 
 def add_to_missing_files(fpath, sfv_p, filename):
     # Add the relative path to the missing files list if it's not already present
-    global missing_rar
-    global missing_files
 
     relative_path = generate_relative_path(fpath, sfv_p, filename)
-    if relative_path.lower() not in [f.lower() for f in missing_files]:
-        missing_files.append(relative_path)
-        missing_files = list(dict.fromkeys(missing_files)) # Remove duplicates
-        missing_rar += 1
+    if relative_path.lower() not in [f.lower() for f in ctx.missing_files]:
+        ctx.add_failure("missing_files", relative_path)
+        ctx.missing_files = list(dict.fromkeys(ctx.missing_files)) # Remove duplicates
+        ctx.missing_rar += 1
+    else:
+        # Already listed, the release being processed failed all the same
+        ctx.count_failure("missing_files")
 
 def remove_from_missing_files(fpath, sfv_p, full_path):
     # Remove the relative path from the missing files list if we have successfully founded it or rebuilded it
-    global missing_files
 
     relative_path = generate_relative_path(fpath, sfv_p, os.path.basename(full_path))
-    missing_files[:] = [f for f in missing_files if f.lower() != relative_path.lower()]
+    ctx.missing_files[:] = [f for f in ctx.missing_files if f.lower() != relative_path.lower()]
+
+def get_subs_rar_size(sub_srr, filename):
+    # Size of a Subs .rar from the Subs .srr, None if no SRR knows it
+    for srr_file in sub_srr:
+        try:
+            size = SRR(srr_file).get_rar_size(filename)
+        except Exception:
+            continue
+        if size is not None:
+            return size
+    return None
 
 def fix_missing_file(full_path, filename, crc, sfv_p, fpath, sub_srr, sfv_file, args, release):
     # Attempt to find the missing Subs .rar file on the local disk with CRC, can be in right place but not with good name
     utils.res.verbose(f"\t\t - {utils.res.FAIL} -> Be careful missing Subs file: {filename}")
     utils.res.verbose("\t - Searching for Subs on local disk")
 
-    subs_file = find_file(os.path.dirname(fpath), filename, crc.upper())
+    subs_file = find_file(os.path.dirname(fpath), filename, crc.upper(), get_subs_rar_size(sub_srr, filename))
     if subs_file:
         utils.res.verbose(f"\t\t - {utils.res.SUCCESS} - Found Subs -> {subs_file}")
         try:
-            shutil.move(subs_file, os.path.dirname(sfv_file))
+            utils.linker.move_file(subs_file, os.path.dirname(sfv_file), args['link_mode'])
             cleanup_files(args, release, sub_srr)
             return True
         except Exception as e:
@@ -665,45 +806,36 @@ def fix_missing_file(full_path, filename, crc, sfv_p, fpath, sub_srr, sfv_file,
     add_to_missing_files(fpath, sfv_p, filename)
     return False
 
-def validate_crc(full_path, fpath, sfv_p, expected_crc):
-    # Final check after we try to rebuilt it or search it, exept with -vc or -vc --check-crc we try it first
-    hash_crc = calc_crc(full_path)
-    if not hash_crc:
-        hash_crc = ""
-
-    if hash_crc.lower() == expected_crc.lower():
-        utils.res.verbose(f"\t\t - {utils.res.SUCCESS} -> {os.path.basename(full_path)} {hash_crc.upper()}")
-        # Remove the relative path from missing_files if it exists or finally rebuilded or founded
-        remove_from_missing_files(fpath, sfv_p, full_path)
+def report_crc(result, fpath, sfv_p):
+    # Print the SFVResult of a file that exists and keep missing_files up to date
+    if result.status == utils.sfv.OK:
+        utils.res.verbose(f"\t\t - {utils.res.SUCCESS} -> {os.path.basename(result.path)} {result.actual}")
+        remove_from_missing_files(fpath, sfv_p, result.path)
         return True
-    else:
-        utils.res.verbose(f"\t\t - {utils.res.FAIL} -> {os.path.basename(full_path)} our hash {hash_crc.upper()} does not match {expected_crc.upper()}")
-        # Add the relative path to missing_files if not already present
-        add_to_missing_files(fpath, sfv_p, os.path.basename(full_path))
-        return False
+
+    utils.res.verbose(f"\t\t - {utils.res.FAIL} -> {os.path.basename(result.path)} our hash {result.actual} does not match {result.expected}")
+    add_to_missing_files(fpath, sfv_p, os.path.basename(result.path))
+    return False
 
 def check_crc_and_fix(sfv_file, fpath, sub_srr, sub_file, idx_file, args, release):
-    # Open and read the Subs .sfv file line by line
+    # Verify every Subs .rar of the Subs .sfv, the missing ones are searched on the local disk
     utils.res.verbose(f"\t - Checking if RAR for Subs have good CRC in {os.path.dirname(sfv_file)}")
     try:
-        with open(sfv_file, "r") as sfv_f:
-            sfv_p = os.path.dirname(sfv_file)
-            for line in sfv_f:
-                if line[0] == ';':
-                    continue
-                filename, _, crc = line.rstrip().rpartition(' ')
-                if not filename or not crc:
-                    continue
-                full_path = os.path.join(fpath, os.path.join(sfv_p, filename))
-                if not os.path.exists(full_path):
-                    return fix_missing_file(full_path, filename, crc, sfv_p, fpath, sub_srr, sfv_file, args, release) # Subs .rar missing we try to find it
-                else:
-                    return validate_crc(full_path, fpath, sfv_p, crc) # Subs .rar exist we need to check his CRC
-
+        results = utils.sfv.SFVVerifier(calc_crc, args['jobs']).verify(sfv_file)
     except Exception as e:
         utils.res.verbose(f"\t\t - {utils.res.FAIL} - Could not open SFV file {sfv_file} -> {e}")
         return False
 
+    sfv_p = os.path.dirname(sfv_file)
+    fixed = True
+    for result in results:
+        if result.status == utils.sfv.MISSING:
+            # Subs .rar missing we try to find it
+            fixed = fix_missing_file(os.path.join(sfv_p, result.name), result.name, result.expected, sfv_p, fpath, sub_srr, sfv_file, args, release) and fixed
+        else:
+            fixed = report_crc(result, fpath, sfv_p) and fixed
+    return fixed
+
 def find_sub_files(doutput, fpath):
     # Function to search and save the path of every .sub, .idx and .srr file
     sub_srr = []
@@ -734,6 +866,7 @@ def find_sub_files(doutput, fpath):
 
     return sub_srr, sub_file, idx_file
 
+@utils.events.timed("process_subtitles", outcome=lambda result: "fail" if result is False else "ok")
 def process_subtitles(args, fpath, doutput, release):
     # Function to manage the start of Subs reconstruction only with -vaf or --resubs
     sub_srr = []
@@ -777,43 +910,46 @@ def process_subtitles(args, fpath, doutput, release):
         check_crc_and_fix(sfv_file, fpath, sub_srr, sub_file, idx_file, args, release) # If rebuild success or failed can search or calc CRC
 
     cleanup_files(args, release, sub_srr) # Clean everything
-    release_list[release['release']]['resubs'] = True
-
-def check_file(args, fpath):
-    # Main function for -vaf or every single --rename, --rescene, etc... commands
-    global missing_rar
-    global success_release
-    global scanned_release
-    global rls_check
+    set_step(release, 'resubs')
 
-    if not is_valid_file(args, fpath):
-        return False
-
-    if args['output']:
-        doutput = args['output']
-    else:
-        doutput = os.path.dirname(fpath)
+def lookup_file(args, fpath, fsize=None):
+    # First half of check_file, CRC and srrdb search, gives the arguments of process_file when a release is found
+    if not is_valid_file(args, fpath, fsize):
+        return None
+    if skip_journaled(args, fpath):
+        ctx.skipped_release += 1
+        return None
 
-    missing_rar = 0
+    utils.events.set_context(path=fpath)
+    before = ctx.failures()
     release_crc = process_crc(args, fpath)
     if not release_crc:
-        return False
+        return None
 
     release = search_srrdb_crc(release_crc, fpath)
     if not release:
-        return False
+        record_failure(fpath, before)
+        return None
+
+    return fpath, release_crc, release
+
+@journaled
+def process_file(args, fpath, release_crc, release):
+    # Second half of check_file, run in a worker process with --workers
+    if args['output']:
+        doutput = args['output']
     else:
-        #keep track of the releases we are processing
-        if not release['release'] in release_list:
-            release_list[release['release']] = dict()
-            release_list[release['release']]['rescene'] = False
-            release_list[release['release']]['resample'] = False
-            release_list[release['release']]['extract'] = False
-            release_list[release['release']]['resubs'] = False
-        elif release_list[release['release']]['rescene'] and release_list[release['release']]['extract'] and release_list[release['release']]['resample'] and release_list[release['release']]['resubs']:
-            utils.res.verbose("\t - Skipping, already processed.")
-            scanned_release -= 1
-            return True
+        doutput = os.path.dirname(fpath)
+
+    utils.events.set_context(path=fpath, release=release['release'])
+    ctx.start_release()
+    #keep track of the releases we are processing
+    if not release['release'] in ctx.release_list:
+        init_steps(args, release, ['rescene', 'resample', 'extract', 'resubs'])
+    if all(ctx.release_list[release['release']].values()):
+        utils.res.verbose("\t - Skipping, already processed.")
+        ctx.scanned_release -= 1
+        return True
 
     release_douput = process_release_directory(args, release, doutput)
     srr_path = download_srr(release['release'])
@@ -824,36 +960,48 @@ def check_file(args, fpath):
     srr_finfo = release_srr.get_archived_fname_by_crc(release_crc)
 
     if args['rename']:
-        rename_file_if_needed(fpath, release_douput, srr_finfo)
+        rename_file_if_needed(args, fpath, release_douput, srr_finfo)
 
-    if (args['extract_stored'] or args['auto_reconstruct']) and not release_list[release['release']]['extract']:
+    # The SRS is extracted again by recreate_sample when the stored files were extracted by an earlier run
+    srs = None
+    if (args['extract_stored'] or args['auto_reconstruct']) and not ctx.release_list[release['release']]['extract']:
         srs, proof = extract_stored_files(release_srr, release_douput, release, release_srr.get_rars_name())
 
-    if (args['rescene'] or args['auto_reconstruct']) and not release_list[release['release']]['rescene']:
+    if (args['rescene'] or args['auto_reconstruct']) and not ctx.release_list[release['release']]['rescene']:
         reconstruct_rars(args, release_srr, fpath, release_douput, srr_finfo, release)
 
-    if (args['resample'] or args['auto_reconstruct']) and not release_list[release['release']]['resample']:
+    if (args['resample'] or args['auto_reconstruct']) and not ctx.release_list[release['release']]['resample']:
         if release['hasSRS'] != "yes":
             utils.res.verbose(f"\t - No SRS found for sample recreation {utils.res.FAIL}")
-            release_list[release['release']]['resample'] = True
+            set_step(release, 'resample')
         else:
             recreate_sample(args, release, release_srr, fpath, release_douput, srs)
 
-    if (args['resubs'] or args['auto_reconstruct']) and not release_list[release['release']]['resubs']:
+    if (args['resubs'] or args['auto_reconstruct']) and not ctx.release_list[release['release']]['resubs']:
         process_subtitles(args, fpath, release_douput, release)
 
-    if missing_rar > 0:
-        success_release -= 1
+    if ctx.missing_rar > 0:
+        ctx.success_release -= 1
 
-    chk = utils.check_rls.run_checks(release_douput)
+    with utils.events.stage("run_checks") as event:
+        chk = utils.check_rls.run_checks(release_douput)
+        if event is not None:
+            event["findings"] = len(chk)
     for c in chk:
         utils.res.verbose(c)
-    rls_check.extend(chk)
+    ctx.rls_check.extend(chk)
+    return True
+
+def check_file(args, fpath, fsize=None):
+    # Main function for -vaf or every single --rename, --rescene, etc... commands
+    found = lookup_file(args, fpath, fsize)
+    if not found:
+        return False
+
+    return process_file(args, *found)
 
 def handle_rar_check(fpath, release_srr, release, srr_finfo):
     # Function if -vc command called, we check only the presence of every files inside the .srr
-    global missing_rar
-    global success_release
 
     # If its a RAR release
     if srr_finfo:
@@ -862,8 +1010,8 @@ def handle_rar_check(fpath, release_srr, release, srr_finfo):
             full_match_path = os.path.join(fpath, os.path.normpath(match))
             if not os.path.exists(full_match_path):
                 utils.res.verbose(f"\t\t - {utils.res.FAIL} -> Be careful missing RAR file: {os.path.normpath(match)}")
-                missing_files.append(os.path.join(release['release'], os.path.normpath(match)))
-                missing_rar += 1
+                ctx.add_failure("missing_files", os.path.join(release['release'], os.path.normpath(match)))
+                ctx.missing_rar += 1
             else:
                 utils.res.verbose(f"\t\t - {utils.res.SUCCESS} -> {os.path.normpath(match)}")
 
@@ -875,58 +1023,43 @@ def handle_rar_check(fpath, release_srr, release, srr_finfo):
             full_match_path = os.path.join(fpath, os.path.normpath(match))
             if not os.path.exists(full_match_path):
                 utils.res.verbose(f"\t\t - {utils.res.FAIL} -> Be careful missing file: {os.path.normpath(match)}")
-                missing_files.append(os.path.join(release['release'], os.path.normpath(match)))
-                missing_rar += 1
+                ctx.add_failure("missing_files", os.path.join(release['release'], os.path.normpath(match)))
+                ctx.missing_rar += 1
             else:
                 utils.res.verbose(f"\t\t - {utils.res.SUCCESS} -> {os.path.normpath(match)}")
 
-    release_list[release['release']]['rescene'] = True
-    if missing_rar == 0:
-        success_release += 1
-    missing_rar = 0
+    set_step(release, 'rescene')
+    if ctx.missing_rar == 0:
+        ctx.success_release += 1
+    ctx.missing_rar = 0
 
-def handle_crc_check(fpath, release_srr, release, srr_finfo):
+def handle_crc_check(args, fpath, release_srr, release, srr_finfo):
     # Function if -vc --check-crc command called, we check CRC present inside the .sfv so we can handle both, RAR release or music/mvid release
-    global missing_rar
-    global success_release
 
     stored_files = release_srr.get_stored_files_name()
     sfv_paths = [os.path.join(fpath, os.path.normpath(fname)) for fname in stored_files if fname.endswith(".sfv")]
 
     utils.res.verbose(f"\t - Checking if all RAR have good CRC in {fpath}")
+    verifier = utils.sfv.SFVVerifier(calc_crc, args['jobs'])
     for sfv in sfv_paths:
         try:
-            with open(sfv, "r") as sfv_f:
-                sfv_p = os.path.dirname(sfv)
-                for line in sfv_f:
-                    if line.startswith(';'):
-                        continue
-                    filename, _, crc = line.rstrip().rpartition(' ')
-                    if not filename or not crc:
-                        continue
-
-                    full_file_path = os.path.join(sfv_p, filename)
-                    if not os.path.exists(full_file_path):
-                        utils.res.verbose(f"\t\t - {utils.res.FAIL} -> Be careful missing RAR file: {filename}")
-                        add_to_missing_files(fpath, sfv_p, filename)
-                        continue
-                    hash = calc_crc(full_file_path)
-                    if not hash:
-                        hash = ""
-                    if hash.lower() == crc.lower():
-                        utils.res.verbose(f"\t\t - {utils.res.SUCCESS} -> {filename} {hash.upper()}")
-                    else:
-                        utils.res.verbose(f"\t\t - {utils.res.FAIL} -> {filename} our hash {hash.upper()} does not match {crc.upper()}")
-                        add_to_missing_files(fpath, sfv_p, filename)
-
+            results = verifier.verify(sfv)
         except Exception as e:
             utils.res.verbose(f"\t\t - {utils.res.FAIL} - Could not open sfv file {sfv} -> {e}")
             continue
 
-    release_list[release['release']]['rescene'] = True
-    if missing_rar == 0:
-        success_release += 1
-    missing_rar = 0
+        sfv_p = os.path.dirname(sfv)
+        for result in results:
+            if result.status == utils.sfv.MISSING:
+                utils.res.verbose(f"\t\t - {utils.res.FAIL} -> Be careful missing RAR file: {result.name}")
+                add_to_missing_files(fpath, sfv_p, result.name)
+            else:
+                report_crc(result, fpath, sfv_p)
+
+    set_step(release, 'rescene')
+    if ctx.missing_rar == 0:
+        ctx.success_release += 1
+    ctx.missing_rar = 0
 
 def handle_sample_reconstruction(args, release_srr, release, fpath, srs_path, doutput, srr_finfo):
     # When -vc is called with or without --check-crc we try to find the sample first but we need the .srs file to have his CRC
@@ -946,18 +1079,18 @@ def handle_sample_reconstruction(args, release_srr, release, fpath, srs_path, do
     if srs_path:
         sample = SRS(srs_path)
         utils.res.verbose("\t - Searching for sample on local disk")
-        sample_file = find_file(os.path.dirname(fpath), sample.get_filename(), sample.get_crc())
+        sample_file = find_file(os.path.dirname(fpath), sample.get_filename(), sample.get_crc(), sample.get_filesize())
         if sample_file:
             utils.res.verbose(f"\t\t - {utils.res.SUCCESS} - Found sample -> {sample_file}")
             if os.path.dirname(sample_file.lower()) != os.path.dirname(srs_path.lower()): # We found it but it can be rename or not in the good place
                 try:
-                    shutil.move(sample_file, os.path.dirname(srs_path))
-                    release_list[release['release']]['resample'] = True
+                    utils.linker.move_file(sample_file, os.path.dirname(srs_path), args['link_mode'])
+                    set_step(release, 'resample')
                     if not args['keep_srs'] and os.path.exists(srs_path):
                         os.remove(srs_path)
                 except Exception as e:
                     utils.res.verbose(f"\t\t - {utils.res.FAIL} - Could not copy file to {os.path.dirname(srs_path)} -> {e}")
-                    missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+                    ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
                     if not args['keep_srs'] and os.path.exists(srs_path):
                         os.remove(srs_path)
             else:
@@ -977,13 +1110,13 @@ def handle_sample_reconstruction(args, release_srr, release, fpath, srs_path, do
 
                         if fail == True:
                             utils.res.verbose(f"\t - {utils.res.FAIL} -> failed to recreate sample with ReSample .NET 1.2.")
-                            missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+                            ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
                             if not args['keep_srs'] and os.path.exists(srs_path):
                                 os.remove(srs_path)
 
                     except Exception as e:
                         utils.res.verbose(f"\t - {utils.res.FAIL} -> failed to recreate sample with ReSample .NET 1.2: {e}.")
-                        missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
+                        ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(srs_path)), sample.get_filename()))
                         if not args['keep_srs'] and os.path.exists(srs_path):
                             os.remove(srs_path)
                 else:
@@ -992,7 +1125,7 @@ def handle_sample_reconstruction(args, release_srr, release, fpath, srs_path, do
             else:
                 utils.res.verbose("-------------------------------")
                 utils.res.verbose(f"\t - {utils.res.SUCCESS} -> sample recreated successfully")
-                release_list[release['release']]['resample'] = True
+                set_step(release, 'resample')
                 if not args['keep_srs'] and os.path.exists(srs_path):
                     os.remove(srs_path)
 
@@ -1001,18 +1134,22 @@ def check_proof_and_sample(args, release_srr, release, fpath, proof_path, srs_pa
     if proof_path:
         utils.res.verbose("\t - Searching for Proof on local disk")
         proof_crc = calc_crc(proof_path)
-        proof_file = find_file(os.path.dirname(fpath), os.path.basename(*release_srr.get_proof_filename()), proof_crc) # We use CRC to find the .jpg
+        proof_file = find_file(os.path.dirname(fpath), os.path.basename(*release_srr.get_proof_filename()), proof_crc, os.path.getsize(proof_path)) # We use CRC to find the .jpg
         if proof_file and proof_file.lower() == proof_path.lower():
             utils.res.verbose(f"\t\t - {utils.res.SUCCESS} - Found proof -> {proof_file}")
         if proof_file and proof_file.lower() != proof_path.lower(): # We found it but maybe the Proof is renamed or not in the right place
             utils.res.verbose(f"\t\t - {utils.res.SUCCESS} - Found proof -> {proof_file}")
             try:
-                copy_file(proof_file, os.path.dirname(proof_path))
-                if not args['keep_srs'] and os.path.exists(proof_file):
-                    os.remove(proof_file)
+                if args['keep_srs']:
+                    (ret, mesg) = copy_file(proof_file, os.path.dirname(proof_path), args['link_mode'])
+                    if not ret:
+                        raise OSError(mesg)
+                else:
+                    # A symlink would be left pointing to the removed proof, move it instead
+                    utils.linker.move_file(proof_file, os.path.dirname(proof_path), args['link_mode'])
             except Exception as e:
                 utils.res.verbose(f"\t\t - {utils.res.FAIL} - Could not copy proof file to {os.path.dirname(proof_path)} -> {e}")
-                missing_files.append(os.path.join(release['release'], os.path.basename(os.path.dirname(proof_path)), release_srr.get_proof_filename()))
+                ctx.add_failure("missing_files", os.path.join(release['release'], os.path.basename(os.path.dirname(proof_path)), release_srr.get_proof_filename()))
 
     # We can know if the .srr file have .srs inside or not
     if release['hasSRS'] == "yes" and srr_finfo:
@@ -1047,7 +1184,7 @@ def check_subtitles(args, fpath, doutput, release):
 
     # We can't know in an other way that find a .sfv file inside a Subs dir if the release have a Subs or not
     if not sub_sfv or not any(os.path.exists(sfv) for sfv in sub_sfv):
-        release_list[release['release']]['resubs'] = True
+        set_step(release, 'resubs')
         return # Maybe the release don't have a Subs .rar
 
     for sfv_file in sub_sfv:
@@ -1057,40 +1194,74 @@ def check_subtitles(args, fpath, doutput, release):
 
     cleanup_files(args, release, sub_srr) # Clean .srr etc...
 
-def check_dir(args, fpath):
-    # Main function for -vc and -vc --check-crc command
-    global missing_rar
-    global success_release
-    global scanned_release
-    global rls_check
+def is_release_dir(fpath):
+    # Release sub dirs are never checked as a release
+    pattern = r'(dvd|cd|dis[ck])[0-9][0-9]?|samples?|proofs?|subs?|subpacks?|subtitles?'
+    return not re.search(pattern, os.path.basename(fpath), re.IGNORECASE)
 
+def check_mode(args):
+    return "crc" if args['check_crc'] else "rar"
+
+def get_unchanged(args, fpath):
+    # What a release dir unchanged since it passed a -c check gave, None if it has to be checked
+    if not fingerprints or args['full'] or not args['check_extras']:
+        return None
+    return fingerprints.get(fpath, check_mode(args), srr_store)
+
+def prefetch_dir(args, fpath):
+    # Send the srrdb search of a release dir to the srrdb pool, unless it won't be needed
+    if is_release_dir(fpath) and not skip_journaled(args, fpath) and not get_unchanged(args, fpath):
+        srrdb.search_by_name(os.path.basename(fpath), isdir = True)
+
+def lookup_dir(args, fpath):
+    # First half of check_dir, srrdb search of the dir name, gives the arguments of process_dir when a release is found
     # We don't want to check these dirs
-    pattern = r'(dvd|cd|dis[ck])[0-9][0-9]?|samples?|proofs?|subs?|subpacks?|subtitles?'
-    if re.search(pattern, os.path.basename(fpath), re.IGNORECASE):
-        return False
+    if not is_release_dir(fpath):
+        return None
+    if skip_journaled(args, fpath):
+        ctx.skipped_release += 1
+        return None
 
+    utils.res.verbose(f"{utils.res.DARK_YELLOW}* Found potential release:{utils.res.RESET} {os.path.basename(fpath)}")
+    utils.events.set_context(path=fpath)
+    before = ctx.failures()
+    ctx.scanned_release += 1
+    unchanged = get_unchanged(args, fpath)
+    if unchanged:
+        release, checks, verified = unchanged
+        utils.res.verbose(f"\t - Unchanged since it passed the check of {time.strftime('%Y-%m-%d %H:%M', time.localtime(verified))}, skipped")
+        ctx.success_release += 1
+        for c in checks:
+            utils.res.verbose(c)
+        ctx.rls_check.extend(checks)
+        if journal:
+            journal.finish(fpath, release)
+        return None
+    release = search_srrdb_dirname(fpath)
+    if not release:
+        record_failure(fpath, before)
+        return None
+
+    return fpath, release
+
+@journaled
+def process_dir(args, fpath, release):
+    # Second half of check_dir, run in a worker process with --workers
     if args['output']:
         doutput = args['output']
     else:
         doutput = os.path.dirname(fpath)
 
-    utils.res.verbose(f"{utils.res.DARK_YELLOW}* Found potential release:{utils.res.RESET} {os.path.basename(fpath)}")
-    scanned_release += 1
-    release = search_srrdb_dirname(fpath)
-    if not release:
-        return False
-    else:
-        #keep track of the releases we are processing
-        if not release['release'] in release_list:
-            release_list[release['release']] = dict()
-            release_list[release['release']]['rescene'] = False
-            release_list[release['release']]['resample'] = False
-            release_list[release['release']]['extract'] = False
-            release_list[release['release']]['resubs'] = False
-        elif release_list[release['release']]['rescene'] and release_list[release['release']]['extract'] and release_list[release['release']]['resample'] and release_list[release['release']]['resubs']:
-            utils.res.verbose("\t - Skipping, already processed.")
-            scanned_release -= 1
-            return True
+    utils.events.set_context(path=fpath, release=release['release'])
+    ctx.start_release()
+    before = ctx.failures()
+    #keep track of the releases we are processing
+    if not release['release'] in ctx.release_list:
+        init_steps(args, release, ['rescene', 'resample', 'extract', 'resubs'])
+    if all(ctx.release_list[release['release']].values()):
+        utils.res.verbose("\t - Skipping, already processed.")
+        ctx.scanned_release -= 1
+        return True
 
     release_douput = process_release_directory(args, release, doutput)
     srr_path = download_srr(release['release'])
@@ -1099,87 +1270,218 @@ def check_dir(args, fpath):
 
     release_srr = SRR(srr_path)
     srr_finfo = release_srr.get_rars_name()
-    missing_rar = 0
 
     if args['check_extras']:
         if not args['check_crc']:
             handle_rar_check(fpath, release_srr, release, srr_finfo)
         else:
-            handle_crc_check(fpath, release_srr, release, srr_finfo)
+            handle_crc_check(args, fpath, release_srr, release, srr_finfo)
 
         srs_path, proof_path = extract_stored_files(release_srr, release_douput, release, srr_finfo)
         check_proof_and_sample(args, release_srr, release, fpath, proof_path, srs_path, release_douput, srr_finfo)
         check_subtitles(args, fpath, release_douput, release)
 
-    if missing_rar > 0:
-        success_release -= 1
+    if ctx.missing_rar > 0:
+        ctx.success_release -= 1
 
-    chk = utils.check_rls.run_checks(fpath)
+    with utils.events.stage("run_checks") as event:
+        chk = utils.check_rls.run_checks(fpath)
+        if event is not None:
+            event["findings"] = len(chk)
     for c in chk:
         utils.res.verbose(c)
-    rls_check.extend(chk)
+    ctx.rls_check.extend(chk)
+
+    # The fingerprint is taken once the check is done, stored files have been extracted again
+    if fingerprints and args['check_extras']:
+        if ctx.failure_since(before):
+            fingerprints.invalidate(fpath)
+        else:
+            fingerprints.set(fpath, release['release'], check_mode(args), chk, srr_store.get_sha1(release['release']) if srr_store else None)
+    return True
+
+def check_dir(args, fpath):
+    # Main function for -vc and -vc --check-crc command
+    found = lookup_dir(args, fpath)
+    if not found:
+        return False
+
+    return process_dir(args, *found)
+
+def rate_limiter(args):
+    # With --workers every process takes its srrdb requests from one bucket, so the rate limit holds for the whole run
+    if args['workers'] > 1:
+        return SharedTokenBucket(utils.res.SRRDB_RATE_LIMIT, utils.res.SRRDB_RATE_BURST)
+    return None
+
+def init_worker(worker_args):
+    # Every --workers process opens its own caches, srrdb session and pools, only the files on disk are shared
+    global args, crc_cache, srr_store, s, srrdb, quota, journal, fingerprints
+
+    args = worker_args
+    init()
+    utils.res.set_verbose_flag(args['verbose'])
+    if not args['no_crc_cache']:
+        crc_cache = CRCCache()
+    if not args['no_srr_cache']:
+        srr_store = SRRStore()
+    journal = Journal()
+    if args['check_extras']:
+        fingerprints = Fingerprints()
+    if args['persist_index']:
+        file_index.load(os.path.join(utils.res.CONFIG_FOLDER, utils.res.FILE_INDEX_FILE))
+    if args['events']:
+        # Same file as the main process, which writes run_start and run_end
+        utils.events.stream = utils.events.EventStream(args['events'])
+    utils.res.set_api_cache(APICache(refresh=args['refresh'], retry_negative=args['retry_failed'], opened=args['start_time']))
+
+    try:
+        s = SRRDB_LOGIN(utils.res.loginUrl, utils.res.loginData, utils.res.loginTestUrl, utils.res.loginTestString, rateLimiter=rate_limiter(args))
+    except Exception:
+        s = None
+    if s:
+        srrdb = SRRDB_POOL(s, args['srrdb_jobs'])
+        quota = DownloadQuota(utils.res.SRRDB_DAILY_QUOTA, utils.res.SRRDB_QUOTA_RESERVE)
+    atexit.register(close_worker)
+
+def close_worker():
+    if srrdb:
+        srrdb.shutdown()
+    crc_cache.close()
+    if srr_store:
+        srr_store.close()
+    journal.close()
+    if fingerprints:
+        fingerprints.close()
+    if utils.events.stream:
+        utils.events.stream.close()
+
+def run_release(process_func, found):
+    # Run in a worker process, process everything found for one release with a context of its own
+    # The context and the output are given back to the main process
+    global ctx
+
+    ctx = RunContext()
+    utils.res.capture = utils.res.Capture()
+    try:
+        utils.res.verbose(f"{utils.res.DARK_YELLOW}* Processing release:{utils.res.RESET} {found[0][-1]['release']}")
+        with contextlib.redirect_stdout(utils.res.capture):
+            for item in found:
+                process_func(args, *item)
+        return ctx, utils.res.capture.text
+    finally:
+        utils.res.capture = None
+
+def process_releases(args, process_func, found, use_progress_bar=False):
+    # With --workers, process_file/process_dir run in worker processes, everything found for a release goes to the same one
+    # Output and contexts are merged in the order releases were found, not in the order workers finish them
+    releases = dict()
+    for item in found:
+        releases.setdefault(item[-1]['release'], []).append(item)
+    if not releases:
+        return
+
+    utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Processing {len(releases)} releases with {args['workers']} workers{utils.res.RESET}")
+    # spawn, sqlite connections and threads of this process must not be inherited by the workers
+    with ProcessPoolExecutor(min(args['workers'], len(releases)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(args,)) as executor:
+        # Workers take turns between the disks of the releases, one release at a time is read from a spinning disk
+        with IOScheduler(args['workers'], thread_name_prefix="release") as scheduler:
+            futures = [scheduler.submit(items[0][0], lambda items: executor.submit(run_release, process_func, items).result(), items)
+                       for items in releases.values()]
+            for count, future in enumerate(futures, 1):
+                worker_ctx, output = future.result()
+                utils.res.replay(output)
+                ctx.merge(worker_ctx)
+                if use_progress_bar:
+                    progress_bar(count, len(futures))
+
+def print_profile(profiler, profile_dir=None):
+    # Stages ranked by cumulative time, with --profile-dir their cProfile is saved for pstats/snakeviz
+    utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Profile of the stages:{utils.res.RESET}")
+    for line in profiler.report():
+        utils.res.verbose(f"\t{line}")
+    if profile_dir:
+        paths = profiler.dump(profile_dir)
+        utils.res.verbose(f"\t - {len(paths)} .pstats files written in {profile_dir}")
+    profiler.stop()
+
+def traverse_directories(input_paths, valid_extensions, process_file_func, use_progress_bar=False, prefetch_dir_func=None):
+    # Function to traverse directories, process_file_func gets a WorkItem (path and stat) of every file or release dir
+    walker = Walker(input_paths, valid_extensions, index=file_index)
 
-def traverse_directories(input_paths, valid_extensions, process_file_func, use_progress_bar=False):
-    # Function to traverse directories
     if valid_extensions is None:
-        total_items = 0
-        if use_progress_bar:
-            for path in input_paths:
-                if os.path.isdir(path):
-                    for entry in os.listdir(path):
-                        full_path = os.path.join(path, entry)
-                        if os.path.isdir(full_path):
-                            total_items += 1
-
-        current_item_count = 0
-        for path in input_paths:
-            if os.path.isdir(path):
-                for entry in os.listdir(path):
-                    full_path = os.path.join(path, entry)
-                    if os.path.isdir(full_path):
-                        process_file_func(full_path)
-                        if use_progress_bar:
-                            current_item_count += 1
-                            progress_bar(current_item_count, total_items)
+        items = walker.release_dirs()
+
+        # Send the srrdb search of every release dir ahead, check_dir gets it from the srrdb pool
+        if srrdb and prefetch_dir_func:
+            for item in items:
+                prefetch_dir_func(item.path)
 
     else:
-        total_items = 0
+        # The walk runs ahead in a thread so the progress bar total grows while files are processed
+        items = walker.files()
+        if use_progress_bar:
+            items = walker.run_ahead(items)
+
+        # When --jobs is used files are hashed ahead but still processed in the same order
+        if hash_pool:
+            items = hash_pool.prefetch(items)
+
+    current_item_count = 0
+    for item in items:
+        process_file_func(item)
         if use_progress_bar:
-            for path in input_paths:
-                if os.path.isfile(path):
-                    if os.path.splitext(path)[1].lower() in valid_extensions:
-                        total_items += 1
-                elif os.path.isdir(path):
-                    for _, _, files in os.walk(path):
-                        total_items += sum(1 for f in files if os.path.splitext(f)[1].lower() in valid_extensions)
-
-        current_item_count = 0
-        for path in input_paths:
-            if os.path.isfile(path):
-                if os.path.splitext(path)[1].lower() in valid_extensions:
-                    process_file_func(path)
-                    if use_progress_bar:
-                        current_item_count += 1
-                        progress_bar(current_item_count, total_items)
-            elif os.path.isdir(path):
-                for root, _, files in os.walk(path):
-                    for file in files:
-                        if os.path.splitext(file)[1].lower() in valid_extensions:
-                            process_file_func(os.path.join(root, file))
-                            if use_progress_bar:
-                                current_item_count += 1
-                                progress_bar(current_item_count, total_items)
-                                
+            current_item_count += 1
+            progress_bar(current_item_count, max(walker.discovered, current_item_count))
+
 if __name__ == "__main__":
     start_time = time.time()
     args = arg_parse()
+    # Given to the --workers processes with args
+    args['start_time'] = start_time
     # initialize pretty colours
     init()
-    success_release = 0
-    scanned_release = 0
 
     # Ensure config folder is created
     utils.res.mkdir(utils.res.CONFIG_FOLDER)
+
+    if args['prune_crc_cache']:
+        cache = CRCCache()
+        removed = cache.prune(utils.res.CRC_CACHE_MAX_AGE)
+        utils.res.verbose(f"\t - Pruned {removed} entries from crc cache, {cache.count()} left")
+        cache.close()
+        if not args['input']:
+            sys.exit(0)
+
+    # Without the persistent cache the CRC/OSO of a file are still kept for this run
+    if not args['no_crc_cache']:
+        crc_cache = CRCCache()
+
+    if not args['no_srr_cache']:
+        srr_store = SRRStore()
+
+    if args['persist_index']:
+        file_index.load(os.path.join(utils.res.CONFIG_FOLDER, utils.res.FILE_INDEX_FILE))
+
+    if args['events']:
+        utils.events.open_stream(args['events'])
+
+    profiler = None
+    if args['profile'] or args['profile_dir']:
+        profiler = StageProfiler()
+        utils.events.hooks.append(profiler)
+
+    # A run going on with the last one keeps its journal, any other starts a new one
+    journal = Journal()
+    if not args['resume'] and not args['retry_failed']:
+        journal.clear()
+    if args['check_extras']:
+        fingerprints = Fingerprints()
+
+    api_cache = APICache(refresh=args['refresh'], retry_negative=args['retry_failed'], opened=start_time)
+    api_cache.prune()
+    utils.res.set_api_cache(api_cache)
     
     # Set the verbose flag to True to show srrdb connection
     utils.res.set_verbose_flag(True)
@@ -1190,21 +1492,33 @@ if __name__ == "__main__":
         #convert from MB to Bytes
         args['min_filesize'] = int(args['min_filesize']) * 1048576
 
+    if args['jobs'] < 1:
+        sys.exit("jobs option needs to be at least 1")
+    if args['srrdb_jobs'] < 1:
+        sys.exit("srrdb-jobs option needs to be at least 1")
+    if args['workers'] < 1:
+        sys.exit("workers option needs to be at least 1")
+
     if args['output']:
         if not os.path.isdir(args['output']):
             sys.exit("output option needs to be a valid directory")
         utils.res.verbose(f"Setting output directory to: {args['output']}\n")
 
+    # Nothing is sent now, the login is done with the first SRR download if it's needed
     utils.res.verbose("\t - Connecting srrdb.com...", end="")
     try:
-        s = SRRDB_LOGIN(utils.res.loginUrl, utils.res.loginData, utils.res.loginTestUrl, utils.res.loginTestString)
+        s = SRRDB_LOGIN(utils.res.loginUrl, utils.res.loginData, utils.res.loginTestUrl, utils.res.loginTestString, rateLimiter=rate_limiter(args))
     except Exception as e:
         utils.res.verbose(f"{utils.res.FAIL} -> {e}")
 
     if s and s.logged_in:
-        utils.res.verbose(f"{utils.res.SUCCESS}")
-    else:
-        utils.res.verbose(f"{utils.res.WARNING}Login failed, continuing with daily download limit of srr.")
+        utils.res.verbose(f"{utils.res.SUCCESS} -> session restored")
+    elif s:
+        utils.res.verbose(f"{utils.res.SUCCESS} -> login when the first SRR is downloaded")
+
+    if s:
+        srrdb = SRRDB_POOL(s, args['srrdb_jobs'])
+        quota = DownloadQuota(utils.res.SRRDB_DAILY_QUOTA, utils.res.SRRDB_QUOTA_RESERVE)
 
     # Set the verbose flag in the module
     utils.res.set_verbose_flag(args['verbose'])
@@ -1214,24 +1528,45 @@ if __name__ == "__main__":
     # Ensure all extensions are lowercase
     valid_extensions = [ext.lower() for ext in args['extension']]
 
-    if not args['verbose']:
-        if args['check_extras']:
-            # Process directories with progress bar
-            traverse_directories(valid_extensions=None, input_paths=args['input'], process_file_func=lambda p: check_dir(args, p), use_progress_bar=True)
+    # Files are hashed ahead and their srrdb search is sent as soon as the CRC is known, only with --jobs
+    if args['jobs'] > 1 and not args['check_extras']:
+        hash_pool = HashPool(calc_crc, args['jobs'], accept=lambda item: is_valid_file(args, item.path, item.size) and not skip_journaled(args, item.path), key=lambda item: item.path,
+                             then=lambda crc: srrdb.search_by("archive-crc:", crc) if srrdb and crc else None)
+
+    # With --workers the releases found are processed at the end of the traversal by process_releases
+    found = []
+    use_progress_bar = not args['verbose']
+    if args['check_extras']:
+        # Process directories with progress bar
+        if args['workers'] > 1:
+            traverse_directories(valid_extensions=None, input_paths=args['input'], process_file_func=lambda item: found.append(lookup_dir(args, item.path)), use_progress_bar=use_progress_bar, prefetch_dir_func=lambda path: prefetch_dir(args, path))
         else:
-            if args['search_srrdb']:
-                traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda p: search_file(args, p), use_progress_bar=True)
-            else:
-                traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda p: check_file(args, p), use_progress_bar=True)
+            traverse_directories(valid_extensions=None, input_paths=args['input'], process_file_func=lambda item: check_dir(args, item.path), use_progress_bar=use_progress_bar, prefetch_dir_func=lambda path: prefetch_dir(args, path))
     else:
-        # No progress bar, process files with all verbose details
-        if args['check_extras']:
-            traverse_directories(valid_extensions=None, input_paths=args['input'], process_file_func=lambda p: check_dir(args, p), use_progress_bar=False)
+        if args['search_srrdb']:
+            traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda item: search_file(args, item.path, item.size), use_progress_bar=use_progress_bar)
+        elif args['workers'] > 1:
+            traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda item: found.append(lookup_file(args, item.path, item.size)), use_progress_bar=use_progress_bar)
         else:
-            if args['search_srrdb']:
-                traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda p: search_file(args, p), use_progress_bar=False)
-            else:
-                traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda p: check_file(args, p), use_progress_bar=False)
+            traverse_directories(valid_extensions=valid_extensions, input_paths=args['input'], process_file_func=lambda item: check_file(args, item.path, item.size), use_progress_bar=use_progress_bar)
+
+    if found:
+        # The session of this process has been used for the searches, the workers start from the saved one
+        if s:
+            s.save_session_to_cache()
+        process_releases(args, process_dir if args['check_extras'] else process_file, [item for item in found if item], use_progress_bar)
+        # Keep the login done by a worker instead of overwriting it at exit
+        if s:
+            s.load_session_from_cache()
+
+    if hash_pool:
+        hash_pool.shutdown()
+    if srrdb:
+        srrdb.shutdown()
+    if s:
+        s.save_session_to_cache()
+    if args['persist_index']:
+        file_index.save(os.path.join(utils.res.CONFIG_FOLDER, utils.res.FILE_INDEX_FILE))
 
     # Set the verbose flag to True to show the result
     utils.res.set_verbose_flag(True)
@@ -1242,23 +1577,52 @@ if __name__ == "__main__":
         utils.res.verbose(f"Sometimes it was pred like that... sometimes there are extra weird things inside .srr...")
         utils.res.verbose(f"If you have{utils.res.FAIL}or{utils.res.WARNING}you will have to verify by yourself.")
 
-    if len(rls_check) > 0:
-        utils.res.verbose(f"\n".join(rls_check))
+    if len(ctx.rls_check) > 0:
+        utils.res.verbose(f"\n".join(ctx.rls_check))
+
+    if s and s.login_done and not s.logged_in:
+        utils.res.verbose(f"\n{utils.res.WARNING}Login failed, SRR were downloaded with the daily download limit of srr.")
 
     # Print every failed things
-    if len(missing_files) > 0:
-        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files need to be manually acquired:{utils.res.RESET}\n" + "\n".join(missing_files))
+    if len(ctx.missing_files) > 0:
+        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files need to be manually acquired:{utils.res.RESET}\n" + "\n".join(ctx.missing_files))
+
+    if len(ctx.compressed_release) > 0:
+        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files were compressed and need to be manually acquired:{utils.res.RESET}\n" + "\n".join(ctx.compressed_release))
+
+    if len(ctx.deferred_downloads) > 0:
+        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the SRR of the following releases were not downloaded because of the daily download limit, run again later:{utils.res.RESET}\n" + "\n".join(ctx.deferred_downloads))
 
-    if len(compressed_release) > 0:
-        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files were compressed and need to be manually acquired:{utils.res.RESET}\n" + "\n".join(compressed_release))
+    if len(ctx.scanned_nothing_found) > 0:
+        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files were not found and need to be manually acquired:{utils.res.RESET}\n" + "\n".join(ctx.scanned_nothing_found))
 
-    if len(scanned_nothing_found) > 0:
-        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the following files were not found and need to be manually acquired:{utils.res.RESET}\n" + "\n".join(scanned_nothing_found))
+    if len(ctx.search_failed) > 0:
+        utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete, the srrdb search of the following files failed, run again later with --retry-failed:{utils.res.RESET}\n" + "\n".join(ctx.search_failed))
 
     # Ensure success_release is non-negative (it mean that nothing has been reconstruct)
-    success_release = max(0, success_release)
+    ctx.success_release = max(0, ctx.success_release)
     end_time = time.time()
     elapsed_time = end_time - start_time
     formatted_time = utils.res.format_time(elapsed_time)
     
-    utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete: {success_release} completed of {scanned_release} scanned in {formatted_time}{utils.res.RESET}")
+    utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* CRC cache: {crc_cache.stats()}{utils.res.RESET}")
+    crc_cache.close()
+    if srr_store:
+        utils.res.verbose(f"{utils.res.DARK_YELLOW}* SRR cache: {srr_store.stats()}{utils.res.RESET}")
+        srr_store.close()
+    utils.res.verbose(f"{utils.res.DARK_YELLOW}* srrdb search cache: {api_cache.stats()}{utils.res.RESET}")
+    api_cache.close()
+    utils.res.verbose(f"{utils.res.DARK_YELLOW}* Journal: {journal.stats()}{utils.res.RESET}")
+    journal.close()
+    if fingerprints:
+        utils.res.verbose(f"{utils.res.DARK_YELLOW}* Release fingerprints: {fingerprints.stats()}{utils.res.RESET}")
+        fingerprints.close()
+    if ctx.skipped_release:
+        utils.res.verbose(f"{utils.res.DARK_YELLOW}* {ctx.skipped_release} files/release dirs skipped with the journal of the last run{utils.res.RESET}")
+
+    utils.res.verbose(f"\n{utils.res.DARK_YELLOW}* Rescene process complete: {ctx.success_release} completed of {ctx.scanned_release} scanned in {formatted_time}{utils.res.RESET}")
+    if profiler:
+        print_profile(profiler, args['profile_dir'])
+    utils.events.close_stream(completed=ctx.success_release, scanned=ctx.scanned_release, wall=round(elapsed_time, 3),
+                              missing_files=ctx.missing_files, compressed=ctx.compressed_release, not_found=ctx.scanned_nothing_found,
+                              search_failed=ctx.search_failed)
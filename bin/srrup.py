@@ -14,7 +14,9 @@ import shutil
 import time
 
 from utils.connect import SRRDB_LOGIN
+from utils.profiler import StageProfiler
 import utils.res
+import utils.events
 
 # Define global variables
 VERSION = "2.1.1" # Use original script version as reference for any updates
@@ -35,6 +37,9 @@ Examples:
     srrup.py /path/to/srr/files
 Options:
     -b, --backfill  process files in backfill folder (~/.config/srrdb/backfill)
+    --profile       print the time and peak memory of every upload stage at the end
+    --profile-dir DIR
+                    with --profile, also write a .pstats file per stage into DIR
     -h, --help      show this help
     -v, --version   print the current version
 """
@@ -43,19 +48,18 @@ def arg_parse():
     parser = argparse.ArgumentParser(description="Upload .srr files to srrdb.com", add_help=False)
     parser.add_argument('files', nargs='*', help="Files to upload")
     parser.add_argument('-b', '--backfill', action='store_true', help="Process files in backfill folder")
+    parser.add_argument('--profile', action='store_true', help="Profile every stage")
+    parser.add_argument('--profile-dir', help="Write a .pstats file per stage into this directory")
     parser.add_argument('-h', '--help', action='store_true', help="Show this help message and exit")
     parser.add_argument('-v', '--version', action='store_true', help="Print the current version")
     
     return vars(parser.parse_args())
     
 def verbose(string, end='\n'):
-    filename = os.path.join(utils.res.CONFIG_FOLDER, "srrup.txt")
     # Print the string to the console
     print(string, end=end)
-    
-    # Open the file in append mode and write the string
-    with open(filename, 'a') as file:
-        file.write(utils.res.remove_ansi_escape_codes(string) + end)
+
+    utils.res.get_logger("srrup.txt").write(string + end)
         
 def file_size_ok(file):
     # Check if the file size is within allowed limits
@@ -77,6 +81,7 @@ def backup_srr(file):
         except Exception as e:
             raise RuntimeError(f"Failed to copy {file_name} to backup folder: {e}")
 
+@utils.events.timed("srr_upload", outcome=utils.events.truthy)
 def srr_upload(file):
     global scanned_release
     ret = False
@@ -105,7 +110,7 @@ def srr_upload(file):
     
     verbose(f"\t - Uploading: {file}")
     try:
-        response = s.retrieve_content(utils.res.SRRDB_UPLOAD, method="post", files=form_data, timeout=30, headers=headers)
+        response = s.retrieve_content(utils.res.SRRDB_UPLOAD, method="post", files=form_data, timeout=30, headers=headers, login_required=True)
     except Exception as e:
         verbose(f"\t\t - {utils.res.FAIL} -> {e}")
         backup_srr(file)
@@ -164,6 +169,7 @@ def clear_lock_file():
     except FileNotFoundError:
         verbose(f"\t - {utils.res.FAIL} -> Lockfile not found during cleanup.")
 
+@utils.events.timed("process_backfill")
 def process_backfill():
     # Process all files in the backfill folder
     global success_release
@@ -207,6 +213,7 @@ if __name__ == '__main__':
     
     success_release = 0
     scanned_release = 0
+    s = None
     
     # Ensure config and backfill folder are created
     utils.res.mkdir(utils.res.CONFIG_FOLDER)
@@ -242,15 +249,23 @@ if __name__ == '__main__':
         print(VERSION)
         sys.exit(0)
 
+    profiler = None
+    if args['profile'] or args['profile_dir']:
+        profiler = StageProfiler()
+        utils.events.hooks.append(profiler)
+
     # Process backfill only
-    elif args['backfill']:
+    if args['backfill']:
         verbose("\t - Connecting srrdb.com...", end="")
+        # Uploading needs the login, it reuses the cookies saved by autorescene.py or an earlier upload if they're still valid
+        logged_in = False
         try:
             s = SRRDB_LOGIN(utils.res.loginUrl, utils.res.loginData, utils.res.loginTestUrl, utils.res.loginTestString)
+            logged_in = s.ensure_login()
         except Exception as e:
             verbose(f"{utils.res.FAIL} -> {e}")
 
-        if s and s.logged_in:
+        if logged_in:
             verbose(f"{utils.res.SUCCESS}")
             verbose(f"{utils.res.DARK_YELLOW}* Starting backfill upload:{utils.res.RESET}")
             process_backfill()
@@ -260,12 +275,14 @@ if __name__ == '__main__':
     # Upload files
     else:
         verbose("\t - Connecting srrdb.com...", end="")
+        logged_in = False
         try:
             s = SRRDB_LOGIN(utils.res.loginUrl, utils.res.loginData, utils.res.loginTestUrl, utils.res.loginTestString)
+            logged_in = s.ensure_login()
         except Exception as e:
             verbose(f"{utils.res.FAIL} -> {e}")
 
-        if s and s.logged_in:
+        if logged_in:
             verbose(f"{utils.res.SUCCESS}")
             verbose(f"{utils.res.DARK_YELLOW}* Starting upload:{utils.res.RESET}")
             
@@ -291,3 +308,12 @@ if __name__ == '__main__':
     formatted_time = utils.res.format_time(elapsed_time)
 
     verbose(f"\n{utils.res.DARK_YELLOW}* Upload process complete: {success_release} completed of {scanned_release} scanned in {formatted_time}{utils.res.RESET}")
+
+    if profiler:
+        verbose(f"\n{utils.res.DARK_YELLOW}* Profile of the stages:{utils.res.RESET}")
+        for line in profiler.report():
+            verbose(f"\t{line}")
+        if args['profile_dir']:
+            paths = profiler.dump(args['profile_dir'])
+            verbose(f"\t - {len(paths)} .pstats files written in {args['profile_dir']}")
+        profiler.stop()
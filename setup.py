@@ -9,7 +9,7 @@ setup(
     author='jaloji',
     license='WTFPL',
     url='https://github.com/jaloji/pyautorescene',
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
     scripts=['bin/autorescene.py', 'bin/srrup.py'],
 
     keywords=['rescene', 'srr', 'srs', 'scene', 'resample', 'automate', 'auto'],
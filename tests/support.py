@@ -0,0 +1,10 @@
+import os
+import importlib.util
+
+def load_autorescene():
+    # bin/autorescene.py is a script, loaded as a module to call its functions
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bin", "autorescene.py")
+    spec = importlib.util.spec_from_file_location("autorescene", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
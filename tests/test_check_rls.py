@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+from utils.check_rls import ReleaseSnapshot, check_bad_files, get_release_type, run_checks
+
+class CheckRlsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def release(self, name, *files):
+        # Release dir name with empty files, a path ending with / is an empty dir
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(path)
+        for f in files:
+            fpath = os.path.join(path, f)
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            if not f.endswith("/"):
+                open(fpath, "wb").close()
+        return path
+
+    def check(self, path):
+        # Release type and status of path, like run_checks
+        snapshot = ReleaseSnapshot(path)
+        release_type = get_release_type(os.path.normpath(path), snapshot)
+        return release_type, check_bad_files(os.path.normpath(path), os.path.basename(path), release_type, snapshot)
+
+    def test_dirfix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.DIRFIX.720p.BluRay.x264-GRP", "grp.nfo")), ("DIRFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.DIRFIX.720p.BluRay.x264-GRP", "a.nfo", "b.nfo")),
+                         ("DIRFIX", "BAD: multiple nfo"))
+        self.assertEqual(self.check(self.release("Movie.2022.DIRFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv")),
+                         ("DIRFIX", "BAD: nfo file missing"))
+
+    def test_nfofix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.NFO.FIX.720p.BluRay.x264-GRP", "grp.nfo")), ("NFOFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.NFOFIX.720p.BluRay.x264-GRP", "a.nfo", "b.nfo")),
+                         ("NFOFIX", "BAD: multiple nfo"))
+
+    def test_sfvfix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.SFVFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv")), ("SFVFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.SFVFIX.720p.BluRay.x264-GRP", "grp.nfo")),
+                         ("SFVFIX", "BAD: sfv file missing"))
+        self.assertEqual(self.check(self.release("Movie.2022.SFVFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar")),
+                         ("SFVFIX", "BAD: other file than nfo, sfv present"))
+
+    def test_rarfix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.RARFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar", "grp.r00")),
+                         ("RARFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.RARFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv")),
+                         ("RARFIX", "BAD: rar archive file missing"))
+
+    def test_prooffix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.PROOFFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp-proof.jpg")),
+                         ("PROOFFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.PROOFFIX.720p.BluRay.x264-GRP", "grp.nfo")),
+                         ("PROOFFIX", "BAD: jpg or jpeg or png file missing"))
+
+    def test_samplefix(self):
+        self.assertEqual(self.check(self.release("Movie.2020.SAMPLEFIX.720p.BluRay.x264-GRP", "grp.nfo", "grp-sample.mkv")),
+                         ("SAMPLEFIX", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.SAMPLEFIX.720p.BluRay.x264-GRP", "grp.nfo")),
+                         ("SAMPLEFIX", "BAD: mkv, avi, wmv, mp4, ts, m2ts, vob file missing"))
+
+    def test_rar(self):
+        self.assertEqual(self.check(self.release("Movie.2020.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar", "grp.r00",
+                                                 "Sample/grp-sample.mkv", "Proof/grp-proof.jpg", "Subs/grp-subs.rar")),
+                         ("RAR", "OK"))
+        self.assertEqual(self.check(self.release("Movie.2021.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar", "Extras/grp.mkv")),
+                         ("RAR", "BAD: other subdir than dvd, cd, disc or disk, sample, proof, subs"))
+
+    def test_mvid(self):
+        self.assertEqual(self.check(self.release("Artist-Title-x264-2020-GRP", "grp.nfo", "grp.sfv", "grp.mkv")), ("MVID", "OK"))
+
+    def test_music(self):
+        self.assertEqual(self.check(self.release("Artist-Album-WEB-2020-GRP", "00-grp.nfo", "00-grp.sfv", "00-grp.m3u",
+                                                 "00-grp.jpg", "01-track.mp3", "02-track.mp3")),
+                         ("MP3", "OK"))
+        self.assertEqual(self.check(self.release("Artist-Album-WEB-2021-GRP", "00-grp.nfo", "01-track.mp3")),
+                         ("MP3", "BAD: sfv file missing"))
+        self.assertEqual(self.check(self.release("Artist-Album-WEB-FLAC-2020-GRP", "00-grp.nfo", "00-grp.sfv", "00-grp.cue",
+                                                 "00-grp.log", "01-track.flac")),
+                         ("FLAC", "OK"))
+
+    def test_too_many_subdirs(self):
+        self.assertEqual(self.check(self.release("Movie.2020.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar",
+                                                 "Sample/Extra/")),
+                         ("RAR", "BAD - too much sub dir: release/sub/sub/ exist"))
+
+    def test_not_allowed_file(self):
+        self.assertEqual(self.check(self.release("Movie.2020.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar", "Thumbs.db")),
+                         ("RAR", "BAD: not allowed file present"))
+
+    def test_trailing_slash(self):
+        # A release given with a trailing / gets a verdict like without it
+        path = self.release("Movie.2020.720p.BluRay.x264-GRP", "grp.nfo", "grp.sfv", "grp.rar")
+
+        for rlsname in (path, path + os.path.sep):
+            output = run_checks(rlsname)
+            self.assertEqual(len(output), 1)
+            self.assertIn("-> RAR -> passed all checks.", output[0])
+
+if __name__ == "__main__":
+    unittest.main()
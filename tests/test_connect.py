@@ -0,0 +1,95 @@
+import tempfile
+import threading
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import utils.res
+from utils.connect import RETRIES, SRRDB_LOGIN, SharedTokenBucket, TokenBucket
+
+class TooManyRequests(BaseHTTPRequestHandler):
+    # srrdb answering every request with 429
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(429)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class TooManyRequestsOnce(TooManyRequests):
+    # srrdb answering 429 to the first request only
+
+    def do_GET(self):
+        if type(self).hits:
+            type(self).hits += 1
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            super().do_GET()
+
+class RateLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.config = tempfile.TemporaryDirectory()
+        self.addCleanup(self.config.cleanup)
+        self.old_config_folder = utils.res.CONFIG_FOLDER
+        utils.res.CONFIG_FOLDER = self.config.name
+        self.addCleanup(setattr, utils.res, "CONFIG_FOLDER", self.old_config_folder)
+
+        self.old_rate_pause = utils.res.SRRDB_RATE_PAUSE
+        utils.res.SRRDB_RATE_PAUSE = 0.01
+        self.addCleanup(setattr, utils.res, "SRRDB_RATE_PAUSE", self.old_rate_pause)
+
+    def serve(self, handler):
+        handler.hits = 0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}/"
+
+    def test_429_pauses_the_bucket(self):
+        site = self.serve(TooManyRequests)
+        bucket = TokenBucket(100, 5)
+        s = SRRDB_LOGIN(f"{site}account/login", {}, site, "", rateLimiter=bucket)
+
+        with self.assertRaises(requests.exceptions.RetryError):
+            s.retrieve_content(f"{site}api/search/r:release")
+
+        # Not retried by the adapter, sent again after every pause of the bucket until the retries are used
+        self.assertEqual(TooManyRequests.hits, RETRIES.total + 1)
+        self.assertGreater(bucket.paused_until, 0)
+
+    def test_429_then_200(self):
+        site = self.serve(TooManyRequestsOnce)
+        bucket = TokenBucket(100, 5)
+        s = SRRDB_LOGIN(f"{site}account/login", {}, site, "", rateLimiter=bucket)
+
+        res = s.retrieve_content(f"{site}api/search/r:release")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), [])
+        self.assertEqual(TooManyRequestsOnce.hits, 2)
+
+    def test_shared_bucket_is_shared(self):
+        # Two buckets on the same database, like two worker processes
+        first = SharedTokenBucket(1, 2)
+        second = SharedTokenBucket(1, 2)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+
+        self.assertEqual(first.take(), 0)
+        self.assertEqual(first.take(), 0)
+        self.assertGreater(second.take(), 0)
+
+        second.pause(60)
+        self.assertGreater(first.take(), 30)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from utils.crccache import CRCCache
+
+class CRCCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = CRCCache(":memory:")
+        self.addCleanup(self.cache.close)
+        self.fpath = self.write("grp.rar", b"first volume")
+
+    def write(self, name, data):
+        fpath = os.path.join(self.tmp.name, name)
+        with open(fpath, "wb") as f:
+            f.write(data)
+        return fpath
+
+    def test_set_and_get(self):
+        self.assertIsNone(self.cache.get(self.fpath))
+        self.cache.set(self.fpath, "0A1B2C3D", oso="0123456789abcdef")
+
+        self.assertEqual(self.cache.get(self.fpath), "0A1B2C3D")
+        self.assertEqual(self.cache.get_oso(self.fpath), "0123456789abcdef")
+        # get_oso isn't counted, calc_crc already looked the file up
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_keyed_by_the_file(self):
+        # A renamed file or another hard link to it is the same file
+        self.cache.set(self.fpath, "0A1B2C3D")
+        renamed = os.path.join(self.tmp.name, "grp.r00")
+        os.rename(self.fpath, renamed)
+        linked = os.path.join(self.tmp.name, "grp.r01")
+        os.link(renamed, linked)
+
+        self.assertEqual(self.cache.get(renamed), "0A1B2C3D")
+        self.assertEqual(self.cache.get(linked), "0A1B2C3D")
+        self.assertEqual(self.cache.count(), 1)
+
+    def test_modified_file(self):
+        self.cache.set(self.fpath, "0A1B2C3D")
+        st = os.stat(self.fpath)
+        os.utime(self.fpath, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+        self.assertIsNone(self.cache.get(self.fpath))
+        # The outdated entry is removed
+        self.assertEqual(self.cache.count(), 0)
+
+    def test_resized_file(self):
+        self.cache.set(self.fpath, "0A1B2C3D")
+        st = os.stat(self.fpath)
+        with open(self.fpath, "ab") as f:
+            f.write(b"more")
+        os.utime(self.fpath, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        self.assertIsNone(self.cache.get(self.fpath))
+
+    def test_replaced_file(self):
+        self.cache.set(self.fpath, "0A1B2C3D")
+        # Another file (another inode) with the same name, size and mtime
+        st = os.stat(self.fpath)
+        other = self.write("grp.tmp", b"other volume")
+        os.utime(other, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(other, self.fpath)
+
+        self.assertIsNone(self.cache.get(self.fpath))
+
+    def test_invalidate_and_prune(self):
+        self.cache.set(self.fpath, "0A1B2C3D")
+        self.cache.invalidate(self.fpath)
+        self.assertIsNone(self.cache.get(self.fpath))
+
+        self.cache.set(self.fpath, "0A1B2C3D")
+        removed = self.write("grp.r00", b"second volume")
+        self.cache.set(removed, "DEADBEEF")
+        os.remove(removed)
+
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual(self.cache.get(self.fpath), "0A1B2C3D")
+
+    def test_saved_between_runs(self):
+        filename = os.path.join(self.tmp.name, "crc.db")
+        cache = CRCCache(filename)
+        cache.set(self.fpath, "0A1B2C3D")
+        cache.close()
+
+        cache = CRCCache(filename)
+        self.addCleanup(cache.close)
+        self.assertEqual(cache.get(self.fpath), "0A1B2C3D")
+
+if __name__ == "__main__":
+    unittest.main()
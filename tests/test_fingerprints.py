@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+import utils.res
+from utils.fingerprints import Fingerprints, release_fingerprint
+from support import load_autorescene
+
+class FakeSRRStore:
+    # sha1 of the SRR cached for every release
+    def __init__(self, sha1s):
+        self.sha1s = sha1s
+
+    def get_sha1(self, release):
+        return self.sha1s.get(release)
+
+class FingerprintsTest(unittest.TestCase):
+    def setUp(self):
+        self.config = tempfile.TemporaryDirectory()
+        self.addCleanup(self.config.cleanup)
+        self.old_config_folder = utils.res.CONFIG_FOLDER
+        utils.res.CONFIG_FOLDER = self.config.name
+        self.addCleanup(setattr, utils.res, "CONFIG_FOLDER", self.old_config_folder)
+
+        self.filename = os.path.join(self.config.name, "fingerprints.db")
+        self.path = os.path.join(self.config.name, "Movie.2020.720p.BluRay.x264-GRP")
+        for name in ("grp.nfo", "grp.sfv", "grp.rar", "Sample/grp-sample.mkv"):
+            fpath = os.path.join(self.path, name)
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            with open(fpath, "wb") as f:
+                f.write(name.encode())
+
+        # The last -c --check-crc run
+        fingerprints = Fingerprints(self.filename)
+        fingerprints.set(self.path, "Movie.2020.720p.BluRay.x264-GRP", "crc", ["passed all checks."], "srr-sha1")
+        fingerprints.close()
+
+    def reopen(self):
+        # A new run, get() answers are only kept for one run
+        fingerprints = Fingerprints(self.filename)
+        self.addCleanup(fingerprints.close)
+        return fingerprints
+
+    def test_unchanged(self):
+        store = FakeSRRStore({"Movie.2020.720p.BluRay.x264-GRP": "srr-sha1"})
+        fingerprints = self.reopen()
+
+        release, checks, _ = fingerprints.get(self.path, "crc", store)
+        self.assertEqual((release, checks), ("Movie.2020.720p.BluRay.x264-GRP", ["passed all checks."]))
+        # A --check-crc check stands for a check without it
+        self.assertIsNotNone(fingerprints.get(self.path, "rar", store))
+        self.assertEqual(fingerprints.stats(), "2 unchanged, 0 checked")
+
+    def test_rar_check_is_not_a_crc_check(self):
+        fingerprints = self.reopen()
+        fingerprints.set(self.path, "Movie.2020.720p.BluRay.x264-GRP", "rar", [])
+
+        fingerprints = self.reopen()
+        self.assertIsNotNone(fingerprints.get(self.path, "rar"))
+        self.assertIsNone(fingerprints.get(self.path, "crc"))
+
+    def test_changed_files(self):
+        fpath = os.path.join(self.path, "Sample", "grp-sample.mkv")
+        before = release_fingerprint(self.path)
+        st = os.stat(fpath)
+        os.utime(fpath, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+        self.assertNotEqual(release_fingerprint(self.path), before)
+
+        store = FakeSRRStore({"Movie.2020.720p.BluRay.x264-GRP": "srr-sha1"})
+        self.assertIsNone(self.reopen().get(self.path, "crc", store))
+
+        os.remove(fpath)
+        self.assertIsNone(self.reopen().get(self.path, "crc", store))
+
+    def test_changed_srr(self):
+        store = FakeSRRStore({"Movie.2020.720p.BluRay.x264-GRP": "other-sha1"})
+        self.assertIsNone(self.reopen().get(self.path, "crc", store))
+
+    def test_invalidate(self):
+        fingerprints = self.reopen()
+        fingerprints.invalidate(self.path)
+        self.assertIsNone(self.reopen().get(self.path, "crc", FakeSRRStore({"Movie.2020.720p.BluRay.x264-GRP": "srr-sha1"})))
+
+    def test_get_unchanged(self):
+        autorescene = load_autorescene()
+        autorescene.fingerprints = self.reopen()
+        autorescene.srr_store = FakeSRRStore({"Movie.2020.720p.BluRay.x264-GRP": "srr-sha1"})
+        args = {'full': False, 'check_extras': True, 'check_crc': True}
+
+        self.assertIsNotNone(autorescene.get_unchanged(args, self.path))
+        # --full checks everything again, only -c replays the checks
+        self.assertIsNone(autorescene.get_unchanged(args | {'full': True}, self.path))
+        self.assertIsNone(autorescene.get_unchanged(args | {'check_extras': False}, self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import random
+import tempfile
+import unittest
+import zlib
+
+from rescene.osohash import compute_hash
+
+import utils.hasher
+from utils.hasher import OSO_BLOCK_SIZE, THREADED_MIN_SIZE, OSOCapture
+
+MIB = 1024 * 1024
+# Around the OSO blocks (head and tail overlap below 128 KiB), the threaded reader and the largest size
+SIZES = [0, 1, OSO_BLOCK_SIZE - 1, OSO_BLOCK_SIZE, OSO_BLOCK_SIZE + 1, 2 * OSO_BLOCK_SIZE - 1, 2 * OSO_BLOCK_SIZE,
+         MIB + 7, THREADED_MIN_SIZE, THREADED_MIN_SIZE + 3, 5 * MIB]
+
+def rescene_oso(fpath):
+    # compute_hash gives (hash, size)
+    return compute_hash(fpath)[0]
+
+class HasherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = random.Random(0).randbytes(5 * MIB)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, size):
+        fpath = os.path.join(self.tmp.name, f"{size}.bin")
+        with open(fpath, "wb") as f:
+            f.write(self.data[:size])
+        return fpath
+
+    def test_engines_match_zlib_and_rescene(self):
+        for size in SIZES:
+            fpath = self.write(size)
+            crc = zlib.crc32(self.data[:size])
+            oso = rescene_oso(fpath) if size >= OSO_BLOCK_SIZE else None
+
+            # Blocks smaller than, not aligned on and larger than the OSO blocks
+            for block_size in (4096, OSO_BLOCK_SIZE + 17, MIB):
+                for use_mmap, threaded in ((False, False), (True, False), (False, True)):
+                    with self.subTest(size=size, block_size=block_size, use_mmap=use_mmap, threaded=threaded):
+                        self.assertEqual(utils.hasher.crc32_file(fpath, block_size, use_mmap, threaded), crc)
+                        self.assertEqual(utils.hasher.hash_file(fpath, block_size, use_mmap, threaded), (crc, oso))
+
+    def test_format_crc(self):
+        self.assertEqual(utils.hasher.format_crc(0), "00000000")
+        self.assertEqual(utils.hasher.format_crc(zlib.crc32(b"autorescene")), f"{zlib.crc32(b'autorescene'):08X}")
+
+    def test_capture_of_a_growing_file(self):
+        # Bytes read past the size taken before the read are left out of the OSO hash
+        size = 3 * OSO_BLOCK_SIZE
+        fpath = self.write(size)
+        capture = OSOCapture(size)
+        for offset in range(0, size + MIB, OSO_BLOCK_SIZE + 17):
+            capture.feed(offset, memoryview(self.data)[offset:offset + OSO_BLOCK_SIZE + 17])
+
+        self.assertEqual(len(capture.head), OSO_BLOCK_SIZE)
+        self.assertEqual(len(capture.tail), OSO_BLOCK_SIZE)
+        self.assertEqual(capture.hexdigest(), rescene_oso(fpath))
+
+if __name__ == "__main__":
+    unittest.main()
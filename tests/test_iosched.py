@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+
+from utils.iosched import IOScheduler
+
+class IOSchedulerTest(unittest.TestCase):
+    def test_results_in_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"file{i}") for i in range(8)]
+            for path in paths:
+                open(path, "wb").close()
+
+            with IOScheduler(4) as scheduler:
+                self.assertEqual(scheduler.map(os.path.basename, paths), [f"file{i}" for i in range(8)])
+
+    def test_missing_paths(self):
+        # Paths that can't be stat share the device None, they must not stop the other work
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [tmp, os.path.join(tmp, "missing"), None, tmp]
+
+            with IOScheduler(2) as scheduler:
+                futures = [scheduler.submit(path, str, path) for path in paths]
+                self.assertEqual([future.result(timeout=10) for future in futures], [str(path) for path in paths])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import utils.res
+from utils.journal import Journal
+from support import load_autorescene
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.config = tempfile.TemporaryDirectory()
+        self.addCleanup(self.config.cleanup)
+        self.old_config_folder = utils.res.CONFIG_FOLDER
+        utils.res.CONFIG_FOLDER = self.config.name
+        self.addCleanup(setattr, utils.res, "CONFIG_FOLDER", self.old_config_folder)
+
+        self.filename = os.path.join(self.config.name, "journal.db")
+        self.done = os.path.join(self.config.name, "Done.Release")
+        self.not_found = os.path.join(self.config.name, "Not.Found.Release")
+        self.missing = os.path.join(self.config.name, "Missing.Files.Release")
+        self.unknown = os.path.join(self.config.name, "Never.Seen.Release")
+
+        # The last run
+        journal = Journal(self.filename)
+        journal.finish(self.done, "Done.Release")
+        journal.finish(self.not_found, None, "scanned_nothing_found")
+        journal.finish(self.missing, "Missing.Files.Release", "missing_files")
+        journal.set_step("Done.Release", "search")
+        journal.set_step("Done.Release", "rescene")
+        journal.close()
+
+        self.journal = Journal(self.filename)
+        self.addCleanup(self.journal.close)
+
+    def test_reopened(self):
+        self.assertEqual(self.journal.get(self.done), ("Done.Release", None))
+        self.assertTrue(self.journal.is_done(self.done))
+        self.assertFalse(self.journal.is_failed(self.done))
+        self.assertTrue(self.journal.is_failed(self.not_found))
+        self.assertTrue(self.journal.is_failed(self.missing))
+        self.assertFalse(self.journal.is_done(self.unknown))
+        self.assertEqual(self.journal.stats(), "3 done, 2 failed")
+
+        steps = self.journal.get_steps("Done.Release")
+        self.assertEqual([step for step, done in steps.items() if done], ["search", "rescene"])
+        self.assertFalse(any(self.journal.get_steps("Missing.Files.Release").values()))
+
+    def test_paths_are_normalized(self):
+        self.assertTrue(self.journal.is_done(os.path.join(self.done, "")))
+        self.assertTrue(self.journal.is_done(os.path.join(self.done, os.pardir, "Done.Release")))
+
+    def test_clear(self):
+        self.journal.clear()
+        self.assertFalse(self.journal.is_done(self.done))
+        self.assertEqual(self.journal.stats(), "0 done, 0 failed")
+
+    def test_skip_journaled(self):
+        autorescene = load_autorescene()
+        autorescene.journal = self.journal
+        paths = (self.done, self.not_found, self.missing, self.unknown)
+
+        def skipped(**args):
+            args = {'resume': False, 'retry_failed': False} | args
+            return [autorescene.skip_journaled(args, path) for path in paths]
+
+        # --resume skips everything the last run finished, --retry-failed everything but its failures
+        self.assertEqual(skipped(resume=True), [True, True, True, False])
+        self.assertEqual(skipped(retry_failed=True), [True, False, False, True])
+        self.assertEqual(skipped(), [False, False, False, False])
+
+        autorescene.journal = None
+        self.assertEqual(skipped(resume=True), [False, False, False, False])
+
+    def test_failures_are_journaled(self):
+        # A release ending in a failure list since before is saved with it, a search that failed too
+        autorescene = load_autorescene()
+        autorescene.journal = self.journal
+
+        before = autorescene.ctx.failures()
+        autorescene.ctx.add_failure("search_failed", self.unknown)
+        autorescene.record_failure(self.unknown, before)
+        self.assertEqual(self.journal.get(self.unknown), (None, "search_failed"))
+
+        before = autorescene.ctx.failures()
+        autorescene.ctx.count_failure("missing_files")
+        autorescene.record_failure(self.done, before)
+        self.assertEqual(self.journal.get(self.done), (None, "missing_files"))
+
+if __name__ == "__main__":
+    unittest.main()
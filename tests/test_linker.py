@@ -0,0 +1,141 @@
+import os
+import errno
+import tempfile
+import unittest
+from unittest import mock
+
+import utils.linker
+
+def failing(name, code=errno.EXDEV):
+    # A strategy named name that can't be used here
+    def strategy(src, dst):
+        raise OSError(code, os.strerror(code))
+    strategy.__name__ = name
+    return strategy
+
+def broken_copy(src, dst):
+    # Stops in the middle of the copy like a full disk
+    with open(dst, "wb") as f:
+        f.write(b"half")
+    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+class LinkerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = self.write("src/grp.rar", b"first volume")
+        self.out = os.path.join(self.tmp.name, "out")
+        os.makedirs(self.out)
+
+    def write(self, name, data):
+        fpath = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        with open(fpath, "wb") as f:
+            f.write(data)
+        return fpath
+
+    def read(self, fpath):
+        with open(fpath, "rb") as f:
+            return f.read()
+
+    def assertNoPart(self):
+        self.assertEqual([name for name in os.listdir(self.out) if name.endswith(".part")], [])
+
+    def test_copy(self):
+        dst = os.path.join(self.out, "grp.rar")
+        self.assertEqual(utils.linker.link_file(self.src, self.out, "copy"), "copy")
+        self.assertEqual(self.read(dst), b"first volume")
+        self.assertFalse(os.path.samefile(self.src, dst))
+        self.assertEqual(os.stat(dst).st_mtime_ns, os.stat(self.src).st_mtime_ns)
+
+    def test_hardlink(self):
+        dst = os.path.join(self.out, "renamed.rar")
+        self.assertEqual(utils.linker.link_file(self.src, dst, "hardlink"), "hardlink")
+        self.assertTrue(os.path.samefile(self.src, dst))
+        # Already the same file
+        self.assertIsNone(utils.linker.link_file(self.src, dst, "copy"))
+        self.assertIsNone(utils.linker.link_file(self.src, self.src, "auto"))
+
+    def test_symlink(self):
+        dst = os.path.join(self.out, "grp.rar")
+        self.assertEqual(utils.linker.link_file(self.src, dst, "symlink"), "symlink")
+        self.assertTrue(os.path.islink(dst))
+        self.assertEqual(os.readlink(dst), os.path.abspath(self.src))
+
+    def test_reflink_not_supported(self):
+        dst = os.path.join(self.out, "grp.rar")
+        with mock.patch("fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))):
+            with self.assertRaises(OSError):
+                utils.linker.link_file(self.src, dst, "reflink")
+        self.assertFalse(os.path.exists(dst))
+        self.assertNoPart()
+
+    def test_auto_falls_back(self):
+        # Across filesystems hardlink and reflink fail, the kernel copy is used then the plain copy
+        dst = os.path.join(self.out, "grp.rar")
+        strategies = (failing("hardlink"), failing("reflink"), utils.linker.copy_range, utils.linker.copy)
+        with mock.patch.dict(utils.linker.STRATEGIES, {"auto": strategies}):
+            expected = "copy_range" if hasattr(os, "copy_file_range") else "copy"
+            self.assertEqual(utils.linker.link_file(self.src, dst, "auto"), expected)
+        self.assertEqual(self.read(dst), b"first volume")
+
+        strategies = (failing("hardlink"), failing("reflink"), failing("copy_range", errno.EOPNOTSUPP), utils.linker.copy)
+        with mock.patch.dict(utils.linker.STRATEGIES, {"auto": strategies}):
+            self.assertEqual(utils.linker.link_file(self.src, dst, "auto"), "copy")
+        self.assertEqual(self.read(dst), b"first volume")
+        self.assertNoPart()
+
+    def test_failed_copy_is_cleaned_up(self):
+        # An existing dst is only replaced by a complete file
+        dst = self.write("out/grp.rar", b"old volume")
+        with mock.patch.dict(utils.linker.STRATEGIES, {"copy": (broken_copy,)}):
+            with self.assertRaises(OSError) as raised:
+                utils.linker.link_file(self.src, dst, "copy")
+        self.assertEqual(raised.exception.errno, errno.ENOSPC)
+        self.assertEqual(self.read(dst), b"old volume")
+        self.assertNoPart()
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            utils.linker.link_file(self.src, self.out, "move")
+        with self.assertRaises(ValueError):
+            utils.linker.link_file(os.path.join(self.tmp.name, "missing.rar"), self.out)
+
+    def test_move_file_overwrites(self):
+        dst = self.write("out/grp.rar", b"old volume")
+        self.assertEqual(utils.linker.move_file(self.src, self.out), "rename")
+        self.assertEqual(self.read(dst), b"first volume")
+        self.assertFalse(os.path.exists(self.src))
+
+    def test_move_file_across_filesystems(self):
+        dst = self.write("out/grp.rar", b"old volume")
+        replace = os.replace
+
+        def cross_device(src, dst):
+            # Only the rename of the source crosses a filesystem, the .part is on the same one as dst
+            if src == self.src:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+            return replace(src, dst)
+
+        with mock.patch("utils.linker.os.replace", side_effect=cross_device):
+            self.assertEqual(utils.linker.move_file(self.src, dst, "copy"), "copy")
+        self.assertEqual(self.read(dst), b"first volume")
+        self.assertFalse(os.path.exists(self.src))
+        self.assertNoPart()
+
+        # A symlink to the source can't outlive it, auto is used instead
+        src = self.write("src/grp.r00", b"second volume")
+        self.src = src
+        # Here the other filesystem is the same one, so the hardlink of auto works
+        with mock.patch("utils.linker.os.replace", side_effect=cross_device):
+            self.assertNotEqual(utils.linker.move_file(src, self.out, "symlink"), "symlink")
+        self.assertFalse(os.path.islink(os.path.join(self.out, "grp.r00")))
+        self.assertEqual(self.read(os.path.join(self.out, "grp.r00")), b"second volume")
+        self.assertFalse(os.path.exists(src))
+
+    def test_move_file_errors(self):
+        with self.assertRaises(FileNotFoundError):
+            utils.linker.move_file(os.path.join(self.tmp.name, "missing.rar"), self.out)
+
+if __name__ == "__main__":
+    unittest.main()
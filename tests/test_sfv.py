@@ -0,0 +1,125 @@
+import os
+import zlib
+import tempfile
+import unittest
+
+import utils.sfv
+from utils.runcontext import RunContext
+from support import load_autorescene
+
+def crc_of(data):
+    return f"{zlib.crc32(data):08X}"
+
+def crc_of_file(fpath):
+    with open(fpath, "rb") as f:
+        return crc_of(f.read())
+
+class FakeSRR:
+    # The only part of an SRR handle_crc_check reads
+    def __init__(self, stored_files):
+        self.stored_files = stored_files
+
+    def get_stored_files_name(self):
+        return self.stored_files
+
+class TempDirTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, data):
+        fpath = os.path.join(self.tmp.name, name)
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        with open(fpath, "wb") as f:
+            f.write(data)
+        return fpath
+
+class SFVTest(TempDirTest):
+    def test_parse_sfv(self):
+        sfv = self.write("grp.sfv", b"; generated by a tool\n"
+                                    b";grp.r00 00000000\n"
+                                    b"\n"
+                                    b"grp.rar 0a1b2c3d\n"
+                                    b"name with spaces.r00   DEADBEEF\n"
+                                    b"short.r01 ABCDEF\n"
+                                    b"long.r02 0123456789\n"
+                                    b"nothex.r03 0123456Z\n"
+                                    b"no_crc.r04\n")
+
+        self.assertEqual(utils.sfv.parse_sfv(sfv), [utils.sfv.SFVEntry("grp.rar", "0A1B2C3D"),
+                                                    utils.sfv.SFVEntry("name with spaces.r00", "DEADBEEF")])
+
+    def test_resolve_ignores_the_case(self):
+        fpath = self.write("Release/GRP.RAR", b"rar")
+        verifier = utils.sfv.SFVVerifier(crc_of_file)
+
+        self.assertEqual(verifier.resolve(os.path.dirname(fpath), "grp.rar"), fpath)
+        self.assertEqual(verifier.resolve(os.path.dirname(fpath), "GRP.RAR"), fpath)
+        self.assertIsNone(verifier.resolve(os.path.dirname(fpath), "grp.r00"))
+
+    def test_verify(self):
+        self.write("Release/grp.rar", b"first volume")
+        self.write("Release/Grp.R00", b"second volume")
+        self.write("Release/grp.r01", b"damaged volume")
+        sfv = self.write("Release/grp.sfv", f"grp.rar {crc_of(b'first volume')}\n"
+                                            f"grp.r00 {crc_of(b'second volume').lower()}\n"
+                                            f"grp.r01 {crc_of(b'third volume')}\n"
+                                            f"grp.r02 {crc_of(b'fourth volume')}\n".encode())
+
+        for jobs in (1, 4):
+            results = utils.sfv.SFVVerifier(crc_of_file, jobs).verify(sfv)
+            # In the order of the .sfv whatever the number of jobs
+            self.assertEqual([(result.name, result.status) for result in results],
+                             [("grp.rar", utils.sfv.OK), ("grp.r00", utils.sfv.OK),
+                              ("grp.r01", utils.sfv.MISMATCH), ("grp.r02", utils.sfv.MISSING)])
+            self.assertEqual(results[2].actual, crc_of(b"damaged volume"))
+            self.assertIsNone(results[3].path)
+
+    def test_verify_missing_sfv(self):
+        with self.assertRaises(OSError):
+            utils.sfv.SFVVerifier(crc_of_file).verify(os.path.join(self.tmp.name, "missing.sfv"))
+
+class CRCCheckTest(TempDirTest):
+    # The CRC checks of autorescene.py run on every entry and keep missing_files up to date
+    def setUp(self):
+        super().setUp()
+        self.autorescene = load_autorescene()
+        self.autorescene.ctx = RunContext()
+        self.args = {'jobs': 2, 'link_mode': "copy"}
+        self.release = {'release': "Movie.2020.720p.BluRay.x264-GRP"}
+        self.autorescene.ctx.release_list[self.release['release']] = dict()
+        self.fpath = os.path.join(self.tmp.name, self.release['release'])
+
+    def test_handle_crc_check(self):
+        ctx = self.autorescene.ctx
+        self.write(f"{self.release['release']}/grp.rar", b"first volume")
+        self.write(f"{self.release['release']}/grp.r00", b"damaged volume")
+        self.write(f"{self.release['release']}/grp.sfv", f"grp.rar {crc_of(b'first volume')}\n"
+                                                         f"grp.r00 {crc_of(b'second volume')}\n"
+                                                         f"grp.r01 {crc_of(b'third volume')}\n".encode())
+        # Listed as missing before the release was rebuilt
+        ctx.missing_files.append(os.path.join(self.release['release'], "GRP.RAR"))
+
+        self.autorescene.handle_crc_check(self.args, self.fpath, FakeSRR(["grp.sfv"]), self.release, None)
+
+        self.assertEqual(ctx.missing_files, [os.path.join(self.release['release'], "grp.r00"),
+                                             os.path.join(self.release['release'], "grp.r01")])
+        self.assertEqual(ctx.success_release, 0)
+        self.assertTrue(ctx.release_list[self.release['release']]['rescene'])
+
+    def test_check_crc_and_fix(self):
+        ctx = self.autorescene.ctx
+        self.write(f"{self.release['release']}/Subs/grp-subs.rar", b"subs")
+        self.write(f"{self.release['release']}/Subs/grp-subs.r00", b"damaged subs")
+        sfv = self.write(f"{self.release['release']}/Subs/grp-subs.sfv", f"grp-subs.r00 {crc_of(b'more subs')}\n"
+                                                                         f"grp-subs.rar {crc_of(b'subs')}\n"
+                                                                         f"grp-subs.r01 {crc_of(b'last subs')}\n".encode())
+        ctx.missing_files.append(os.path.join(self.release['release'], "Subs", "grp-subs.rar"))
+
+        # The first entry is damaged, the ones after it are checked all the same
+        self.assertFalse(self.autorescene.check_crc_and_fix(sfv, self.fpath, [], [], [], self.args, self.release))
+        self.assertEqual(ctx.missing_files, [os.path.join(self.release['release'], "Subs", "grp-subs.r00"),
+                                             os.path.join(self.release['release'], "Subs", "grp-subs.r01")])
+
+if __name__ == "__main__":
+    unittest.main()
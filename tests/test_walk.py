@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from utils.fileindex import FileIndex
+from utils.walk import PRUNED_DIRS, Walker
+
+EXTENSIONS = {".mkv", ".avi", ".rar"}
+
+class WalkerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.top = os.path.join(self.tmp.name, "lib")
+        for name in ("top.mkv", "notes.txt",
+                     "A.Release/a.rar", "A.Release/a.nfo", "A.Release/Sample/a-sample.mkv", "A.Release/Proof/a-proof.rar",
+                     "B.Release/b.mkv", "B.Release/Subs/b-subs.rar", "B.Release/CD1/b1.avi", "B.Release/CD1/Extra/b2.AVI",
+                     "C.Release/c.avi", "C.Release/samples/c-sample.avi"):
+            fpath = os.path.join(self.top, name)
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            open(fpath, "wb").close()
+        # Symlinks to dirs aren't followed
+        os.symlink(os.path.join(self.top, "A.Release"), os.path.join(self.top, "D.Release"))
+
+    def os_walk(self, top):
+        # What os.walk gives with the same pruning
+        paths = []
+        for root, dirs, files in os.walk(top):
+            dirs[:] = [d for d in dirs if d.lower() not in PRUNED_DIRS]
+            paths.extend(os.path.join(root, f) for f in files if os.path.splitext(f)[1].lower() in EXTENSIONS)
+        return paths
+
+    def test_order_and_pruning(self):
+        walker = Walker([self.top], EXTENSIONS)
+        paths = [item.path for item in walker.files()]
+
+        self.assertEqual(paths, self.os_walk(self.top))
+        self.assertEqual(sorted(os.path.relpath(path, self.top) for path in paths),
+                         sorted(os.path.normpath(path) for path in ("top.mkv", "A.Release/a.rar", "B.Release/b.mkv",
+                                                                    "B.Release/CD1/b1.avi", "B.Release/CD1/Extra/b2.AVI",
+                                                                    "C.Release/c.avi")))
+        self.assertEqual(walker.discovered, 6)
+        self.assertTrue(walker.finished)
+
+    def test_items(self):
+        fpath = os.path.join(self.top, "top.mkv")
+        with open(fpath, "wb") as f:
+            f.write(b"video")
+        st = os.stat(fpath)
+
+        items = {item.path: item for item in Walker([self.top, fpath], EXTENSIONS).files()}
+        self.assertEqual(items[fpath], (fpath, 5, st.st_mtime_ns, st.st_dev))
+
+    def test_pruned_dirs_are_indexed(self):
+        # Found by name by the index, never given to the process functions
+        index = FileIndex()
+        paths = [item.path for item in Walker([self.top], EXTENSIONS, index=index).files()]
+
+        self.assertEqual(paths, self.os_walk(self.top))
+        sample = os.path.join(self.top, "A.Release", "Sample", "a-sample.mkv")
+        self.assertIn(os.path.abspath(sample), index.files["a-sample.mkv"])
+        self.assertIn("b-subs.rar", index.files)
+        self.assertTrue(index.is_indexed(os.path.join(self.top, "B.Release")))
+
+    def test_run_ahead(self):
+        walker = Walker([self.top], EXTENSIONS)
+        self.assertEqual([item.path for item in walker.run_ahead(walker.files())], self.os_walk(self.top))
+
+    def test_release_dirs(self):
+        names = [os.path.basename(item.path) for item in Walker([self.top]).release_dirs()]
+        self.assertEqual(sorted(names), ["A.Release", "B.Release", "C.Release", "D.Release"])
+
+if __name__ == "__main__":
+    unittest.main()
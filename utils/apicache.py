@@ -0,0 +1,76 @@
+import json
+import time
+import threading
+import utils.res
+
+class APICache:
+    """
+    Local cache of srrdb search API responses keyed by the query url.
+    Responses with results and empty responses have their own time to live.
+    With refresh=True only the responses stored during this run (since
+    opened, the time the cache was created unless given) are read, the older
+    ones are asked again. With retry_negative only the older responses
+    without results are asked again.
+    """
+    def __init__(self, filename=None, positive_ttl=None, negative_ttl=None, refresh=False, retry_negative=False, opened=None):
+        self.filename = filename or utils.res.API_CACHE_FILE
+        self.positive_ttl = utils.res.API_CACHE_POSITIVE_TTL if positive_ttl is None else positive_ttl
+        self.negative_ttl = utils.res.API_CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.refresh = refresh
+        self.retry_negative = retry_negative
+        # Start of the run, given by the main process to the --workers processes
+        self.opened = opened or time.time()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = utils.res.open_database(self.filename)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                query TEXT PRIMARY KEY,
+                                data TEXT NOT NULL,
+                                positive INTEGER NOT NULL,
+                                stored REAL NOT NULL)""")
+        self.conn.commit()
+
+    @staticmethod
+    def is_positive(data):
+        return 'resultsCount' in data and int(data['resultsCount']) > 0
+
+    def outdated(self, positive, stored):
+        # Stored before this run and asked again by refresh or retry_negative
+        return stored < self.opened and (self.refresh or (self.retry_negative and not positive))
+
+    def get(self, query):
+        # Return the cached json data of query or None if unknown, expired or outdated
+        with self.lock:
+            row = self.conn.execute("SELECT data, positive, stored FROM responses WHERE query = ?", (query,)).fetchone()
+
+        if row and not self.outdated(row[1], row[2]):
+            ttl = self.positive_ttl if row[1] else self.negative_ttl
+            if time.time() - row[2] < ttl:
+                self.hits += 1
+                return json.loads(row[0])
+
+        self.misses += 1
+        return None
+
+    def set(self, query, data):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses (query, data, positive, stored) VALUES (?, ?, ?, ?)",
+                              (query, json.dumps(data), int(self.is_positive(data)), time.time()))
+            self.conn.commit()
+
+    def prune(self):
+        # Remove every expired response
+        now = time.time()
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM responses WHERE (positive = 1 AND stored < ?) OR (positive = 0 AND stored < ?)",
+                                    (now - self.positive_ttl, now - self.negative_ttl))
+            self.conn.commit()
+        return cur.rowcount
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,81 +1,66 @@
 import os
 import sys
 import re
+import operator
+import collections
 import subprocess
 import utils.res
 
-def get_files_in_directory(root_dir):
-    # This function returns a list of all files in the given directory and its subdirectories
-    return [os.path.join(dirpath, filename) for dirpath, _, filenames in os.walk(root_dir) for filename in filenames]
-
-def get_file_list(path, rlsname, mindepth=1, maxdepth=None, type_filter='f'):
-    results = []
-    for root, dirs, files in os.walk(path):
-        # Calculate the current depth
-        depth = root[len(path):].count(os.sep) + 1
-    
-        # Filter by depth
-        if mindepth and depth < mindepth:
-            continue
-        if maxdepth and depth > maxdepth:
-            dirs[:] = []  # Don't descend further
-            continue
-    
-        # Filter by file type and get relative paths
-        if type_filter == 'f':
-            for f in files:
-                full_path = os.path.normpath(os.path.join(root, f))
-                # Make path relative to rlsname
-                if rlsname in full_path:
-                    rel_path = full_path.split(rlsname, 1)[1].lstrip(os.sep)
-                    results.append(os.path.join(rlsname, rel_path))
-        elif type_filter == 'd':
-            for d in dirs:
-                full_path = os.path.normpath(os.path.join(root, d))
-                # Make path relative to rlsname
-                if rlsname in full_path:
-                    rel_path = full_path.split(rlsname, 1)[1].lstrip(os.sep)
-                    results.append(os.path.join(rlsname, rel_path))
-
-    return results
-    
+class ReleaseSnapshot:
+    """
+    Files and dirs of a release read with one scandir walk, each with the
+    depth of the dir listing it (1 for the release dir itself). The release
+    type and every check run on it instead of walking the release again.
+    Like os.walk, symlinks to dirs are listed as dirs but not followed.
+    """
+    def __init__(self, path):
+        self.path = os.path.normpath(path)
+        self.name = os.path.basename(self.path)
+        self.files = []
+        self.dirs = []
+        self.scan()
+
+    def scan(self):
+        stack = [(self.path, "", 1)]
+        while stack:
+            folder, rel, depth = stack.pop()
+            try:
+                it = os.scandir(folder)
+            except OSError:
+                # Only a missing or unreadable release is an error, like os.listdir
+                if depth == 1:
+                    raise
+                continue
+
+            with it:
+                for entry in it:
+                    entry_rel = os.path.join(rel, entry.name) if rel else entry.name
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        self.dirs.append((entry_rel, depth))
+                        if not entry.is_symlink():
+                            stack.append((entry.path, entry_rel, depth + 1))
+                    else:
+                        self.files.append((entry_rel, depth))
+
+    def file_list(self, mindepth=1, maxdepth=None):
+        # Files as release/sub/file, listed by a dir between mindepth and maxdepth
+        return [os.path.join(self.name, rel) for rel, depth in self.files if depth >= mindepth and not (maxdepth and depth > maxdepth)]
+
+    def dir_list(self, mindepth=1, maxdepth=None):
+        return [os.path.join(self.name, rel) for rel, depth in self.dirs if depth >= mindepth and not (maxdepth and depth > maxdepth)]
+
+    def root_files(self):
+        return [rel for rel, depth in self.files if depth == 1]
+
 def normalize(paths):
     return [os.path.normpath(d).replace(os.path.sep, '/') for d in paths]
 
-def get_release_type(rlsname):
-    if re.search(r'dir.?fix', rlsname, re.IGNORECASE):
-        release_type = "DIRFIX"
-    elif re.search(r'nfo.?fix', rlsname, re.IGNORECASE):
-        release_type = "NFOFIX"
-    elif re.search(r'proof.?fix', rlsname, re.IGNORECASE):
-        release_type = "PROOFFIX"
-    elif re.search(r'sample.?fix', rlsname, re.IGNORECASE):
-        release_type = "SAMPLEFIX"
-    elif re.search(r'rar.?fix', rlsname, re.IGNORECASE):
-        release_type = "RARFIX"
-    elif re.search(r'sfv.?fix', rlsname, re.IGNORECASE):
-        release_type = "SFVFIX"
-    elif (re.search(r'\-([xh]26[45]|dvix|xvid)\-[0-9]{4}\-', rlsname, re.IGNORECASE) and
-          any(re.search(r'\.(mkv|avi)$', f, re.IGNORECASE) for f in os.listdir(rlsname) if os.path.isfile(os.path.join(rlsname, f)))):
-        release_type = "MVID"
-    elif any(re.search(r'\.(rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3})$', f, re.IGNORECASE) for f in get_files_in_directory(rlsname)):
-        release_type = "RAR"
-    elif any(re.search(r'\.zip$', f, re.IGNORECASE) for f in os.listdir(rlsname) if os.path.isfile(os.path.join(rlsname, f))):
-        release_type = "ZIP"
-    elif any(re.search(r'\.mp3$', f, re.IGNORECASE) for f in os.listdir(rlsname) if os.path.isfile(os.path.join(rlsname, f))):
-        release_type = "MP3"
-    elif any(re.search(r'\.flac$', f, re.IGNORECASE) for f in os.listdir(rlsname) if os.path.isfile(os.path.join(rlsname, f))):
-        release_type = "FLAC"
-    else:
-        release_type = "UNKNOWN"
-    
-    return release_type
-
-def check_bad_files(rlsname, rel_path, release_type):
-    release_status = "OK"
-
-    # List of exclusion patterns from zipscript
-    exclusion_patterns = [
+# List of exclusion patterns from zipscript, combined into a single pattern
+EXCLUSION_PATTERN = re.compile(r'|'.join([
     r'\[.*%.*incomplete.*\]',          # ex: [something%incomplete]
     r'\[.*-.*-.*\]',                   # ex: [foo-bar-baz]
     r'\[.*\].*\(.*\).*?\[.*\]',        # ex: [foo](bar)[baz]
@@ -88,145 +73,164 @@ def check_bad_files(rlsname, rel_path, release_type):
     r'^.*100\% COMPLETED.*$',          # ex: Done at 100% COMPLETED
     r'^.*DONE AT 100\%.*$',            # ex: Completed. DONE AT 100%
     r'^.*F - COMPLETE.*$',             # ex: F - COMPLETE
-    r'\.message$']                     # ex: .message
-
-    # Combine all patterns into a single pattern
-    combined_pattern = re.compile(r'|'.join(exclusion_patterns), re.IGNORECASE)
+    r'\.message$']),                   # ex: .message
+    re.IGNORECASE)
+
+NOT_ALLOWED_PATTERN = re.compile(r'(.*\([0-9]?\)\.[a-z0-9]{3}$)|(\[|\]|\"|<|>|\*|%|\^|\+|\=|\{|\}|\:|\ |\;|\,|\?|\!)'
+                                 r'|(folder.jpg|rushchk.log|Thumbs.db|tvmaze.nfo|desktop.ini|albumartsmall.jpg|'
+                                 r'\.bad|\.missing|\.user|\.txt|\.pdf|\.requests|\.ok|\.debug|\.imdbdata|imdb.nfo|\.html|\.iso|\.bin)$',
+                                 re.IGNORECASE)
+
+# Every file is put in one category by its extension, "other" when none matches
+FILE_CATEGORIES = re.compile(r'\.(?:(?P<nfo>nfo)|(?P<sfv>sfv)|(?P<rar>rar|[r-z][0-9]{2}|[0-9]{3})|(?P<mkv>mkv)|(?P<avi>avi)'
+                             r'|(?P<video>wmv|mp4|ts|m2ts|vob)|(?P<image>jpe?g|png)|(?P<zip>zip)|(?P<diz>diz)|(?P<mp3>mp3)'
+                             r'|(?P<flac>flac)|(?P<m3u>m3u)|(?P<cue>cue)|(?P<log>log))$', re.IGNORECASE)
+# Every sub dir by its name
+DIR_CATEGORIES = re.compile(r'/(?:(?P<disc>(?:dvd|cd|dis[ck])[0-9][0-9]?)|(?P<sample>samples?)|(?P<proof>proofs?)|(?P<subs>subs?))$',
+                            re.IGNORECASE)
+
+# Names of the fix release types, checked in this order
+FIX_TYPES = [(re.compile(pattern, re.IGNORECASE), release_type) for pattern, release_type in (
+    (r'dir.?fix', "DIRFIX"), (r'nfo.?fix', "NFOFIX"), (r'proof.?fix', "PROOFFIX"),
+    (r'sample.?fix', "SAMPLEFIX"), (r'rar.?fix', "RARFIX"), (r'sfv.?fix', "SFVFIX"))]
+MVID_PATTERN = re.compile(r'\-([xh]26[45]|dvix|xvid)\-[0-9]{4}\-', re.IGNORECASE)
+
+VIDEO = {"mkv", "avi", "video"}
+OPERATORS = {"!=": operator.ne, "==": operator.eq, ">": operator.gt}
+
+class Rule(collections.namedtuple("Rule", "scope categories op value status outside")):
+    """
+    The count of files (or root files, or dirs) of scope in categories,
+    or in none of them with outside=True, compared to value with op. When
+    the comparison is true the rule fails and status is the release status.
+    """
+    def __new__(cls, scope, categories, op, value, status, outside=False):
+        return super().__new__(cls, scope, frozenset(categories), op, value, status, outside)
+
+    def failed(self, counts):
+        count = sum(n for category, n in counts[self.scope].items() if (category in self.categories) != self.outside)
+        return OPERATORS[self.op](count, self.value)
+
+# Rules of every release type, all of them are checked and the last one failing gives the status
+RULES = {
+    "DIRFIX": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"nfo"}, "!=", 0, "BAD: nfo file missing", outside=True)],
+    "PROOFFIX": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"image"}, "==", 0, "BAD: jpg or jpeg or png file missing"),
+        Rule("files", {"nfo", "image"}, "!=", 0, "BAD: other file than nfo, jpg or jpeg, png present", outside=True)],
+    "SAMPLEFIX": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", VIDEO, "==", 0, "BAD: mkv, avi, wmv, mp4, ts, m2ts, vob file missing"),
+        Rule("files", {"nfo"} | VIDEO, "!=", 0, "BAD: other file than nfo, mkv, avi, wmv, mp4, ts, m2ts, vob present", outside=True)],
+    "RARFIX": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "!=", 1, "BAD: multiple sfv"),
+        Rule("files", {"rar"}, "==", 0, "BAD: rar archive file missing"),
+        Rule("files", {"nfo", "sfv", "rar"}, "!=", 0, "BAD: other file than nfo, sfv, rar archive present", outside=True)],
+    "SFVFIX": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "==", 0, "BAD: sfv file missing"),
+        Rule("files", {"nfo", "sfv"}, "!=", 0, "BAD: other file than nfo, sfv present", outside=True)],
+    "MVID": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "!=", 1, "BAD: multiple sfv"),
+        Rule("files", {"mkv", "avi"}, "==", 0, "BAD: mkv, avi file missing"),
+        Rule("files", {"nfo", "sfv", "mkv", "avi"}, "!=", 0, "BAD: other file than nfo, sfv, mkv, avi present", outside=True)],
+    "RAR": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "==", 0, "BAD: sfv missing"),
+        Rule("files", {"rar"}, "==", 0, "BAD: rar archive file missing"),
+        Rule("files", {"nfo", "sfv", "rar", "image"} | VIDEO, "!=", 0,
+             "BAD: nfo, sfv, mkv, avi, wmv, mp4, ts, m2ts, vob, jpg or jpeg, png, rar archive file missing", outside=True),
+        Rule("root", {"nfo", "sfv", "rar"}, "!=", 0, "BAD: nfo, sfv, rar archive file missing", outside=True),
+        Rule("dirs", {"sample"}, ">", 1, "BAD: more than one dir for sample, proof, subs"),
+        Rule("dirs", {"proof"}, ">", 1, "BAD: more than one dir for sample, proof, subs"),
+        Rule("dirs", {"subs"}, ">", 1, "BAD: more than one dir for sample, proof, subs"),
+        Rule("dirs", {"disc", "sample", "proof", "subs"}, "!=", 0, "BAD: other subdir than dvd, cd, disc or disk, sample, proof, subs", outside=True)],
+    "ZIP": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"zip"}, "==", 0, "BAD: zip file missing"),
+        Rule("files", {"nfo", "zip", "diz"}, "!=", 0, "BAD: other file than nfo, zip, diz present", outside=True)],
+    "MP3": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "==", 0, "BAD: sfv file missing"),
+        Rule("files", {"mp3"}, "==", 0, "BAD: mp3 file missing"),
+        Rule("files", {"nfo", "sfv", "mp3", "m3u", "image", "cue"}, "!=", 0,
+             "BAD: other file than nfo, sfv, mp3, m3u, jpg or jpeg, png, cue present", outside=True)],
+    "FLAC": [
+        Rule("files", {"nfo"}, "!=", 1, "BAD: multiple nfo"),
+        Rule("files", {"sfv"}, "==", 0, "BAD: sfv file missing"),
+        Rule("files", {"flac"}, "==", 0, "BAD: flac file missing"),
+        Rule("files", {"nfo", "sfv", "flac", "m3u", "image", "cue", "log"}, "!=", 0,
+             "BAD: other file than nfo, sfv, flac, m3u, jpg or jpeg, png, cue, log present", outside=True)],
+}
+RULES["NFOFIX"] = RULES["DIRFIX"]
+
+def classify(paths, pattern):
+    # Count of paths in every category of pattern, a single search per path
+    counts = collections.Counter()
+    for path in paths:
+        match = pattern.search(path)
+        counts[match.lastgroup if match else "other"] += 1
+    return counts
+
+def get_release_type(rlsname, snapshot=None):
+    if snapshot is None:
+        snapshot = ReleaseSnapshot(rlsname)
+
+    for pattern, release_type in FIX_TYPES:
+        if pattern.search(rlsname):
+            return release_type
+
+    root_counts = classify(snapshot.root_files(), FILE_CATEGORIES)
+    if MVID_PATTERN.search(rlsname) and (root_counts["mkv"] or root_counts["avi"]):
+        return "MVID"
+    if classify(snapshot.file_list(), FILE_CATEGORIES)["rar"]:
+        return "RAR"
+    for release_type in ("ZIP", "MP3", "FLAC"):
+        if root_counts[release_type.lower()]:
+            return release_type
+    return "UNKNOWN"
+
+def check_bad_files(rlsname, rel_path, release_type, snapshot=None):
+    release_status = "OK"
+    if snapshot is None:
+        snapshot = ReleaseSnapshot(rlsname)
 
     # Filter file lists
-    release_rootfilelist = [f for f in get_file_list(rlsname, rel_path, maxdepth=1) if not combined_pattern.search(f)]
-    release_filelist = [f for f in get_file_list(rlsname, rel_path) if not combined_pattern.search(f)]
-    release_subdirs = [d for d in get_file_list(rlsname, rel_path, type_filter='d') if not combined_pattern.search(d)]
-
-    normalized_rootfilelist = normalize(release_rootfilelist)
-    normalized_filelist = normalize(release_filelist)
-    normalized_subdirs = normalize(release_subdirs)
+    normalized_rootfilelist = normalize(f for f in snapshot.file_list(maxdepth=1) if not EXCLUSION_PATTERN.search(f))
+    normalized_filelist = normalize(f for f in snapshot.file_list() if not EXCLUSION_PATTERN.search(f))
+    normalized_subdirs = normalize(d for d in snapshot.dir_list() if not EXCLUSION_PATTERN.search(d))
 
     # Check for directories deeper than maxdepth
-    if len(get_file_list(rlsname, rel_path, mindepth=2, type_filter='d')) > 0:
+    if len(snapshot.dir_list(mindepth=2)) > 0:
         release_status = "BAD - too much sub dir: release/sub/sub/ exist"
         return release_status
 
     # Check for main regex issues
-    notallowed_regex_result = [f for f in normalized_filelist if re.search(r'(.*\([0-9]?\)\.[a-z0-9]{3}$)|(\[|\]|\"|<|>|\*|%|\^|\+|\=|\{|\}|\:|\ |\;|\,|\?|\!)'
-                                                                r'|(folder.jpg|rushchk.log|Thumbs.db|tvmaze.nfo|desktop.ini|albumartsmall.jpg|'
-                                                                r'\.bad|\.missing|\.user|\.txt|\.pdf|\.requests|\.ok|\.debug|\.imdbdata|imdb.nfo|\.html|\.iso|\.bin)$', f, re.IGNORECASE)]
-    if notallowed_regex_result:
+    if any(NOT_ALLOWED_PATTERN.search(f) for f in normalized_filelist):
         release_status = "BAD: not allowed file present"
         return release_status
 
-    # Check specific filter for release type conditions
-    if release_type in ["DIRFIX", "NFOFIX"]:
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if not re.search(r'\.nfo$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: nfo file missing"
-        return release_status
-    
-    if release_type == "PROOFFIX":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.(jpg|jpeg|png)$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: jpg or jpeg or png file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|jpg|jpeg|png)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, jpg or jpeg, png present"
-        return release_status
-
-    if release_type == "SAMPLEFIX":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.(mkv|avi|wmv|mp4|ts|m2ts|vob)$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: mkv, avi, wmv, mp4, ts, m2ts, vob file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|mkv|avi|wmv|mp4|ts|m2ts|vob)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, mkv, avi, wmv, mp4, ts, m2ts, vob present"
-        return release_status
-
-    if release_type == "RARFIX":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple sfv"
-        if len([f for f in normalized_filelist if re.search(r'\.(rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3})$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: rar archive file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv|rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3})$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, sfv, rar archive present"
-        return release_status
-
-    if release_type == "SFVFIX":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: sfv file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, sfv present"
-        return release_status
-
-    if release_type == "MVID":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple sfv"
-        if len([f for f in normalized_filelist if re.search(r'\.(mkv|avi)$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: mkv, avi file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv|mkv|avi)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, sfv, mkv, avi present"
-        return release_status
-
-    if release_type == "RAR":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: sfv missing"
-        if len([f for f in normalized_filelist if re.search(r'\.(rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3})$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: rar archive file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv|rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3}|mkv|avi|wmv|mp4|ts|m2ts|vob|jpg|jpeg|png)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: nfo, sfv, mkv, avi, wmv, mp4, ts, m2ts, vob, jpg or jpeg, png, rar archive file missing"
-        if len([f for f in normalized_rootfilelist if not re.search(r'\.(nfo|sfv|rar|(r|s|t|u|v|w|x|y|z)[0-9]{2}|[0-9]{3})$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: nfo, sfv, rar archive file missing"
-        if any(len([d for d in normalized_subdirs if re.search(pattern, d, re.IGNORECASE)]) > 1 for pattern in ['.*/samples?$', '.*/proofs?$', '.*/subs?$']):
-            release_status = "BAD: more than one dir for sample, proof, subs"
-        if len([d for d in normalized_subdirs if not re.search(r'.*/((dvd|cd|dis[ck])[0-9][0-9]?|samples?|proofs?|subs?)$', d, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other subdir than dvd, cd, disc or disk, sample, proof, subs"
-        return release_status
-
-    if release_type == "ZIP":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.zip$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: zip file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|zip|diz)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, zip, diz present"
-        return release_status
-
-    if release_type == "MP3":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: sfv file missing"
-        if len([f for f in normalized_filelist if re.search(r'\.mp3$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: mp3 file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv|mp3|m3u|jpe?g|png|cue)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, sfv, mp3, m3u, jpg or jpeg, png, cue present"
-        return release_status
-
-    if release_type == "FLAC":
-        if len([f for f in normalized_filelist if re.search(r'\.nfo$', f, re.IGNORECASE)]) != 1:
-            release_status = "BAD: multiple nfo"
-        if len([f for f in normalized_filelist if re.search(r'\.sfv$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: sfv file missing"
-        if len([f for f in normalized_filelist if re.search(r'\.flac$', f, re.IGNORECASE)]) == 0:
-            release_status = "BAD: flac file missing"
-        if len([f for f in normalized_filelist if not re.search(r'\.(nfo|sfv|flac|m3u|jpe?g|png|cue|log)$', f, re.IGNORECASE)]) != 0:
-            release_status = "BAD: other file than nfo, sfv, flac, m3u, jpg or jpeg, png, cue, log present"
-        return release_status
+    # Every file and dir is classified once, then the rules of the release type only compare counts
+    counts = {"files": classify(normalized_filelist, FILE_CATEGORIES),
+              "root": classify(normalized_rootfilelist, FILE_CATEGORIES),
+              "dirs": classify(normalized_subdirs, DIR_CATEGORIES)}
+    for rule in RULES.get(release_type, ()):
+        if rule.failed(counts):
+            release_status = rule.status
 
     return release_status
 
 def run_checks(rlsname):
     output = [] 
     try:
-        rls_type = get_release_type(os.path.normpath(rlsname))
-        status = check_bad_files(os.path.normpath(rlsname), os.path.basename(rlsname), rls_type)
+        # The release is walked once, type and checks use the same snapshot
+        snapshot = ReleaseSnapshot(rlsname)
+        rls_type = get_release_type(os.path.normpath(rlsname), snapshot)
+        status = check_bad_files(os.path.normpath(rlsname), os.path.basename(rlsname), rls_type, snapshot)
         if status == "OK":
             if rls_type == "UNKNOWN":
                 output.append(f"\t - {utils.res.SUCCESS} -> {rlsname} -> {utils.res.WARNING}{rls_type} -> passed all checks.")
@@ -0,0 +1,141 @@
+import os
+import time
+import threading
+import utils.res
+
+# Last accesses of cache hits are written in batches of this many entries, and when the cache is pruned or closed
+TOUCH_BATCH = 1000
+
+class CRCCache:
+    """
+    Persistent CRC32 cache stored in a sqlite database inside the config folder.
+    Entries are keyed by the identity of the file (st_dev, st_ino) and are only
+    valid while size and mtime_ns are unchanged, so a modified or replaced file
+    is always hashed again. The OSO hash computed in the same read is kept too.
+    Use ":memory:" as filename to keep the cache for the current run only.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename or utils.res.CRC_CACHE_FILE
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # (dev, ino) -> (last_access, path) of the hits not written yet
+        self.touched = dict()
+        self.conn = utils.res.open_database(self.filename)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS crc (
+                                dev INTEGER NOT NULL,
+                                ino INTEGER NOT NULL,
+                                size INTEGER NOT NULL,
+                                mtime_ns INTEGER NOT NULL,
+                                crc TEXT NOT NULL,
+                                path TEXT NOT NULL,
+                                last_access REAL NOT NULL,
+                                oso TEXT,
+                                PRIMARY KEY (dev, ino))""")
+        # Cache created before the OSO hash was stored
+        if "oso" not in [row[1] for row in self.conn.execute("PRAGMA table_info(crc)")]:
+            self.conn.execute("ALTER TABLE crc ADD COLUMN oso TEXT")
+        self.conn.commit()
+
+    def get(self, fpath, st=None):
+        # Return the cached CRC of fpath or None if unknown or outdated
+        entry = self.lookup(fpath, st)
+        return entry[0] if entry else None
+
+    def get_oso(self, fpath, st=None):
+        # Return the cached OSO hash of fpath or None if unknown, outdated or too small to have one
+        # Not counted in the stats, calc_crc already looked the file up
+        entry = self.lookup(fpath, st, count=False)
+        return entry[1] if entry else None
+
+    def lookup(self, fpath, st=None, count=True):
+        # Return (crc, oso) of fpath or None if unknown or outdated
+        try:
+            st = st or os.stat(fpath)
+        except OSError:
+            return None
+
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns, crc, oso FROM crc WHERE dev = ? AND ino = ?",
+                                    (st.st_dev, st.st_ino)).fetchone()
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                self.hits += count
+                self.touched[(st.st_dev, st.st_ino)] = (time.time(), os.path.abspath(fpath))
+                if len(self.touched) >= TOUCH_BATCH:
+                    self.flush()
+                return row[2], row[3]
+
+            # File has been modified or replaced since it was hashed
+            if row:
+                self.conn.execute("DELETE FROM crc WHERE dev = ? AND ino = ?", (st.st_dev, st.st_ino))
+                self.conn.commit()
+            self.misses += count
+            return None
+
+    def flush(self):
+        # Write the last accesses of the hits in one transaction, the lock is held
+        if self.touched:
+            self.conn.executemany("UPDATE crc SET last_access = ?, path = ? WHERE dev = ? AND ino = ?",
+                                  [(last_access, path, dev, ino) for (dev, ino), (last_access, path) in self.touched.items()])
+            self.conn.commit()
+            self.touched.clear()
+
+    def set(self, fpath, crc, st=None, oso=None):
+        # Store the CRC of fpath, st must be the stat taken before hashing so a change during the read is caught next time
+        try:
+            st = st or os.stat(fpath)
+        except OSError:
+            return
+
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO crc (dev, ino, size, mtime_ns, crc, path, last_access, oso) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, crc, os.path.abspath(fpath), time.time(), oso))
+            self.conn.commit()
+
+    def invalidate(self, fpath):
+        # Remove the entry of fpath if present
+        try:
+            st = os.stat(fpath)
+        except OSError:
+            return
+
+        with self.lock:
+            self.conn.execute("DELETE FROM crc WHERE dev = ? AND ino = ?", (st.st_dev, st.st_ino))
+            self.conn.commit()
+
+    def prune(self, max_age_days=None):
+        # Remove entries of deleted or modified files and entries not accessed for max_age_days
+        removed = 0
+        expire = time.time() - max_age_days * 86400 if max_age_days else None
+
+        with self.lock:
+            self.flush()
+            rows = self.conn.execute("SELECT dev, ino, size, mtime_ns, path, last_access FROM crc").fetchall()
+            for dev, ino, size, mtime_ns, path, last_access in rows:
+                try:
+                    st = os.stat(path)
+                    valid = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (dev, ino, size, mtime_ns)
+                except OSError:
+                    valid = False
+
+                if not valid or (expire and last_access < expire):
+                    self.conn.execute("DELETE FROM crc WHERE dev = ? AND ino = ?", (dev, ino))
+                    removed += 1
+
+            self.conn.commit()
+            if self.filename != ":memory:":
+                self.conn.execute("VACUUM")
+
+        return removed
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM crc").fetchone()[0]
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.conn.close()
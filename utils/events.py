@@ -0,0 +1,118 @@
+import json
+import time
+import functools
+import threading
+import contextlib
+
+# JSON-lines file given with --events, None when events are disabled
+stream = None
+# Objects with enter(stage) and exit(stage) called around every stage, like the --profile StageProfiler
+hooks = []
+local = threading.local()
+
+class EventStream:
+    """
+    JSON-lines event file, every event is written and flushed as one line as
+    soon as it's emitted so the file can be followed during the run.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.file = open(filename, "a", encoding="utf-8")
+
+    def emit(self, event):
+        line = json.dumps(event, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def open_stream(filename):
+    global stream
+    stream = EventStream(filename)
+    emit("run_start")
+
+def close_stream(**fields):
+    global stream
+    if stream:
+        emit("run_end", **fields)
+        stream.close()
+        stream = None
+
+def emit(event, **fields):
+    if stream:
+        stream.emit({"ts": round(time.time(), 3), "event": event, **fields})
+
+def set_context(**fields):
+    # Release and path of what this thread is working on, path starts a new context
+    if "path" in fields or not hasattr(local, "context"):
+        local.context = {"release": None, "path": None}
+    local.context.update(fields)
+
+def get_context():
+    return getattr(local, "context", {"release": None, "path": None})
+
+def current_stage():
+    stages = getattr(local, "stages", None)
+    return stages[-1] if stages else None
+
+def add_bytes(nbytes):
+    # Add to the bytes processed by the innermost stage of this thread
+    record = current_stage()
+    if record is not None and nbytes:
+        record["bytes"] += nbytes
+
+def set_outcome(outcome, **fields):
+    record = current_stage()
+    if record is not None:
+        record["outcome"] = outcome
+        record.update(fields)
+
+def truthy(result):
+    return "ok" if result else "fail"
+
+@contextlib.contextmanager
+def stage(name):
+    # Time a stage of this thread and emit it with its wall/cpu time, bytes and outcome
+    if stream is None and not hooks:
+        yield None
+        return
+
+    record = {"bytes": 0, "outcome": None}
+    if not hasattr(local, "stages"):
+        local.stages = []
+    local.stages.append(record)
+    for hook in hooks:
+        hook.enter(name)
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield record
+    except BaseException as e:
+        record["outcome"] = "error"
+        record["error"] = str(e)
+        raise
+    finally:
+        record["wall"] = round(time.perf_counter() - wall, 6)
+        record["cpu"] = round(time.thread_time() - cpu, 6)
+        for hook in reversed(hooks):
+            hook.exit(name)
+        local.stages.pop()
+        record["outcome"] = record["outcome"] or "ok"
+        emit("stage", stage=name, **get_context(), **record)
+
+def timed(name, outcome=None):
+    # Decorator running the function as a stage, outcome(result) gives the outcome if set_outcome wasn't called
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if record is not None and record["outcome"] is None and outcome:
+                    record["outcome"] = outcome(result)
+                return result
+        return wrapper
+    return decorator
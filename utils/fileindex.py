@@ -0,0 +1,121 @@
+import os
+import json
+import threading
+
+class FileIndex:
+    """
+    Index of file name -> {path: (size, mtime_ns)} of the library, filled during
+    the traversal or the first time a directory tree is searched, so finding a
+    Sample/Proof/Subs by name doesn't walk the same directory for every release.
+    A directory is only trusted once its whole tree has been indexed (a root).
+    Every candidate is checked with a stat before it is returned.
+    """
+    def __init__(self):
+        self.files = dict()
+        self.dirs = dict()
+        self.roots = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def norm(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def add(self, path, size=None, mtime_ns=None):
+        with self.lock:
+            self.files.setdefault(os.path.basename(path), dict())[os.path.abspath(path)] = (size, mtime_ns)
+
+    def add_dir(self, path, mtime_ns):
+        # Modification time of an indexed directory, used to know if a saved index is still valid
+        with self.lock:
+            self.dirs[os.path.abspath(path)] = mtime_ns
+
+    def add_root(self, path):
+        with self.lock:
+            self.roots.add(self.norm(path))
+
+    def is_indexed(self, path):
+        path = self.norm(path)
+        with self.lock:
+            return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self.roots)
+
+    def index_tree(self, top):
+        # Index every file under top, including Sample/Proof/Subs directories
+        stack = [top]
+        while stack:
+            root = stack.pop()
+            try:
+                self.add_dir(root, os.stat(root).st_mtime_ns)
+                with os.scandir(root) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            else:
+                                self.add(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        self.add_root(top)
+
+    def lookup(self, startdir, fname, size=None):
+        # Return the existing paths named fname under startdir, with the given size if known
+        if not self.is_indexed(startdir):
+            self.index_tree(startdir)
+
+        prefix = self.norm(startdir).rstrip(os.sep) + os.sep
+        with self.lock:
+            candidates = list(self.files.get(fname, dict()).keys())
+
+        found = []
+        for path in candidates:
+            if not self.norm(path).startswith(prefix):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Moved or deleted since it was indexed
+                with self.lock:
+                    self.files.get(fname, dict()).pop(path, None)
+                continue
+            if size is not None and st.st_size != size:
+                continue
+            found.append(path)
+        return found
+
+    def save(self, filename):
+        with self.lock:
+            data = {"roots": sorted(self.roots), "dirs": self.dirs,
+                    "files": {name: list(paths.keys()) for name, paths in self.files.items()}}
+        tmp_file = f"{filename}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, filename)
+
+    def load(self, filename):
+        # Load a saved index, a root is only kept if none of its directories changed since
+        try:
+            with open(filename, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        changed = set()
+        for path, mtime_ns in data.get("dirs", dict()).items():
+            try:
+                if os.stat(path).st_mtime_ns == mtime_ns:
+                    self.dirs[path] = mtime_ns
+                    continue
+            except OSError:
+                pass
+            changed.add(self.norm(path))
+
+        for root in data.get("roots", []):
+            prefix = root.rstrip(os.sep) + os.sep
+            if not any(path == root or path.startswith(prefix) for path in changed):
+                self.roots.add(root)
+
+        for name, paths in data.get("files", dict()).items():
+            for path in paths:
+                self.files.setdefault(name, dict())[path] = (None, None)
+        return True
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import utils.res
+
+# A fingerprint of a --check-crc check also stands for a check without it, not the other way around
+MODES = {"rar": ("rar", "crc"), "crc": ("crc",)}
+
+def release_fingerprint(path):
+    # sha1 of the sorted (relative name, size, mtime_ns) of every file of the release dir, symlinks aren't followed
+    entries = []
+    stack = [path]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    entries.append((os.path.relpath(entry.path, path).replace(os.sep, "/"), st.st_size, st.st_mtime_ns))
+        except OSError:
+            continue
+
+    digest = hashlib.sha1()
+    for name, size, mtime_ns in sorted(entries):
+        digest.update(f"{name}\0{size}\0{mtime_ns}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
+
+class Fingerprints:
+    """
+    Fingerprints of the release dirs that passed autorescene.py -c, stored
+    in a sqlite database inside the config folder with the release name, the
+    sha1 of its SRR in the SRR cache and the output of run_checks. A release
+    dir whose files and SRR didn't change since is skipped by the next -c
+    run, its checks are replayed instead.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename or utils.res.FINGERPRINT_FILE
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # Answers of get() for this run, a release dir is asked for by the srrdb prefetch then by check_dir
+        self.checked = dict()
+        self.conn = utils.res.open_database(self.filename)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS releases (
+                                path TEXT PRIMARY KEY,
+                                release TEXT NOT NULL,
+                                fingerprint TEXT NOT NULL,
+                                srr_sha1 TEXT,
+                                mode TEXT NOT NULL,
+                                checks TEXT NOT NULL,
+                                verified REAL NOT NULL)""")
+        self.conn.commit()
+
+    @staticmethod
+    def norm(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path, mode, srr_store=None):
+        # (release, checks, verified) when path is unchanged since it passed a check of mode, else None
+        key = (self.norm(path), mode)
+        if key not in self.checked:
+            self.checked[key] = self.lookup(path, mode, srr_store)
+        return self.checked[key]
+
+    def lookup(self, path, mode, srr_store=None):
+        with self.lock:
+            row = self.conn.execute("SELECT release, fingerprint, srr_sha1, mode, checks, verified FROM releases WHERE path = ?",
+                                    (self.norm(path),)).fetchone()
+
+        if row and row[3] in MODES[mode] and row[1] == release_fingerprint(path):
+            srr_sha1 = srr_store.get_sha1(row[0]) if srr_store else None
+            if srr_sha1 == row[2]:
+                self.hits += 1
+                return row[0], json.loads(row[4]), row[5]
+
+        self.misses += 1
+        return None
+
+    def set(self, path, release, mode, checks, srr_sha1=None):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO releases (path, release, fingerprint, srr_sha1, mode, checks, verified) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (self.norm(path), release, release_fingerprint(path), srr_sha1, mode, json.dumps(checks), time.time()))
+            self.conn.commit()
+
+    def invalidate(self, path):
+        with self.lock:
+            self.conn.execute("DELETE FROM releases WHERE path = ?", (self.norm(path),))
+            self.conn.commit()
+
+    def stats(self):
+        return f"{self.hits} unchanged, {self.misses} checked"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
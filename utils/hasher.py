@@ -0,0 +1,165 @@
+import os
+import mmap
+import queue
+import struct
+import threading
+import zlib
+import utils.res
+
+# Below this size a reader thread costs more than it saves
+THREADED_MIN_SIZE = 2 * 1024 * 1024
+
+# OSO hash uses the file size plus the first and last 64 KiB read as little-endian 64 bit integers
+OSO_BLOCK_SIZE = 65536
+OSO_STRUCT = struct.Struct(f"<{OSO_BLOCK_SIZE // 8}Q")
+
+class OSOCapture:
+    # Keep a copy of the first and last 64 KiB of a file while it is streamed for the CRC
+    def __init__(self, size):
+        self.size = size
+        self.head = bytearray(OSO_BLOCK_SIZE)
+        self.tail = bytearray(OSO_BLOCK_SIZE)
+        self.tail_start = size - OSO_BLOCK_SIZE
+
+    def feed(self, offset, view):
+        # Bytes past the size taken before the read (a file growing while it is hashed) are left out, the buffers stay 64 KiB
+        end = min(offset + len(view), self.size)
+        if end <= offset:
+            return
+        if offset < OSO_BLOCK_SIZE:
+            stop = min(end, OSO_BLOCK_SIZE)
+            self.head[offset:stop] = view[:stop - offset]
+        if end > self.tail_start and self.tail_start >= 0:
+            start = max(offset, self.tail_start)
+            self.tail[start - self.tail_start:end - self.tail_start] = view[start - offset:end - offset]
+
+    def hexdigest(self):
+        return oso_hash(self.size, self.head, self.tail)
+
+def oso_hash(size, head, tail):
+    # Same result as rescene.osohash.compute_hash (head and tail overlap below 128 KiB), None below 64 KiB like its ValueError
+    if size < OSO_BLOCK_SIZE:
+        return None
+    value = size + sum(OSO_STRUCT.unpack(bytes(head))) + sum(OSO_STRUCT.unpack(bytes(tail)))
+    return f"{value & 0xFFFFFFFFFFFFFFFF:016x}"
+
+def _advise_sequential(fd):
+    # Tell the kernel we read the whole file once, it can read ahead more aggressively
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def crc32_readinto(file, block_size, capture=None):
+    # Read fixed size blocks into one reused buffer
+    crc = 0
+    offset = 0
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    while True:
+        n = file.readinto(buf)
+        if not n:
+            break
+        crc = zlib.crc32(view[:n], crc)
+        if capture:
+            capture.feed(offset, view[:n])
+        offset += n
+    return crc
+
+def crc32_mmap(file, block_size, capture=None):
+    # Hash the file through a read-only memory map, empty files can't be mapped
+    if os.fstat(file.fileno()).st_size == 0:
+        return 0
+
+    crc = 0
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mm)
+        try:
+            for offset in range(0, len(mm), block_size):
+                crc = zlib.crc32(view[offset:offset + block_size], crc)
+                if capture:
+                    capture.feed(offset, view[offset:offset + block_size])
+        finally:
+            view.release()
+    return crc
+
+def crc32_threaded(file, block_size, capture=None):
+    # Double buffering: a reader thread fills the next buffer while the current one is hashed
+    buffers = [bytearray(block_size), bytearray(block_size)]
+    empty = queue.Queue()
+    full = queue.Queue()
+    for i in range(len(buffers)):
+        empty.put(i)
+
+    def reader():
+        try:
+            while True:
+                i = empty.get()
+                if i is None:
+                    return
+                n = file.readinto(buffers[i])
+                full.put((i, n))
+                if not n:
+                    return
+        except Exception as e:
+            full.put((None, e))
+
+    thread = threading.Thread(target=reader, name="crc-reader", daemon=True)
+    thread.start()
+
+    crc = 0
+    offset = 0
+    try:
+        while True:
+            i, n = full.get()
+            if i is None:
+                raise n
+            if not n:
+                break
+            view = memoryview(buffers[i])[:n]
+            crc = zlib.crc32(view, crc)
+            if capture:
+                capture.feed(offset, view)
+            view.release()
+            offset += n
+            empty.put(i)
+    finally:
+        # Unblock the reader if we stop early because of an error
+        empty.put(None)
+        thread.join()
+
+    return crc
+
+def _crc32_open_file(file, block_size, use_mmap, threaded, capture):
+    _advise_sequential(file.fileno())
+    if use_mmap:
+        return crc32_mmap(file, block_size, capture)
+    if threaded and os.fstat(file.fileno()).st_size >= THREADED_MIN_SIZE:
+        return crc32_threaded(file, block_size, capture)
+    return crc32_readinto(file, block_size, capture)
+
+def crc32_file(fpath, block_size=None, use_mmap=None, threaded=True):
+    # Calculate the CRC32 of a file and return it as an integer
+    block_size = block_size or utils.res.HASH_BLOCK_SIZE
+    if use_mmap is None:
+        use_mmap = utils.res.HASH_USE_MMAP
+
+    with open(fpath, "rb", buffering=0) as file:
+        return _crc32_open_file(file, block_size, use_mmap, threaded, None)
+
+def hash_file(fpath, block_size=None, use_mmap=None, threaded=True):
+    # Calculate the CRC32 and the OSO hash of a file in a single read, returns (crc, oso)
+    block_size = block_size or utils.res.HASH_BLOCK_SIZE
+    if use_mmap is None:
+        use_mmap = utils.res.HASH_USE_MMAP
+
+    with open(fpath, "rb", buffering=0) as file:
+        capture = OSOCapture(os.fstat(file.fileno()).st_size)
+        crc = _crc32_open_file(file, block_size, use_mmap, threaded, capture)
+    return crc, capture.hexdigest()
+
+def format_crc(crc):
+    return f"{crc & 0xFFFFFFFF:08X}"
@@ -0,0 +1,54 @@
+import collections
+from utils.iosched import IOScheduler
+
+class HashPool:
+    """
+    Hash files in a thread pool ahead of the serial part of the process.
+    Paths are given back in their original order, the result of the hash
+    is retrieved later with pop() so the consumer never depends on which
+    thread finished first. then is called with every hash as soon as it is
+    known, to start the next step (srrdb search) without waiting. key gives
+    the path of an item when items aren't paths. Files of a spinning disk
+    are hashed one at a time, see IOScheduler.
+    """
+    def __init__(self, hash_func, jobs, accept=None, then=None, key=None):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+
+        self.hash_func = hash_func
+        self.accept = accept
+        self.then = then
+        self.key = key or (lambda item: item)
+        self.window = jobs * 2
+        self.scheduler = IOScheduler(jobs, thread_name_prefix="hash")
+        self.futures = dict()
+
+    def prefetch(self, items):
+        # Yield every item in order while up to window files are already being hashed
+        pending = collections.deque()
+        for item in items:
+            if self.accept is None or self.accept(item):
+                path = self.key(item)
+                self.futures[path] = self.scheduler.submit(path, self.run, path)
+            pending.append(item)
+            if len(pending) > self.window:
+                yield pending.popleft()
+
+        while pending:
+            yield pending.popleft()
+
+    def run(self, path):
+        result = self.hash_func(path)
+        if self.then:
+            self.then(result)
+        return result
+
+    def pop(self, path):
+        # Return the future of path if it has been hashed ahead, None otherwise
+        return self.futures.pop(path, None)
+
+    def shutdown(self):
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+        self.scheduler.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,124 @@
+import os
+import threading
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import utils.res
+
+def device_of(path):
+    # st_dev of path, None when it can't be stat (missing file)
+    try:
+        return os.stat(path).st_dev
+    except (OSError, TypeError, ValueError):
+        return None
+
+def is_rotational(dev):
+    # True for a spinning disk, False for an SSD, None when unknown (not Linux, network or virtual filesystem)
+    if dev is None or not hasattr(os, "major"):
+        return None
+
+    block = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    # A partition has no queue of its own, it is the one of its parent disk
+    for queue in (os.path.join(block, "queue"), os.path.join(os.path.realpath(block), os.pardir, "queue")):
+        try:
+            with open(os.path.join(queue, "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+class IOScheduler:
+    """
+    Run I/O bound work in a thread pool of jobs threads without ever sending
+    concurrent reads to a spinning disk. Work is queued per device (st_dev
+    of the path it reads), a rotational device runs rotational_jobs at once
+    and any other one up to jobs. Devices take turns so every disk keeps
+    busy. submit() gives a Future like ThreadPoolExecutor.submit(), so
+    results can be used in the order they were submitted.
+    """
+    def __init__(self, jobs, rotational_jobs=None, thread_name_prefix="io"):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+
+        self.jobs = jobs
+        self.rotational_jobs = max(1, rotational_jobs or utils.res.IO_ROTATIONAL_JOBS)
+        self.executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix=thread_name_prefix)
+        self.lock = threading.Condition()
+        # Work waiting per device, in the order devices take turns
+        self.queues = collections.OrderedDict()
+        self.running = collections.Counter()
+        self.total = 0
+        self.limits = dict()
+
+    def limit(self, dev):
+        # Threads allowed to read dev at the same time, an unknown device is handled like an SSD
+        if dev not in self.limits:
+            self.limits[dev] = min(self.jobs, self.rotational_jobs) if is_rotational(dev) else self.jobs
+        return self.limits[dev]
+
+    def submit(self, path, fn, *args):
+        dev = device_of(path)
+        self.limit(dev)
+        future = Future()
+        with self.lock:
+            self.queues.setdefault(dev, collections.deque()).append((future, fn, args))
+            self.dispatch()
+        return future
+
+    def map(self, fn, paths):
+        # fn(path) of every path, in the order of paths
+        futures = [self.submit(path, fn, path) for path in paths]
+        return [future.result() for future in futures]
+
+    def dispatch(self):
+        # Start queued work while threads are free, the lock is held
+        while self.total < self.jobs:
+            # Paths that can't be stat are queued on the device None, so None can't mean nothing is ready
+            ready = [dev for dev in self.queues if self.running[dev] < self.limits[dev]]
+            if not ready:
+                return
+            dev = ready[0]
+
+            future, fn, args = self.queues[dev].popleft()
+            if not self.queues[dev]:
+                del self.queues[dev]
+            else:
+                # Next turn goes to another device
+                self.queues.move_to_end(dev)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.running[dev] += 1
+            self.total += 1
+            self.executor.submit(self.run, dev, future, fn, args)
+
+    def run(self, dev, future, fn, args):
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self.lock:
+                self.running[dev] -= 1
+                self.total -= 1
+                self.dispatch()
+                self.lock.notify_all()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self.lock:
+            if cancel_futures:
+                for queue in self.queues.values():
+                    for future, _, _ in queue:
+                        future.cancel()
+                self.queues.clear()
+            if wait:
+                self.lock.wait_for(lambda: not self.queues and not self.total)
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        return False
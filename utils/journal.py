@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+import utils.res
+
+# Stage flags of release_list saved for every release
+STEPS = ("search", "extract", "rescene", "resample", "resubs")
+
+class Journal:
+    """
+    Journal of the last run of autorescene.py stored in a sqlite database
+    inside the config folder. Stage flags are saved per release as soon as
+    a stage is done, every file or release dir given to check_file/check_dir
+    is saved once it's done with the list it ended in (missing_files,
+    compressed_release, scanned_nothing_found or search_failed) if it failed. A run without
+    --resume or --retry-failed starts a new journal with clear().
+    """
+    def __init__(self, filename=None):
+        self.filename = filename or utils.res.JOURNAL_FILE
+        self.lock = threading.Lock()
+        self.conn = utils.res.open_database(self.filename)
+        self.conn.execute(f"""CREATE TABLE IF NOT EXISTS releases (
+                                release TEXT PRIMARY KEY,
+                                {", ".join(f"{step} INTEGER NOT NULL DEFAULT 0" for step in STEPS)},
+                                updated REAL NOT NULL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS paths (
+                                path TEXT PRIMARY KEY,
+                                release TEXT,
+                                failure TEXT,
+                                updated REAL NOT NULL)""")
+        self.conn.commit()
+
+    @staticmethod
+    def norm(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM releases")
+            self.conn.execute("DELETE FROM paths")
+            self.conn.commit()
+
+    def set_step(self, release, step):
+        if step not in STEPS:
+            raise ValueError(f"unknown step {step}")
+        with self.lock:
+            self.conn.execute(f"INSERT INTO releases (release, {step}, updated) VALUES (?, 1, ?) "
+                              f"ON CONFLICT(release) DO UPDATE SET {step} = 1, updated = excluded.updated",
+                              (release, time.time()))
+            self.conn.commit()
+
+    def get_steps(self, release):
+        # Stage flags saved for release, every flag is False for an unknown release
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(STEPS)} FROM releases WHERE release = ?", (release,)).fetchone()
+        return {step: bool(row[i]) if row else False for i, step in enumerate(STEPS)}
+
+    def finish(self, path, release=None, failure=None):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO paths (path, release, failure, updated) VALUES (?, ?, ?, ?)",
+                              (self.norm(path), release, failure, time.time()))
+            self.conn.commit()
+
+    def get(self, path):
+        # (release, failure) of a path done, None if it isn't done
+        with self.lock:
+            return self.conn.execute("SELECT release, failure FROM paths WHERE path = ?", (self.norm(path),)).fetchone()
+
+    def is_done(self, path):
+        return self.get(path) is not None
+
+    def is_failed(self, path):
+        row = self.get(path)
+        return bool(row and row[1])
+
+    def stats(self):
+        with self.lock:
+            done, failed = self.conn.execute("SELECT COUNT(*), COUNT(failure) FROM paths").fetchone()
+        return f"{done} done, {failed} failed"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,106 @@
+import os
+import errno
+import shutil
+
+# --link-mode choices, auto tries hardlink, reflink, copy_file_range then a plain copy
+MODES = ("copy", "hardlink", "reflink", "symlink", "auto")
+
+# ioctl cloning a whole file on btrfs/XFS (FICLONE from linux/fs.h)
+FICLONE = 0x40049409
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+def reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+    shutil.copystat(src, dst)
+
+def copy_range(src, dst):
+    # Copy inside the kernel, the filesystem may share the blocks (NFS server side copy, XFS/btrfs) instead of writing them
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.EOPNOTSUPP, "copy_file_range is not supported on this platform")
+
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        remaining = os.fstat(fin.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fin.fileno(), fout.fileno(), min(remaining, 1 << 30))
+            if copied == 0:
+                raise OSError(errno.EIO, f"copy_file_range stopped with {remaining} bytes left")
+            remaining -= copied
+    shutil.copystat(src, dst)
+
+def copy(src, dst):
+    shutil.copy2(src, dst)
+
+def symlink(src, dst):
+    os.symlink(os.path.abspath(src), dst)
+
+STRATEGIES = {
+    "copy": (copy,),
+    "hardlink": (hardlink,),
+    "reflink": (reflink,),
+    "symlink": (symlink,),
+    "auto": (hardlink, reflink, copy_range, copy),
+}
+
+def link_file(src, dst, mode="copy"):
+    """
+    Give the content of the file src to dst (a file or a directory) with the
+    strategies of mode, the first one that works is used. dst is written
+    under a temporary name and replaced at the end, so an existing dst is
+    only overwritten by a complete file. Return the name of the strategy
+    used, None when dst already is src, raise OSError when all failed.
+    """
+    if mode not in STRATEGIES:
+        raise ValueError(f"unknown link mode {mode}")
+    if not os.path.isfile(src):
+        raise ValueError("src must be a file")
+
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return None
+
+    tmp = f"{dst}.part"
+    error = None
+    for strategy in STRATEGIES[mode]:
+        try:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            strategy(src, tmp)
+            os.replace(tmp, dst)
+            return strategy.__name__
+        except OSError as e:
+            error = e
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+
+    raise error
+
+def move_file(src, dst, mode="copy"):
+    """
+    Move the file src to dst (a file or a directory). A rename is tried
+    first, across filesystems the file is linked with the strategies of auto
+    (only the copies can work there) then src is removed. Unlike shutil.move
+    an existing dst file is replaced. Return the name of the strategy used.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    try:
+        os.replace(src, dst)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    # A symlink to src can't outlive it, hardlink and reflink fail across filesystems anyway
+    strategy = link_file(src, dst, "copy" if mode == "copy" else "auto")
+    os.remove(src)
+    return strategy
@@ -0,0 +1,140 @@
+import os
+import atexit
+import threading
+
+# Set by the first process creating a Logger, worker processes inherit it and never rotate the log
+OWNER_ENV = "PYAUTORESCENE_LOG_OWNER"
+
+class Logger:
+    """
+    Append-only log file kept open for the whole run. write() only queues the
+    text, a background thread writes it in one os.write() per batch every
+    flush_interval seconds or as soon as flush_size bytes are waiting. The file
+    is opened with O_APPEND so batches of several processes never overwrite
+    each other, only the owner process rotates it when it grows over max_size
+    (file.txt -> file.txt.1 ... file.txt.<backups>), the others reopen it.
+    """
+    def __init__(self, filename, max_size=0, backups=0, flush_interval=1.0, flush_size=65536, transform=None):
+        self.filename = filename
+        self.max_size = max_size
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.transform = transform
+        self.owner = os.environ.setdefault(OWNER_ENV, str(os.getpid())) == str(os.getpid())
+        self.reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self.close)
+
+    def reset(self):
+        # Called again in a forked child, the lock may be held and the thread doesn't exist there
+        self.cond = threading.Condition(threading.Lock())
+        self.io_lock = threading.Lock()
+        self.pending = []
+        self.pending_size = 0
+        self.fd = None
+        self.thread = None
+        self.closed = False
+        self.owner = self.owner and os.environ.get(OWNER_ENV) == str(os.getpid())
+
+    def write(self, text):
+        with self.cond:
+            self.pending.append(text)
+            self.pending_size += len(text)
+            if self.thread is None or self.closed:
+                self.closed = False
+                self.thread = threading.Thread(target=self.run, name="logger", daemon=True)
+                self.thread.start()
+            if self.pending_size >= self.flush_size:
+                self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.closed or self.pending_size >= self.flush_size, timeout=self.flush_interval)
+            # Taken and written under io_lock so a flush() from another thread keeps the order
+            with self.io_lock:
+                with self.cond:
+                    lines, closed = self.take()
+                if lines:
+                    self.write_lines(lines)
+            if closed:
+                return
+
+    def take(self):
+        # Pending lines and closed flag, cond must be held
+        lines = self.pending
+        self.pending = []
+        self.pending_size = 0
+        return lines, self.closed
+
+    def write_lines(self, lines):
+        data = "".join(lines)
+        if self.transform:
+            data = self.transform(data)
+        try:
+            if self.fd is None:
+                self.open()
+            os.write(self.fd, data.encode("utf-8", "replace"))
+            self.rotate_if_needed()
+        except OSError:
+            # A log that can't be written never stops the run
+            self.close_fd()
+
+    def open(self):
+        folder = os.path.dirname(self.filename)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def close_fd(self):
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+    def rotate_if_needed(self):
+        # Our file may have been rotated by the owner, the next batch goes to the new one
+        try:
+            current = os.stat(self.filename)
+        except FileNotFoundError:
+            self.close_fd()
+            return
+        if not os.path.samestat(current, os.fstat(self.fd)):
+            self.close_fd()
+            return
+
+        if not self.owner or not self.max_size or current.st_size < self.max_size:
+            return
+
+        self.close_fd()
+        if self.backups < 1:
+            os.remove(self.filename)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.filename}.{i}"):
+                os.replace(f"{self.filename}.{i}", f"{self.filename}.{i + 1}")
+        os.replace(self.filename, f"{self.filename}.1")
+
+    def flush(self):
+        # Write everything queued so far from the calling thread
+        with self.io_lock:
+            with self.cond:
+                lines, _ = self.take()
+            if lines:
+                self.write_lines(lines)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+            thread = self.thread
+            self.thread = None
+        if thread and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+        with self.io_lock:
+            self.close_fd()
@@ -0,0 +1,90 @@
+import os
+import time
+import cProfile
+import threading
+import tracemalloc
+
+class StageProfiler:
+    """
+    Hook of utils.events stages used by --profile. Every stage gets its calls,
+    wall and CPU time and the peak of traced memory while it ran. The outermost
+    stage running gets a cProfile (only one profiler can be active at a time),
+    so nested stages are part of the profile of the stage calling them.
+    report() gives the stages ranked by cumulative wall time, dump() writes a
+    <stage>.pstats file per stage for offline analysis.
+    """
+    def __init__(self):
+        self.stats = dict()
+        self.profiles = dict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.active = None
+        tracemalloc.start()
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def enter(self, name):
+        stack = self.stack()
+        # The peak of the calling stage so far is kept before it's reset for this one
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+        profile = None
+        with self.lock:
+            if self.active is None:
+                profile = self.profiles.setdefault(name, cProfile.Profile())
+                try:
+                    profile.enable()
+                    self.active = profile
+                except ValueError:
+                    # Another profiler is already running in this process
+                    profile = None
+
+        stack.append({"peak": 0, "profile": profile, "wall": time.perf_counter(), "cpu": time.thread_time()})
+
+    def exit(self, name):
+        frame = self.stack().pop()
+        wall = time.perf_counter() - frame["wall"]
+        cpu = time.thread_time() - frame["cpu"]
+        peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+        stack = self.stack()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+        with self.lock:
+            if frame["profile"]:
+                frame["profile"].disable()
+                self.active = None
+            stage = self.stats.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak": 0})
+            stage["calls"] += 1
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            stage["peak"] = max(stage["peak"], peak)
+
+    def report(self):
+        # Lines of the table of stages ranked by cumulative wall time
+        lines = [f"{'stage':<24}{'calls':>8}{'wall s':>12}{'mean s':>10}{'cpu s':>12}{'peak MiB':>10}"]
+        with self.lock:
+            ranked = sorted(self.stats.items(), key=lambda item: item[1]["wall"], reverse=True)
+        for name, stage in ranked:
+            lines.append(f"{name:<24}{stage['calls']:>8}{stage['wall']:>12.3f}{stage['wall'] / stage['calls']:>10.3f}"
+                         f"{stage['cpu']:>12.3f}{stage['peak'] / 1048576:>10.1f}")
+        return lines
+
+    def dump(self, folder):
+        # Write the cProfile of every stage as <stage>.pstats, returns the written paths
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+        with self.lock:
+            for name, profile in self.profiles.items():
+                path = os.path.join(folder, f"{name}.pstats")
+                profile.dump_stats(path)
+                paths.append(path)
+        return paths
+
+    def stop(self):
+        tracemalloc.stop()
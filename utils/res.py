@@ -6,8 +6,11 @@ import subprocess
 import json
 import re
 import time
+import sqlite3
+import threading
 from pathlib import Path
 from colorama import Fore, Style
+from utils.logger import Logger
 
 SUCCESS = Fore.GREEN + "  [SUCCESS] " + Fore.RESET
 FAIL = Fore.RED + "  [FAIL] " + Fore.RESET
@@ -16,11 +19,18 @@ DARK_YELLOW = '\033[38;5;3m'
 RESET = Style.RESET_ALL
 WARNING = f"{ORANGE}  [WARNING] {RESET}"
 verbose_flag = False 
+api_cache = None
 
 # YOU NEED TO EDIT WITH YOURS
 USERNAME = ""
 PASSWORD = ""
 SITE = "https://www.srrdb.com/"
+
+# SRRDB_SITE in the environment points the scripts at another srrdb, like the stand-in of benchmarks/srrdb_server.py
+SITE = os.environ.get("SRRDB_SITE", SITE).rstrip("/") + "/"
+USERNAME = os.environ.get("SRRDB_USERNAME", USERNAME)
+PASSWORD = os.environ.get("SRRDB_PASSWORD", PASSWORD)
+
 SRRDB_API = f"{SITE}api/search/"
 SRRDB_DOWNLOAD = f"{SITE}download/srr/"
 SRRDB_UPLOAD = f"{SITE}release/upload"
@@ -45,23 +55,110 @@ else:
 # Logs folder
 CONFIG_FOLDER = os.path.join(Path.home(), ".config", "srrdb")
 
+# CRC32 cache of already hashed files, entries not accessed for this many days are removed by --prune-crc-cache
+CRC_CACHE_FILE = "crc_cache.db"
+CRC_CACHE_MAX_AGE = 180
+
+# Files read at the same time from a spinning disk (seeks make concurrent reads much slower), SSD use --jobs/--workers
+IO_ROTATIONAL_JOBS = 1
+
+# Size of the blocks read to hash a file, use mmap instead of read() (can be faster on local NVMe, slower on NFS)
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+HASH_USE_MMAP = False
+
+# Downloaded SRR are kept in the config folder, the least recently used are removed above this size (0 = no limit)
+SRR_CACHE_FOLDER = "srr_cache"
+SRR_CACHE_INDEX = "srr_cache.db"
+SRR_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024
+
+# srrdb search responses are cached, in seconds how long a response with results / without results stays valid
+API_CACHE_FILE = "api_cache.db"
+API_CACHE_POSITIVE_TTL = 30 * 24 * 3600
+API_CACHE_NEGATIVE_TTL = 24 * 3600
+
+# Requests per second sent to srrdb (0 = no limit), burst allowed and pause in seconds when srrdb says we're too fast
+SRRDB_RATE_LIMIT = 2
+SRRDB_RATE_BURST = 5
+SRRDB_RATE_PAUSE = 60
+# Tokens of the srrdb rate limit shared by the worker processes of autorescene.py --workers
+RATE_LIMIT_FILE = "rate_limit.db"
+# SRR downloads allowed by srrdb per rolling day (0 = no limit), the last SRRDB_QUOTA_RESERVE are kept for you
+QUOTA_FILE = "quota.db"
+SRRDB_DAILY_QUOTA = 0
+SRRDB_QUOTA_RESERVE = 5
+
+# Log files of the config folder are rotated above this size, keeping LOG_BACKUPS old ones, and written every LOG_FLUSH_INTERVAL seconds
+LOG_MAX_SIZE = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+LOG_FLUSH_INTERVAL = 1.0
+
+# Index of the files of the library used to find Sample/Proof/Subs, saved in the config folder with --persist-index
+FILE_INDEX_FILE = "file_index.json"
+
+# Stage flags and failures of the last run of autorescene.py, used by --resume and --retry-failed
+JOURNAL_FILE = "journal.db"
+
+# Fingerprints of the release dirs that passed autorescene.py -c, unchanged ones are skipped unless --full is used
+FINGERPRINT_FILE = "fingerprints.db"
+
 def set_verbose_flag(flag):
     global verbose_flag
     verbose_flag = flag
 
+def set_api_cache(cache):
+    global api_cache
+    api_cache = cache
+
+ANSI_ESCAPE = re.compile(r'(?:\x1B[@-_][0-?]*[ -/]*[@-~])')
+loggers = dict()
+loggers_lock = threading.Lock()
+
 def remove_ansi_escape_codes(text):
-    ansi_escape = re.compile(r'(?:\x1B[@-_][0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return ANSI_ESCAPE.sub('', text)
+
+def get_logger(name):
+    # One buffered logger per log file of the config folder, escape codes are removed by its thread
+    with loggers_lock:
+        if name not in loggers:
+            loggers[name] = Logger(os.path.join(CONFIG_FOLDER, name), LOG_MAX_SIZE, LOG_BACKUPS,
+                                   LOG_FLUSH_INTERVAL, transform=remove_ansi_escape_codes)
+        return loggers[name]
+
+class Capture:
+    """
+    Output of a --workers process of autorescene.py: the text of verbose()
+    and of print() (given as sys.stdout) is kept with what has to be printed
+    and logged, the main process replays it in order with replay().
+    """
+    def __init__(self):
+        self.text = []
+
+    def write(self, string):
+        self.text.append((string, True, False))
+
+    def flush(self):
+        pass
+
+# Capture of the worker process, None in the main process
+capture = None
+
+def replay(text):
+    for string, printed, logged in text:
+        if printed:
+            print(string, end="")
+        if logged:
+            get_logger("autorescene.txt").write(string)
 
 def verbose(string, end='\n'):
-    filename = os.path.join(CONFIG_FOLDER, "autorescene.txt")
+    if capture is not None:
+        capture.text.append((string + end, verbose_flag, True))
+        return
+
     if verbose_flag:
         # Print the string to the console
         print(string, end=end)
-    
-    # Open the file in append mode and write the string
-    with open(filename, 'a') as file:
-        file.write(remove_ansi_escape_codes(string) + end)
+
+    get_logger("autorescene.txt").write(string + end)
 
 def format_time(seconds):
     # Format the time into hours, minutes, and seconds
@@ -84,6 +181,46 @@ def mkdir(path):
             raise OSError(e)
     return True
 
+# Open (and create if needed) a sqlite database inside the config folder
+def open_database(filename):
+    if filename == ":memory:":
+        return sqlite3.connect(filename, check_same_thread=False)
+
+    mkdir(CONFIG_FOLDER)
+    conn = sqlite3.connect(os.path.join(CONFIG_FOLDER, filename), timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+# Query the srrdb search API, the response comes from the api cache when it is still valid
+def query_api(url, s):
+    if api_cache:
+        data = api_cache.get(url)
+        if data is not None:
+            return data
+
+    response = s.retrieve_content(url)
+    data = response.json()
+
+    if api_cache:
+        api_cache.set(url, data)
+    return data
+
+# Search srrdb by OSO hash or by CRC
+def search_by(search_type, value, s):
+    if search_type == "archive-crc:" and len(value) != 8:
+        raise ValueError("CRC must have a length of 8")
+    if search_type == "isdbhash:" and not value:
+        raise ValueError("Release must have a valid OSO hash")
+
+    data = query_api(f"{SRRDB_API}{search_type}{value}", s)
+
+    # Check if the search returned any results
+    if 'resultsCount' not in data or int(data['resultsCount']) < 1:
+        return None
+
+    return data['results']
+
 # Search for a release by name on srrdb
 def search_by_name(name, s, isdir = False):
     if not name:
@@ -92,8 +229,7 @@ def search_by_name(name, s, isdir = False):
     name_search = f"{SRRDB_API}r:{name.rsplit('.', 1)[0] if not isdir else name}"
 
     try:
-        response = s.retrieve_content(name_search)
-        data = response.json()
+        data = query_api(name_search, s)
     except Exception as e:
         raise RuntimeError("Failed to retrieve content") from e
 
@@ -119,7 +255,7 @@ def download_srr(rls, s, path=None):
     path = os.path.join(path, os.path.basename(f"{srr_download}.srr"))
 
     try:
-        response = s.retrieve_content(srr_download)
+        response = s.retrieve_content(srr_download, login_required=True)
 
         if response.text in [
             "The SRR file does not exist.",
@@ -127,11 +263,13 @@ def download_srr(rls, s, path=None):
             "You have sent too many requests in a given amount of time."]:
             raise ValueError(response.text)
 
-        with open(path, "wb") as local_file:
-            for chunk in response.iter_content(chunk_size=1024):
+        # Write to a temporary file first so an interrupted download never leaves a truncated .srr
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as local_file:
+            for chunk in response.iter_content(chunk_size=1048576):
                 if chunk:
                     local_file.write(chunk)
-                    local_file.flush()
+        os.replace(tmp_path, path)
 
     except Exception as e:
         raise RuntimeError("Failed to download SRR file") from e
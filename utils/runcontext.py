@@ -0,0 +1,72 @@
+# Lists of failures reported at the end of a run
+FAILURES = ("missing_files", "compressed_release", "scanned_nothing_found", "search_failed")
+
+class RunContext:
+    """
+    Results of a run of autorescene.py: the releases processed and what has
+    to be reported at the end. With --workers every release is processed in
+    a worker process with a context of its own, the main process merges them
+    in the order the releases were found so the summary never depends on
+    which worker finished first.
+    """
+    def __init__(self):
+        self.release_list = dict()
+        self.missing_files = []
+        self.compressed_release = []
+        self.scanned_nothing_found = []
+        # Searches that ended in an error (srrdb down, still too many requests), unlike scanned_nothing_found they can find something later
+        self.search_failed = []
+        self.rls_check = []
+        self.deferred_downloads = []
+        self.success_release = 0
+        self.scanned_release = 0
+        self.skipped_release = 0
+        # Failures added to every list, never lowered when a file is found again or an entry was already listed
+        self.failed = dict.fromkeys(FAILURES, 0)
+        # Files missing in the release being processed, reset by start_release()
+        self.missing_rar = 0
+
+    def start_release(self):
+        self.missing_rar = 0
+
+    def add_failure(self, name, item):
+        getattr(self, name).append(item)
+        self.count_failure(name)
+
+    def count_failure(self, name):
+        self.failed[name] += 1
+
+    def failures(self):
+        # Count of failures of every list, given to failure_since() after a release
+        return tuple(self.failed[name] for name in FAILURES)
+
+    def failure_since(self, before):
+        # First list with failures added since failures() returned before, None if there's none
+        for name, count in zip(FAILURES, before):
+            if self.failed[name] > count:
+                return name
+        return None
+
+    def add_deferred(self, release):
+        if release not in self.deferred_downloads:
+            self.deferred_downloads.append(release)
+
+    def merge(self, other):
+        # Steps done for a release in any context are done, counters are added
+        for release, steps in other.release_list.items():
+            done = self.release_list.setdefault(release, dict())
+            for step, value in steps.items():
+                done[step] = done.get(step, False) or value
+
+        self.missing_files.extend(other.missing_files)
+        self.compressed_release.extend(other.compressed_release)
+        self.scanned_nothing_found.extend(other.scanned_nothing_found)
+        self.search_failed.extend(other.search_failed)
+        for name in FAILURES:
+            self.failed[name] += other.failed[name]
+        self.rls_check.extend(other.rls_check)
+        for release in other.deferred_downloads:
+            self.add_deferred(release)
+        self.success_release += other.success_release
+        self.scanned_release += other.scanned_release
+        self.skipped_release += other.skipped_release
@@ -0,0 +1,83 @@
+import os
+import re
+import collections
+from utils.iosched import IOScheduler
+
+# A CRC32 of an .sfv line, written as 8 hex digits in any case
+CRC_PATTERN = re.compile(r'^[0-9a-fA-F]{8}$')
+
+OK = "ok"
+MISSING = "missing"
+MISMATCH = "mismatch"
+
+SFVEntry = collections.namedtuple("SFVEntry", "name crc")
+SFVResult = collections.namedtuple("SFVResult", "name path expected actual status")
+
+def parse_sfv(sfv_path):
+    # Entries of an .sfv in their order: comments (;) and lines without a CRC are skipped, names can contain spaces
+    entries = []
+    with open(sfv_path, "r", encoding="utf-8-sig", errors="surrogateescape") as sfv_f:
+        for line in sfv_f:
+            line = line.strip()
+            if not line or line.startswith(';'):
+                continue
+            parts = line.rsplit(None, 1)
+            if len(parts) != 2 or not CRC_PATTERN.match(parts[1]):
+                continue
+            entries.append(SFVEntry(parts[0].strip(), parts[1].upper()))
+    return entries
+
+class SFVVerifier:
+    """
+    Verify the entries of .sfv files against the files next to them, hashing
+    up to jobs files at the same time with hash_func (calc_crc, which keeps
+    its results in the CRC cache), one at a time on a spinning disk. A file
+    whose name only differs by its case is found too. Results are given back
+    in the order of the .sfv.
+    """
+    def __init__(self, hash_func, jobs=1):
+        if jobs < 1:
+            raise ValueError("jobs must be at least 1")
+
+        self.hash_func = hash_func
+        self.jobs = jobs
+        self.listings = dict()
+
+    def resolve(self, folder, name):
+        # Path of name inside folder, matching the case of the file on disk, None if it doesn't exist
+        path = os.path.join(folder, os.path.normpath(name))
+        if os.path.isfile(path):
+            return path
+
+        parent, basename = os.path.split(path)
+        if parent not in self.listings:
+            try:
+                self.listings[parent] = {f.lower(): f for f in os.listdir(parent)}
+            except OSError:
+                self.listings[parent] = dict()
+        actual = self.listings[parent].get(basename.lower())
+        if actual and os.path.isfile(os.path.join(parent, actual)):
+            return os.path.join(parent, actual)
+        return None
+
+    def check(self, entry, path):
+        if path is None:
+            return SFVResult(entry.name, None, entry.crc, None, MISSING)
+
+        crc = (self.hash_func(path) or "").upper()
+        return SFVResult(entry.name, path, entry.crc, crc, OK if crc == entry.crc else MISMATCH)
+
+    def verify(self, sfv_path):
+        # SFVResult of every entry of sfv_path, raise OSError if the .sfv can't be read
+        folder = os.path.dirname(sfv_path)
+        # Files can be moved or rebuilt between two .sfv, the listings are only kept for one
+        self.listings = dict()
+        entries = parse_sfv(sfv_path)
+        paths = [self.resolve(folder, entry.name) for entry in entries]
+
+        if self.jobs == 1 or len(entries) < 2:
+            return [self.check(entry, path) for entry, path in zip(entries, paths)]
+
+        with IOScheduler(min(self.jobs, len(entries)), thread_name_prefix="sfv") as scheduler:
+            futures = [scheduler.submit(path, self.check, entry, path) for entry, path in zip(entries, paths)]
+            return [future.result() for future in futures]
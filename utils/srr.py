@@ -1,10 +1,48 @@
 import os
 import re
+import functools
+from collections import namedtuple
+from types import MappingProxyType
 from rescene import info, extract_files, reconstruct
 from rescene.srr import display_info
 from utils.srs import SRS
 import utils.res
 
+# Everything we need from rescene.info(), built once per SRR and never modified
+SRRModel = namedtuple("SRRModel", [
+    "compressed",        # bool
+    "rar_files",         # tuple of FileInfo of the RAR volumes in order
+    "archived_files",    # mapping archived name -> FileInfo
+    "archived_by_crc",   # mapping crc (8 chars) -> tuple of FileInfo
+    "stored_files",      # tuple of stored file names in order
+    "stored_by_ext",     # mapping lowercase extension -> tuple of stored file names
+    "sfv_entries",       # tuple of file names listed in the sfv files
+])
+
+def file_ext(fname):
+    # Lowercase extension with the dot, also for names like ".srs"
+    pos = fname.rfind(".")
+    return fname[pos:].lower() if pos != -1 else ""
+
+def build_model(srr_info):
+    archived_by_crc = dict()
+    for value in srr_info['archived_files'].values():
+        archived_by_crc.setdefault(value.crc32.zfill(8), []).append(value)
+
+    stored_by_ext = dict()
+    for sfile in srr_info['stored_files'].keys():
+        stored_by_ext.setdefault(file_ext(sfile), []).append(sfile)
+
+    return SRRModel(
+        compressed=bool(srr_info['compression']),
+        rar_files=tuple(srr_info['rar_files'].values()),
+        archived_files=MappingProxyType(dict(srr_info['archived_files'])),
+        archived_by_crc=MappingProxyType({k: tuple(v) for k, v in archived_by_crc.items()}),
+        stored_files=tuple(srr_info['stored_files'].keys()),
+        stored_by_ext=MappingProxyType({k: tuple(v) for k, v in stored_by_ext.items()}),
+        sfv_entries=tuple(str(sfile).split()[0] for sfile in srr_info['sfv_entries']),
+    )
+
 class SRR:
     def __init__(self, filename, binary=None):
         if not os.path.isfile(filename):
@@ -22,62 +60,80 @@ class SRR:
             else:
                 self.binary = binary
 
+    # parse the SRR only once, every getter is served from this model
+    @functools.cached_property
+    def model(self):
+        return build_model(info(self.filename))
+
+    # stored file names with one of the given extensions, in the order of the SRR
+    def get_stored_files_by_ext(self, *exts):
+        if len(exts) == 1:
+            return list(self.model.stored_by_ext.get(exts[0], ()))
+        return [sfile for sfile in self.model.stored_files if file_ext(sfile) in exts]
+
     # display info about this SRR
     def d_info(self):
         return display_info(self.filename)
 
     # check if compression method is used for RAR file
     def get_is_compressed(self):
-        return bool(info(self.filename)['compression'])
+        return self.model.compressed
 
     # search an srr for all rar-files presents
     # returns array of FileInfo's
     def get_rars_name(self):
-        return [sfile.file_name for sfile in info(self.filename)['rar_files'].values()]
+        return [sfile.file_name for sfile in self.model.rar_files]
 
     def get_rar_crc(self):
-        return [sfile.crc32 for sfile in info(self.filename)['rar_files'].values()]
+        return [sfile.crc32 for sfile in self.model.rar_files]
 
     def get_rars_nb(self):
-        return len(info(self.filename)['rar_files'])
+        return len(self.model.rar_files)
 
     def get_rars_size(self):
-        return sum(sfile.file_size for sfile in info(self.filename)['rar_files'].values())
+        return sum(sfile.file_size for sfile in self.model.rar_files)
+
+    # size of the RAR volume named fname or None if it's not in this SRR
+    def get_rar_size(self, fname):
+        for sfile in self.model.rar_files:
+            if os.path.basename(sfile.file_name).lower() == fname.lower():
+                return sfile.file_size
+        return None
 
     # search an srr for all non RAR files presents in all sfv file
     # returns array of FileInfo's
     def get_sfv_entries_name(self):
-        return [str(sfile).split()[0] for sfile in info(self.filename)['sfv_entries']]
+        return list(self.model.sfv_entries)
 
     def get_sfv_entries_nb(self):
-        return len(self.get_sfv_entries_name())
+        return len(self.model.sfv_entries)
 
     # search an srr for all files presents in srr
     # returns array of FileInfo's
     def get_stored_files_name(self):
-        return [sfile for sfile in info(self.filename)['stored_files'].keys() if not sfile.lower().endswith(".srs")]
+        return [sfile for sfile in self.model.stored_files if file_ext(sfile) != ".srs"]
 
     def get_archived_fname(self):
-        return list(info(self.filename)['archived_files'].keys())
+        return list(self.model.archived_files.keys())
 
     # search an srr for all archived-files that match given crc
     # returns array of FileInfo's matching the crc
     def get_archived_fname_by_crc(self, crc):
-        return [value for value in info(self.filename)['archived_files'].values() if crc == value.crc32.zfill(8)]
+        return list(self.model.archived_by_crc.get(crc, ()))
 
     # search an srr for all archived-files that much a given filename
     # returns an array of FileInfo's matching the fname
     def get_archived_crc_by_fname(self, fname):
-        return [k.crc32 for k in info(self.filename)['archived_files'].values() if k.file_name == fname]
+        return [k.crc32 for k in self.model.archived_files.values() if k.file_name == fname]
 
     def get_archived_crc(self):
-        return [k.crc32 for k in info(self.filename)['archived_files'].values()]
+        return [k.crc32 for k in self.model.archived_files.values()]
 
     def get_srs(self, path):
         if not os.path.isdir(path):
             raise AttributeError("path must be a valid directory")
 
-        srs_files = [sfile for sfile in info(self.filename)['stored_files'].keys() if sfile.lower().endswith(".srs")]
+        srs_files = self.get_stored_files_by_ext(".srs")
         extracted_paths = []
 
         # Iterate over each .srs file and extract only the path (ignore success/failure tuple)
@@ -104,7 +160,7 @@ class SRR:
         return sum(SRS(srs_path).get_filesize() for match in matches for srs_path in match)
 
     def get_proof_filename(self):
-        return [sfile for sfile in info(self.filename)['stored_files'].keys() if sfile.lower().endswith(('.jpg', '.jpeg', '.png'))]
+        return self.get_stored_files_by_ext(".jpg", ".jpeg", ".png")
 
     def extract_stored_files_regex(self, path, regex=".*"):
         # Check if the provided path is a valid directory
@@ -113,7 +169,7 @@ class SRR:
 
         extracted_files = []
 
-        for key in info(self.filename)["stored_files"].keys():
+        for key in self.model.stored_files:
             # Check if the filename matches the regex pattern
             if re.search(regex, key):
                 destination_file_path = os.path.join(path, os.path.normpath(key))
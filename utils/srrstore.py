@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import threading
+import utils.res
+from utils.srr import SRR
+
+# Every SRR starts with the SRR volume header block (crc 0x6969, type 0x69)
+SRR_MAGIC = b"\x69\x69\x69"
+
+class SRRStore:
+    """
+    Persistent content-addressed store of downloaded SRR files inside the config folder.
+    Files are saved as <sha1>.srr, an index maps release names to them. When the
+    store grows over max_size the least recently used SRR are removed.
+    """
+    def __init__(self, folder=None, max_size=None):
+        self.folder = folder or os.path.join(utils.res.CONFIG_FOLDER, utils.res.SRR_CACHE_FOLDER)
+        self.tmp_folder = os.path.join(self.folder, "tmp")
+        self.max_size = utils.res.SRR_CACHE_MAX_SIZE if max_size is None else max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        utils.res.mkdir(self.tmp_folder)
+
+        self.conn = utils.res.open_database(utils.res.SRR_CACHE_INDEX)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                                sha1 TEXT PRIMARY KEY,
+                                size INTEGER NOT NULL,
+                                last_access REAL NOT NULL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS releases (
+                                name TEXT PRIMARY KEY COLLATE NOCASE,
+                                sha1 TEXT NOT NULL,
+                                stored REAL NOT NULL)""")
+        self.conn.commit()
+
+    def blob_path(self, sha1):
+        return os.path.join(self.folder, f"{sha1}.srr")
+
+    def get(self, release):
+        # Return the path of the stored SRR of release or None
+        with self.lock:
+            row = self.conn.execute("SELECT sha1 FROM releases WHERE name = ?", (release,)).fetchone()
+            if row and os.path.isfile(self.blob_path(row[0])):
+                self.hits += 1
+                self.conn.execute("UPDATE blobs SET last_access = ? WHERE sha1 = ?", (time.time(), row[0]))
+                self.conn.commit()
+                return self.blob_path(row[0])
+
+            # The file has been removed by hand
+            if row:
+                self.conn.execute("DELETE FROM releases WHERE name = ?", (release,))
+                self.conn.execute("DELETE FROM blobs WHERE sha1 = ?", (row[0],))
+                self.conn.commit()
+            self.misses += 1
+            return None
+
+    def get_sha1(self, release):
+        # Return the content hash of the stored SRR of release without touching it
+        with self.lock:
+            row = self.conn.execute("SELECT sha1 FROM releases WHERE name = ?", (release,)).fetchone()
+        return row[0] if row and os.path.isfile(self.blob_path(row[0])) else None
+
+    def download(self, release, s):
+        # Download the SRR into the temp folder of the store, check it and commit it
+        tmp_path = utils.res.download_srr(release, s, self.tmp_folder)
+        try:
+            return self.add(release, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def add(self, release, srr_path):
+        # Validate an SRR file and move it into the store, returns its new path
+        self.validate(srr_path)
+
+        sha1 = hashlib.sha1()
+        with open(srr_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1048576), b""):
+                sha1.update(chunk)
+        sha1 = sha1.hexdigest()
+        size = os.path.getsize(srr_path)
+
+        with self.lock:
+            if not os.path.isfile(self.blob_path(sha1)):
+                os.replace(srr_path, self.blob_path(sha1))
+            self.conn.execute("INSERT OR REPLACE INTO blobs (sha1, size, last_access) VALUES (?, ?, ?)", (sha1, size, time.time()))
+            self.conn.execute("INSERT OR REPLACE INTO releases (name, sha1, stored) VALUES (?, ?, ?)", (release, sha1, time.time()))
+            self.conn.commit()
+            self.evict(keep=sha1)
+
+        return self.blob_path(sha1)
+
+    def validate(self, srr_path):
+        # Parse the SRR so a truncated download or an error page never gets in the store
+        with open(srr_path, "rb") as f:
+            if f.read(len(SRR_MAGIC)) != SRR_MAGIC:
+                raise ValueError("Downloaded file is not a valid SRR")
+        try:
+            SRR(srr_path).model
+        except Exception as e:
+            raise ValueError(f"Downloaded SRR can't be parsed: {e}") from e
+
+    def evict(self, keep=None):
+        # Remove least recently used SRR until the store fits in max_size, lock must be held
+        if not self.max_size:
+            return 0
+
+        removed = 0
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        for sha1, size in self.conn.execute("SELECT sha1, size FROM blobs ORDER BY last_access").fetchall():
+            if total <= self.max_size:
+                break
+            if sha1 == keep:
+                continue
+            if os.path.exists(self.blob_path(sha1)):
+                os.remove(self.blob_path(sha1))
+            self.conn.execute("DELETE FROM blobs WHERE sha1 = ?", (sha1,))
+            self.conn.execute("DELETE FROM releases WHERE sha1 = ?", (sha1,))
+            total -= size
+            removed += 1
+
+        self.conn.commit()
+        return removed
+
+    def stats(self):
+        return f"{self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+from collections import namedtuple
+
+# What traverse_directories gives to the process functions, size/mtime_ns/dev come from the stat of the DirEntry
+WorkItem = namedtuple("WorkItem", ["path", "size", "mtime_ns", "dev"])
+
+# Release sub dirs never holding a file to rescene, they're not walked
+PRUNED_DIRS = {"sample", "samples", "proof", "proofs", "sub", "subs", "subpack", "subpacks", "subtitle", "subtitles"}
+
+_DONE = object()
+
+def item_from_stat(path, st):
+    return WorkItem(path, st.st_size, st.st_mtime_ns, st.st_dev)
+
+class Walker:
+    """
+    Single pass traversal of the input paths built on os.scandir.
+    Files are yielded in the same order as os.walk would give them, the stat of
+    each DirEntry is only done for files with a valid extension and reused by
+    the caller. discovered is the number of items found so far, with
+    run_ahead() the walk goes on in a thread so it grows faster than the
+    items are processed. With a FileIndex every file seen is added to it, the
+    pruned dirs are listed for the index only.
+    """
+    def __init__(self, input_paths, valid_extensions=None, pruned_dirs=PRUNED_DIRS, index=None):
+        self.input_paths = input_paths
+        self.valid_extensions = valid_extensions
+        self.pruned_dirs = pruned_dirs
+        self.index = index
+        self.discovered = 0
+        self.finished = False
+
+    def is_valid_name(self, name):
+        return os.path.splitext(name)[1].lower() in self.valid_extensions
+
+    def files(self):
+        # Yield a WorkItem for every file with a valid extension
+        for path in self.input_paths:
+            if os.path.isfile(path):
+                if self.is_valid_name(path):
+                    self.discovered += 1
+                    yield item_from_stat(path, os.stat(path))
+            elif os.path.isdir(path):
+                yield from self.walk(path)
+        self.finished = True
+
+    def walk(self, top):
+        # Stack of (dir, index_only), index_only dirs are pruned dirs only listed for the index
+        stack = [(top, False)]
+        while stack:
+            root, index_only = stack.pop()
+            subdirs = []
+            try:
+                if self.index:
+                    self.index.add_dir(root, os.stat(root).st_mtime_ns)
+                with os.scandir(root) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                if entry.is_symlink():
+                                    continue
+                                pruned = index_only or entry.name.lower() in self.pruned_dirs
+                                if not pruned or self.index:
+                                    subdirs.append((entry.path, pruned))
+                            elif not index_only and self.is_valid_name(entry.name):
+                                st = entry.stat()
+                                if self.index:
+                                    self.index.add(entry.path, st.st_size, st.st_mtime_ns)
+                                self.discovered += 1
+                                yield item_from_stat(entry.path, st)
+                            elif self.index:
+                                self.index.add(entry.path)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+            # Same order as os.walk: sub dirs are walked one after the other in listing order
+            stack.extend(reversed(subdirs))
+
+        # The whole tree is known, lookups under top don't need to list it again
+        if self.index:
+            self.index.add_root(top)
+
+    def release_dirs(self):
+        # Return a WorkItem for every directory directly inside the input paths
+        items = []
+        for path in self.input_paths:
+            if not os.path.isdir(path):
+                continue
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                items.append(item_from_stat(os.path.join(path, entry.name), entry.stat()))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+        self.discovered = len(items)
+        self.finished = True
+        return items
+
+    def run_ahead(self, items):
+        # Consume the items generator in a thread and yield them from a queue
+        found = queue.Queue()
+
+        def producer():
+            try:
+                for item in items:
+                    found.put(item)
+            except Exception as e:
+                found.put(e)
+            found.put(_DONE)
+
+        thread = threading.Thread(target=producer, name="walker", daemon=True)
+        thread.start()
+        while True:
+            item = found.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        thread.join()